@@ -0,0 +1,41 @@
+from django.db import transaction
+
+from cart.models import CartItem
+
+
+def fold_operations(operations):
+    """
+    Amallarni tartib bo‘yicha mahsulotlarga yig‘adi: {product_id: ('add' | 'set', miqdor)}.
+
+    add — mavjud miqdorga qo‘shiladi, set — yakuniy miqdor (0 — o‘chirish).
+    Bir mahsulot uchun set/remove dan keyingi add yakuniy miqdorni oshiradi.
+    """
+    lines = {}
+    for operation in operations:
+        product_id = operation['product']
+        if operation['op'] == 'add':
+            kind, quantity = lines.get(product_id, ('add', 0))
+            lines[product_id] = (kind, quantity + operation['quantity'])
+        elif operation['op'] == 'set':
+            lines[product_id] = ('set', operation['quantity'])
+        else:
+            lines[product_id] = ('set', 0)
+    return lines
+
+
+def apply_cart_operations(cart, operations):
+    """
+    Savat amallarini bitta tranzaksiyada bajaradi: bitta DELETE, set uchun
+    bitta upsert va add uchun bitta (quantity + n) upsert.
+    """
+    lines = fold_operations(operations)
+    removed = [product_id for product_id, (kind, quantity) in lines.items() if kind == 'set' and not quantity]
+    to_set = {product_id: quantity for product_id, (kind, quantity) in lines.items() if kind == 'set' and quantity}
+    to_add = {product_id: quantity for product_id, (kind, quantity) in lines.items() if kind == 'add'}
+
+    with transaction.atomic():
+        deleted = CartItem.objects.filter(cart=cart, product_id__in=removed).delete()[0] if removed else 0
+        CartItem.objects.set_many(cart, to_set)
+        CartItem.objects.add_many(cart, to_add)
+        cart.touch()
+    return {"added": len(to_add), "set": len(to_set), "removed": deleted}
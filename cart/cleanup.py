@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from cart.models import Cart, CartItem
+
+BATCH_SIZE = 500
+
+
+def abandoned_carts(days, now=None):
+    """updated_at dan beri `days` kundan ko‘p o‘tgan savatlar"""
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return Cart.objects.filter(updated_at__lt=cutoff)
+
+
+def delete_abandoned_carts(days, batch_size=BATCH_SIZE, pause=0.0, dry_run=False):
+    """
+    Eskirgan savatlarni pk tartibida `batch_size` talik partiyalar bilan o‘chiradi.
+
+    Har bir partiya alohida qisqa tranzaksiya, partiyalar orasida `pause`
+    soniya kutiladi — qulflar uzoq ushlanmaydi. Har partiya uchun
+    {'batch', 'carts', 'items', 'seconds'} qaytariladi (generator).
+    dry_run da hech narsa o‘chirilmaydi, faqat sanaladi.
+    """
+    queryset = abandoned_carts(days)
+    last_pk = 0
+    batch = 0
+    while True:
+        started = time.monotonic()
+        ids = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        last_pk = ids[-1]
+        batch += 1
+        if dry_run:
+            carts, items = len(ids), CartItem.objects.filter(cart_id__in=ids).count()
+        else:
+            with transaction.atomic():
+                # Shu orada faollashgan savat o‘chirilmaydi: shart qayta tekshiriladi
+                stale = queryset.filter(pk__in=ids)
+                items = CartItem.objects.filter(cart__in=stale)._raw_delete(CartItem.objects.db)
+                carts = stale._raw_delete(Cart.objects.db)
+        yield {'batch': batch, 'carts': carts, 'items': items, 'seconds': time.monotonic() - started}
+        if pause and len(ids) == batch_size:
+            time.sleep(pause)
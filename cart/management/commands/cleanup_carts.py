@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cart.cleanup import BATCH_SIZE, delete_abandoned_carts
+
+
+class Command(BaseCommand):
+    help = "Uzoq vaqt o‘zgarmagan savatlarni partiyalab, oraliq pauza bilan o‘chiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CART_ABANDONED_DAYS,
+                            help="Shuncha kundan beri o‘zgarmagan savatlar o‘chiriladi")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.5, help="Partiyalar orasidagi pauza (soniya)")
+        parser.add_argument('--dry-run', action='store_true', help="O‘chirmasdan faqat sanash")
+
+    def handle(self, *args, **options):
+        verb = "o‘chiriladi" if options['dry_run'] else "o‘chirildi"
+        total_carts = total_items = 0
+        for result in delete_abandoned_carts(
+            options['days'], options['batch_size'], options['pause'], options['dry_run']
+        ):
+            total_carts += result['carts']
+            total_items += result['items']
+            self.stdout.write(
+                f"{result['batch']}-partiya: {result['carts']} savat, {result['items']} element {verb} "
+                f"({result['seconds'] * 1000:.1f} ms)"
+            )
+        prefix = "[dry-run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}Jami: {total_carts} savat, {total_items} element {verb}"))
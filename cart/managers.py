@@ -0,0 +1,74 @@
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import F
+
+
+class CartItemManager(models.Manager):
+
+    def _supports_upsert(self, connection):
+        features = connection.features
+        return features.supports_update_conflicts_with_target and features.can_return_columns_from_insert
+
+    def add(self, cart, product, quantity):
+        """
+        Mahsulotni savatga qo‘shadi yoki miqdorini oshiradi; yakuniy miqdorni qaytaradi.
+
+        PostgreSQL va SQLite (3.35+) da bitta INSERT ... ON CONFLICT DO UPDATE
+        so‘rovi: parallel qo‘shishlarda ham miqdor yo‘qolmaydi va (cart, product)
+        takrorlanmaydi. Boshqa bazalarda F() bilan UPDATE, qator bo‘lmasa INSERT.
+        """
+        return self.add_many(cart, {product.pk: quantity})[product.pk]
+
+    def add_many(self, cart, quantities):
+        """{product_id: n} miqdorlarini qo‘shadi; {product_id: yakuniy miqdor}"""
+        using = router.db_for_write(self.model)
+        connection = connections[using]
+        if self._supports_upsert(connection):
+            return self._upsert(connection, cart.pk, quantities, increment=True)
+        return {product_id: self._add_fallback(using, cart, product_id, quantity)
+                for product_id, quantity in quantities.items()}
+
+    def set_many(self, cart, quantities):
+        """{product_id: n} miqdorlarini o‘rnatadi (qator bo‘lmasa yaratiladi)"""
+        using = router.db_for_write(self.model)
+        connection = connections[using]
+        if self._supports_upsert(connection):
+            return self._upsert(connection, cart.pk, quantities, increment=False)
+        with transaction.atomic(using=using):
+            for product_id, quantity in quantities.items():
+                self.using(using).update_or_create(cart=cart, product_id=product_id, defaults={'quantity': quantity})
+        return dict(quantities)
+
+    def _add_fallback(self, using, cart, product_id, quantity):
+        for _ in range(2):
+            items = self.using(using).filter(cart=cart, product_id=product_id)
+            if items.update(quantity=F('quantity') + quantity):
+                return items.values_list('quantity', flat=True).get()
+            try:
+                with transaction.atomic(using=using):
+                    self.using(using).create(cart=cart, product_id=product_id, quantity=quantity)
+                return quantity
+            except IntegrityError:
+                # Parallel so‘rov qatorni bizdan oldin yaratdi: yana UPDATE
+                continue
+        raise IntegrityError("Savat elementini saqlab bo‘lmadi")
+
+    def _upsert(self, connection, cart_id, quantities, increment):
+        if not quantities:
+            return {}
+        opts = self.model._meta
+        quote = connection.ops.quote_name
+        table = quote(opts.db_table)
+        cart_column = quote(opts.get_field('cart').column)
+        product_column = quote(opts.get_field('product').column)
+        quantity_column = quote(opts.get_field('quantity').column)
+        value = f"{table}.{quantity_column} + EXCLUDED.{quantity_column}" if increment else f"EXCLUDED.{quantity_column}"
+        sql = (
+            f"INSERT INTO {table} ({cart_column}, {product_column}, {quantity_column}) "
+            f"VALUES {', '.join(['(%s, %s, %s)'] * len(quantities))} "
+            f"ON CONFLICT ({cart_column}, {product_column}) DO UPDATE SET {quantity_column} = {value} "
+            f"RETURNING {product_column}, {quantity_column}"
+        )
+        params = [param for product_id, quantity in quantities.items() for param in (cart_id, product_id, quantity)]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return dict(cursor.fetchall())
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 06:03
+
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    """Foydalanuvchining savatlari eng eskisiga, bir xil mahsulot qatorlari bittaga (miqdorlar qo‘shiladi)"""
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+
+    duplicate_users = Cart.objects.values('user_id').annotate(count=Count('id'), keep=Min('id')).filter(count__gt=1)
+    for row in list(duplicate_users):
+        extra = Cart.objects.filter(user_id=row['user_id']).exclude(pk=row['keep'])
+        CartItem.objects.filter(cart__in=extra).update(cart_id=row['keep'])
+        extra.delete()
+
+    duplicate_items = (
+        CartItem.objects.values('cart_id', 'product_id')
+        .annotate(count=Count('id'), keep=Min('id'), quantity=Sum('quantity'))
+        .filter(count__gt=1)
+    )
+    for row in list(duplicate_items):
+        CartItem.objects.filter(pk=row['keep']).update(quantity=row['quantity'])
+        CartItem.objects.filter(cart_id=row['cart_id'], product_id=row['product_id']).exclude(pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+    # Sxema o‘zgarishi keyingi migratsiyada: PostgreSQL da kechiktirilgan FK triggerlari ALTER TABLE ga xalaqit bermasin
+
+    dependencies = [
+        ('cart', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -1,25 +1,59 @@
+from decimal import Decimal
+
 from django.db import models
 from django.conf import settings
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+from django.utils.functional import cached_property
+from cart.managers import CartItemManager
 from products.models import Product
 # Create your models here.
 
+# Savat qatori summasi SQL da: miqdor * mahsulot narxi
+LINE_TOTAL = ExpressionWrapper(F('quantity') * F('product__price'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
 class Cart(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='carts', on_delete=models.CASCADE)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, related_name='cart', on_delete=models.CASCADE)
+    # Oxirgi faollik: elementlar o‘zgarganda touch() bilan yangilanadi (cleanup_carts uchun)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return f"{self.user.email} savati"
-    
-    
+
+    def touch(self):
+        touch_cart(self.pk)
+
+    @cached_property
+    def totals(self):
+        """{'total_price', 'item_count'} — bitta aggregate so‘rov, savat hajmiga bog‘liq emas"""
+        totals = self.items.aggregate(total_price=Sum(LINE_TOTAL), item_count=Sum('quantity'))
+        return {
+            'total_price': totals['total_price'] or Decimal('0.00'),
+            'item_count': totals['item_count'] or 0,
+        }
+
     @property
     def total_price(self):
-        return sum(item.product.price * item.quantity for item in self.items.all())
+        return self.totals['total_price']
+
+
+def touch_cart(cart_id):
+    """Savat faolligini yangilaydi (elementlar alohida UPDATE/INSERT bilan o‘zgarganda)"""
+    Cart.objects.filter(pk=cart_id).update(updated_at=timezone.now())
 
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, related_name='items', on_delete=models.CASCADE)
     product = models.ForeignKey(Product, related_name='cart_items', on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
-    
+
+    objects = CartItemManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.quantity}x"
\ No newline at end of file
@@ -1,26 +1,76 @@
 from rest_framework import serializers
-from cart.models import Cart, CartItem
+from cart.models import LINE_TOTAL, Cart, CartItem
+from products.models import Product
 from products.serializers import ProductSerializer
+from shop_api.fieldsets import DynamicFieldsMixin
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    # Mahsulot standart holatda qisqa: id, name, price, image (?expand=items.product — to‘liq)
+    summarized_fields = ['product']
+    field_annotations = {'subtotal': LINE_TOTAL}
 
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'quantity']
+        fields = ['id', 'product', 'quantity', 'subtotal']
 
 class CartItemCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = ['product', 'quantity']
 
-class CartSerializer(serializers.ModelSerializer):
+class CartItemQuantitySerializer(serializers.ModelSerializer):
+    """Savat qatorini yangilash: faqat miqdor (mahsulot almashtirilsa unique_cart_product buziladi)"""
+
+    class Meta:
+        model = CartItem
+        fields = ['quantity']
+        extra_kwargs = {'quantity': {'required': True}}
+
+class CartOperationSerializer(serializers.Serializer):
+    OPERATIONS = ['add', 'set', 'remove']
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'add':
+            attrs.setdefault('quantity', 1)
+            if attrs['quantity'] < 1:
+                raise serializers.ValidationError({'quantity': "Kamida 1 bo‘lishi kerak"})
+        elif attrs['op'] == 'set' and 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': "Bu amal uchun majburiy"})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    MAX_OPERATIONS = 200
+
+    operations = serializers.ListField(child=CartOperationSerializer(), allow_empty=False, max_length=MAX_OPERATIONS)
+
+    def validate_operations(self, value):
+        # Barcha mahsulotlar bitta IN so‘rovi bilan tekshiriladi
+        ids = sorted({operation['product'] for operation in value})
+        found = set(Product.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            raise serializers.ValidationError(f"Mahsulotlar topilmadi: {missing}")
+        return value
+
+
+class CartSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.SerializerMethodField()
+    item_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Cart
-        fields = ['id', 'items', 'total_price']
+        fields = ['id', 'items', 'total_price', 'item_count']
 
     def get_total_price(self, obj):
-        return obj.total_price
+        return obj.totals['total_price']
+
+    def get_item_count(self, obj):
+        return obj.totals['item_count']
@@ -0,0 +1,346 @@
+import logging
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from cart.batch import apply_cart_operations, fold_operations
+from cart.models import Cart, CartItem, touch_cart
+from cart.serializers import CartItemSerializer, CartSerializer
+from products.models import Product
+from products.serializers import ProductSerializer
+
+logger = logging.getLogger(__name__)
+
+GUEST_HEADER = 'X-Cart-Token'
+GUEST_TOKEN_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class CartBusy(APIException):
+    """Savat qulfi LOCK_WAIT ichida bo‘shamadi"""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Savat band, birozdan keyin qayta urinib ko‘ring"
+    default_code = 'cart_busy'
+
+
+@contextmanager
+def owner_lock(owner, cache):
+    """
+    Savat egasi bo‘yicha qulf. LOCK_WAIT ichida olinmasa CartBusy; qulf faqat
+    o‘z tokeni bo‘lsa o‘chiriladi — muddati o‘tib boshqa so‘rov olgan qulf
+    tegilmaydi.
+    """
+    lock_key = f'{owner.key}:lock'
+    token = secrets.token_hex(8)
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock_key, token, LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            raise CartBusy
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+class CartOwner:
+    """Savat egasi: foydalanuvchi yoki mehmon tokeni (X-Cart-Token sarlavhasi)"""
+
+    def __init__(self, user=None, token=None):
+        self.user = user
+        self.token = token
+
+    @property
+    def is_guest(self):
+        return self.user is None
+
+    @property
+    def key(self):
+        return f'cart:guest:{self.token}' if self.is_guest else f'cart:user:{self.user.pk}'
+
+
+def cart_owner(request, create=False):
+    """So‘rov egasi; mehmonda token bo‘lmasa create=True da yangisi yaratiladi, aks holda None"""
+    if request.user.is_authenticated:
+        return CartOwner(user=request.user)
+    token = request.headers.get(GUEST_HEADER)
+    if token and GUEST_TOKEN_RE.match(token):
+        return CartOwner(token=token)
+    return CartOwner(token=secrets.token_urlsafe(24)) if create else None
+
+
+class CachedCart:
+    """Keshdagi savat: CartSerializer uchun Cart o‘rnida (id si None)"""
+
+    id = None
+
+    def __init__(self, items):
+        self.items = items
+        self.totals = {
+            'total_price': sum((item.subtotal for item in items), Decimal('0.00')),
+            'item_count': sum(item.quantity for item in items),
+        }
+
+
+def cart_from_lines(lines, fields=None, expand=None):
+    """
+    {product_id: miqdor} qatorlaridan CachedCart: CartSerializer bazadagi savat
+    bilan bir xil ko‘rinishni beradi. Element id si — mahsulot id si: item/<pk>/
+    shu id bo‘yicha ishlaydi.
+    """
+    items_options = CartSerializer.resolve_fields(fields, expand).get('items')
+    if items_options:
+        product_options = CartItemSerializer.resolve_fields(**items_options).get('product') or {}
+        products = ProductSerializer.setup_eager_loading(
+            Product.objects.filter(pk__in=lines), **product_options, extra={'price': {}}
+        )
+    else:
+        products = Product.objects.filter(pk__in=lines).only('pk', 'price')
+    products = {product.pk: product for product in products}
+
+    items = []
+    for product_id, quantity in lines.items():
+        product = products.get(product_id)
+        if product is None:
+            # Mahsulot o‘chirilgan
+            continue
+        item = CartItem(pk=product_id, product=product, quantity=quantity)
+        item.subtotal = product.price * quantity
+        items.append(item)
+    return CachedCart(items)
+
+
+class DatabaseCartStorage:
+    """Har bir o‘zgarish darhol cart_cartitem ga yoziladi (faqat foydalanuvchilar uchun)"""
+
+    def get_cart(self, owner):
+        cart, created = Cart.objects.get_or_create(user=owner.user)
+        return cart
+
+    def load(self, owner, fields=None, expand=None):
+        queryset = CartSerializer.setup_eager_loading(Cart.objects.all(), fields=fields, expand=expand)
+        cart, created = queryset.get_or_create(user=owner.user)
+        return cart
+
+    def apply(self, owner, operations):
+        return apply_cart_operations(self.get_cart(owner), operations)
+
+    def add_lines(self, owner, lines):
+        cart = self.get_cart(owner)
+        with transaction.atomic():
+            CartItem.objects.add_many(cart, lines)
+            cart.touch()
+
+    def update_item(self, owner, item_id, quantity):
+        """Qator (CartItem.pk) miqdori; topilmasa False"""
+        return self._change_item(owner, item_id, lambda items: items.update(quantity=quantity))
+
+    def remove_item(self, owner, item_id):
+        return self._change_item(owner, item_id, lambda items: items.delete())
+
+    def _change_item(self, owner, item_id, change):
+        with self.drained(owner):
+            cart_id = CartItem.objects.filter(pk=item_id, cart__user=owner.user).values_list('cart_id', flat=True).first()
+            if cart_id is None:
+                return False
+            change(CartItem.objects.filter(pk=item_id))
+            touch_cart(cart_id)
+        return True
+
+    def flush(self, owner):
+        pass
+
+    def drained(self, owner):
+        """Checkout uchun qulf: SQLite da select_for_update ishlamaydi, bir vaqtdagi checkoutlar navbat kutadi"""
+        return owner_lock(owner, caches[settings.CART_CACHE_ALIAS])
+
+
+class CacheCartStorage:
+    """
+    Savat qatorlari keshda: {'lines': {product_id: miqdor}, 'version', 'flushed'}.
+
+    Foydalanuvchi savati o‘zgarganda bazaga fon oqimida yoziladi (write-behind),
+    checkout oldidan drained() ichida sinxron yoziladi. Mehmon savatlari bazaga
+    yozilmaydi, login qilganda foydalanuvchi savatiga qo‘shiladi — shuning uchun
+    bir nechta worker bilan kesh umumiy bo‘lishi kerak (CART_CACHE_BACKEND=file
+    yoki redis): locmem da savat boshqa worker ga tushgan so‘rovda ko‘rinmaydi.
+    """
+
+    def __init__(self, alias=None):
+        self.alias = alias or settings.CART_CACHE_ALIAS
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def locked(self, owner):
+        return owner_lock(owner, self.cache)
+
+    def _read(self, owner):
+        data = self.cache.get(owner.key)
+        if data is None:
+            lines = {}
+            if not owner.is_guest:
+                items = CartItem.objects.filter(cart__user=owner.user).order_by('pk')
+                lines = dict(items.values_list('product_id', 'quantity'))
+            data = {'lines': lines, 'version': 0, 'flushed': 0}
+        return data
+
+    def lines(self, owner):
+        return self._read(owner)['lines']
+
+    def _update(self, owner, change):
+        with self.locked(owner):
+            data = self._read(owner)
+            result = change(data['lines'])
+            data['version'] += 1
+            self.cache.set(owner.key, data)
+        if not owner.is_guest:
+            schedule_flush(self, owner)
+        return result
+
+    def load(self, owner, fields=None, expand=None):
+        return cart_from_lines(self.lines(owner), fields, expand)
+
+    def apply(self, owner, operations):
+        def change(lines):
+            result = {"added": 0, "set": 0, "removed": 0}
+            for product_id, (kind, quantity) in fold_operations(operations).items():
+                if kind == 'add':
+                    lines[product_id] = lines.get(product_id, 0) + quantity
+                    result["added"] += 1
+                elif quantity:
+                    lines[product_id] = quantity
+                    result["set"] += 1
+                elif lines.pop(product_id, None) is not None:
+                    result["removed"] += 1
+            return result
+        return self._update(owner, change)
+
+    def add_lines(self, owner, lines):
+        def change(current):
+            for product_id, quantity in lines.items():
+                current[product_id] = current.get(product_id, 0) + quantity
+        self._update(owner, change)
+
+    def update_item(self, owner, item_id, quantity):
+        """Keshdagi qator id si — mahsulot id si; topilmasa False"""
+        def change(lines):
+            if item_id not in lines:
+                return False
+            lines[item_id] = quantity
+            return True
+        return self._update(owner, change)
+
+    def remove_item(self, owner, item_id):
+        return self._update(owner, lambda lines: lines.pop(item_id, None) is not None)
+
+    def discard(self, owner):
+        self.cache.delete(owner.key)
+
+    def flush(self, owner):
+        """Foydalanuvchi savatini bazaga yozadi (o‘zgarish bo‘lmasa hech narsa qilmaydi)"""
+        if owner.is_guest:
+            return
+        # O‘qish va yozish bitta qulf ostida: eski nusxali fon flush keyingisidan keyin commit bo‘lolmaydi
+        with self.locked(owner):
+            self._flush(owner)
+
+    def _flush(self, owner):
+        data = self.cache.get(owner.key)
+        if data is None or data['version'] == data['flushed']:
+            return
+        lines = data['lines']
+        existing = set(Product.objects.filter(pk__in=lines).values_list('pk', flat=True))
+        lines = {product_id: quantity for product_id, quantity in lines.items() if product_id in existing}
+        with transaction.atomic():
+            cart, created = Cart.objects.get_or_create(user=owner.user)
+            CartItem.objects.filter(cart=cart).exclude(product_id__in=lines).delete()
+            CartItem.objects.set_many(cart, lines)
+            cart.touch()
+        data['flushed'] = data['version']
+        self.cache.set(owner.key, data)
+
+    @contextmanager
+    def drained(self, owner):
+        """
+        Blok ichida savat bazada va qulflangan: kesh avval bazaga yoziladi,
+        blokdan keyin tashlab yuboriladi (keyingi o‘qish bazadan). Bazani
+        to‘g‘ridan-to‘g‘ri o‘zgartiradigan kod (checkout) fon flush bilan
+        poygaga tushmaydi.
+        """
+        with self.locked(owner):
+            if not owner.is_guest:
+                self._flush(owner)
+            try:
+                yield
+            finally:
+                self.discard(owner)
+
+
+STORAGES = {
+    'db': DatabaseCartStorage,
+    'cache': CacheCartStorage,
+}
+
+
+def get_cart_storage(owner):
+    """Mehmon savati har doim keshda, foydalanuvchiniki CART_STORAGE bo‘yicha"""
+    if owner is None or owner.is_guest:
+        return CacheCartStorage()
+    return STORAGES[settings.CART_STORAGE]()
+
+
+def _flush_in_worker(storage, owner):
+    try:
+        storage.flush(owner)
+    except Exception:
+        logger.exception("Savat bazaga yozilmadi: %s", owner.key)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.CART_FLUSH_WORKERS, thread_name_prefix='cart-flush')
+    return _executor
+
+
+def schedule_flush(storage, owner):
+    if settings.CART_FLUSH_WORKERS:
+        get_executor().submit(_flush_in_worker, storage, owner)
+    else:
+        storage.flush(owner)
+
+
+def merge_guest_cart(request, user):
+    """Login/ro‘yxatdan o‘tishda mehmon savati foydalanuvchi savatiga bitta amal bilan qo‘shiladi"""
+    guest = cart_owner(request)
+    if guest is None or not guest.is_guest:
+        return
+    guest_storage = get_cart_storage(guest)
+    lines = guest_storage.lines(guest)
+    if lines:
+        existing = set(Product.objects.filter(pk__in=lines).values_list('pk', flat=True))
+        lines = {product_id: quantity for product_id, quantity in lines.items() if product_id in existing}
+        owner = CartOwner(user=user)
+        get_cart_storage(owner).add_lines(owner, lines)
+    guest_storage.discard(guest)
@@ -1,3 +1,362 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cart.models import Cart, CartItem
+from cart.storage import GUEST_HEADER, CacheCartStorage, CartBusy, CartOwner
+from orders.checkout import checkout
+from products.models import Tag
+from products.tests import clear_caches, create_products
+from users.models import User
+
+
+class CartQueryCountTests(TestCase):
+    """Savat so‘rovlari soni elementlar soniga bog‘liq bo‘lmasligi kerak"""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = [Tag.objects.create(name=f"teg{i}") for i in range(2)]
+        cls.products = create_products(20, tags=tags)
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_caches()
+        self.client.force_authenticate(self.user)
+
+    def count_cart_queries(self, item_count):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        cart.items.all().delete()
+        for product in self.products[:item_count]:
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('cart'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), item_count)
+        return len(ctx.captured_queries)
+
+    def test_cart_constant_queries(self):
+        self.assertEqual(self.count_cart_queries(1), self.count_cart_queries(20))
+
+    def test_totals_computed_in_sql(self):
+        self.count_cart_queries(3)
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse('cart')).data
+        self.assertEqual(data['total_price'], sum(p.price * 2 for p in self.products[:3]))
+        self.assertEqual(data['item_count'], 6)
+        self.assertEqual([item['subtotal'] for item in data['items']], [str(p.price * 2) for p in self.products[:3]])
+        self.assertEqual(sum('SUM(' in query['sql'] for query in ctx.captured_queries), 1)
+
+        # Faqat jami summa: elementlar yuklanmaydi
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse('cart'), {'fields': 'total_price'}).data
+        self.assertEqual(set(data), {'total_price'})
+        self.assertFalse(any('"cart_cartitem"."id"' in query['sql'] for query in ctx.captured_queries))
+
+
+class CartFieldsetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(3, tags=[Tag.objects.create(name="teg")])
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+        cart = Cart.objects.create(user=cls.user)
+        for product in cls.products:
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_cart(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('cart'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data, [query['sql'] for query in ctx.captured_queries]
+
+    def test_nested_product_is_summary_by_default(self):
+        data, queries = self.get_cart()
+        self.assertEqual(set(data['items'][0]['product']), {'id', 'name', 'price', 'image'})
+        self.assertFalse(any('products_tag' in sql or 'description' in sql for sql in queries))
+
+        data, _ = self.get_cart(expand='items.product')
+        self.assertEqual(data['items'][0]['product']['tags'], [{'id': self.products[0].tags.get().pk, 'name': "teg"}])
+
+    def test_fields_limit_payload_and_columns(self):
+        data, queries = self.get_cart(fields='total_price')
+        self.assertEqual(data, {'total_price': sum(p.price * 2 for p in self.products)})
+        self.assertFalse(any('"products_product"."name"' in sql for sql in queries))
+
+        data, _ = self.get_cart(fields='items.product.name')
+        self.assertEqual(data['items'][0], {'product': {'name': self.products[0].name}})
+
+
+class CartUpsertTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_products(1)[0]
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_adds_accumulate_in_one_row(self):
+        url = reverse('cart')
+        for quantity in (2, 3):
+            response = self.client.post(url, {'product': self.product.pk, 'quantity': quantity})
+            self.assertEqual(response.status_code, 201)
+        self.client.post(url, {'product': self.product.pk})
+        self.assertEqual(list(CartItem.objects.values_list('quantity', flat=True)), [6])
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 1)
+
+    def test_upsert_is_single_statement(self):
+        cart = Cart.objects.create(user=self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(CartItem.objects.add(cart, self.product, 2), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(CartItem.objects.add(cart, self.product, 3), 5)
+
+    def test_fallback_without_on_conflict(self):
+        cart = Cart.objects.create(user=self.user)
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self.assertEqual(CartItem.objects.add(cart, self.product, 2), 2)
+            self.assertEqual(CartItem.objects.add(cart, self.product, 3), 5)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_item_update_cannot_change_product(self):
+        other = create_products(1)[0]
+        cart = Cart.objects.create(user=self.user)
+        item = CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+        CartItem.objects.create(cart=cart, product=other, quantity=1)
+        # Boshqa mahsulotga o‘tkazish unique_cart_product ni buzar edi: faqat miqdor yangilanadi
+        response = self.client.put(reverse('cart_item_update_delete', args=[item.pk]),
+                                   {'product': other.pk, 'quantity': 4}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(cart.items.values_list('product_id', 'quantity')), {self.product.pk: 4, other.pk: 1})
+
+
+class CartBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(30)
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=5)
+        CartItem.objects.create(cart=self.cart, product=self.products[1], quantity=1)
+
+    def patch(self, operations, **params):
+        url = reverse('cart')
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.patch(url, {'operations': operations}, format='json')
+
+    def test_operations_in_one_transaction(self):
+        response = self.patch([
+            {'op': 'add', 'product': self.products[0].pk, 'quantity': 2},
+            {'op': 'remove', 'product': self.products[1].pk},
+            {'op': 'set', 'product': self.products[2].pk, 'quantity': 4},
+            {'op': 'add', 'product': self.products[2].pk},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item['product']['id']: item['quantity'] for item in response.data['items']},
+            {self.products[0].pk: 7, self.products[2].pk: 5},
+        )
+        self.assertEqual(response.data['item_count'], 12)
+
+    def test_large_sync_takes_constant_queries(self):
+        operations = [{'op': 'set', 'product': product.pk, 'quantity': 2} for product in self.products]
+        operations += [{'op': 'add', 'product': self.products[0].pk}, {'op': 'remove', 'product': self.products[1].pk}]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.patch(operations, summary='true')
+        self.assertEqual(response.data, {
+            'total_price': sum(p.price * 2 for p in self.products) + self.products[0].price - self.products[1].price * 2,
+            'item_count': 59, 'added': 0, 'set': 29, 'removed': 1,
+        })
+        self.assertLessEqual(len(ctx.captured_queries), 10)
+
+    def test_unknown_product_rejects_whole_batch(self):
+        response = self.patch([
+            {'op': 'add', 'product': self.products[2].pk},
+            {'op': 'add', 'product': 999999},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CartItem.objects.filter(product=self.products[2]).exists())
+        self.assertEqual(self.patch([{'op': 'set', 'product': self.products[2].pk}]).status_code, 400)
+
+
+@override_settings(CART_FLUSH_WORKERS=0)
+class CartStorageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(3)
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+
+    def add(self, product, quantity, **headers):
+        return self.client.post(reverse('cart'), {'product': product.pk, 'quantity': quantity}, headers=headers)
+
+    def test_guest_cart_lives_in_cache(self):
+        response = self.add(self.products[0], 2)
+        self.assertEqual(response.status_code, 201)
+        token = response[GUEST_HEADER]
+        self.add(self.products[0], 1, **{GUEST_HEADER: token})
+        self.add(self.products[1], 1, **{GUEST_HEADER: token})
+
+        data = self.client.get(reverse('cart'), headers={GUEST_HEADER: token}).data
+        self.assertEqual([(item['product']['id'], item['quantity']) for item in data['items']],
+                         [(self.products[0].pk, 3), (self.products[1].pk, 1)])
+        self.assertEqual(data['total_price'], self.products[0].price * 3 + self.products[1].price)
+        self.assertFalse(Cart.objects.exists())
+        self.assertEqual(self.client.get(reverse('cart')).data['items'], [])
+
+    def test_guest_cart_merged_at_login(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.products[0], quantity=1)
+        token = self.add(self.products[0], 2)[GUEST_HEADER]
+        self.add(self.products[2], 1, **{GUEST_HEADER: token})
+
+        response = self.client.post(
+            reverse('login'), {'email': 'user@example.com', 'password': 'pass12345'}, headers={GUEST_HEADER: token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(cart.items.values_list('product_id', 'quantity')),
+                         {self.products[0].pk: 3, self.products[2].pk: 1})
+        self.assertEqual(self.client.get(reverse('cart'), headers={GUEST_HEADER: token}).data['items'], [])
+
+    @override_settings(CART_STORAGE='cache')
+    def test_cache_storage_writes_behind(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch('cart.storage.schedule_flush') as schedule_flush:
+            self.add(self.products[0], 2)
+            self.client.patch(reverse('cart'), {'operations': [{'op': 'add', 'product': self.products[1].pk}]}, format='json')
+        self.assertEqual(schedule_flush.call_count, 2)
+        self.assertFalse(CartItem.objects.exists())
+        cached = self.client.get(reverse('cart')).data
+
+        owner = CartOwner(user=self.user)
+        CacheCartStorage().flush(owner)
+        self.assertEqual(dict(CartItem.objects.values_list('product_id', 'quantity')),
+                         {self.products[0].pk: 2, self.products[1].pk: 1})
+        with override_settings(CART_STORAGE='db'):
+            stored = self.client.get(reverse('cart')).data
+        # Keshdagi qator id si — mahsulot id si
+        self.assertEqual([item['id'] for item in cached['items']], [self.products[0].pk, self.products[1].pk])
+        for item in cached['items'] + stored['items']:
+            item['id'] = None
+        stored['id'] = None
+        self.assertEqual(cached, stored)
+
+    @override_settings(CART_STORAGE='cache')
+    def test_cache_storage_item_endpoints(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch('cart.storage.schedule_flush'):
+            self.add(self.products[0], 2)
+            self.add(self.products[1], 1)
+            first, second = [item['id'] for item in self.client.get(reverse('cart')).data['items']]
+
+            response = self.client.put(reverse('cart_item_update_delete', args=[first]), {'quantity': 5}, format='json')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.delete(reverse('cart_item_update_delete', args=[second]))
+            self.assertEqual(response.status_code, 204)
+            response = self.client.delete(reverse('cart_item_update_delete', args=[second]))
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual([(item['id'], item['quantity']) for item in self.client.get(reverse('cart')).data['items']],
+                         [(self.products[0].pk, 5)])
+
+        CacheCartStorage().flush(CartOwner(user=self.user))
+        self.assertEqual(dict(CartItem.objects.values_list('product_id', 'quantity')), {self.products[0].pk: 5})
+
+    @override_settings(CART_STORAGE='cache')
+    @mock.patch('cart.storage.LOCK_WAIT', 0)
+    def test_lock_held_elsewhere_is_not_stolen(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch('cart.storage.schedule_flush'):
+            self.add(self.products[0], 2)
+        owner = CartOwner(user=self.user)
+        storage = CacheCartStorage()
+        lock_key = f'{owner.key}:lock'
+        storage.cache.set(lock_key, 'other')
+        self.addCleanup(storage.cache.delete, lock_key)
+
+        # flush bazaga qulfsiz yozmaydi, boshqa so‘rov qulfi o‘chirilmaydi
+        with self.assertRaises(CartBusy):
+            storage.flush(owner)
+        self.assertFalse(CartItem.objects.exists())
+        response = self.add(self.products[1], 1)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(storage.cache.get(lock_key), 'other')
+        self.assertEqual(storage.lines(owner), {self.products[0].pk: 2})
+
+    @override_settings(CART_STORAGE='cache')
+    def test_checkout_drains_cache(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch('cart.storage.schedule_flush'):
+            self.add(self.products[0], 2)
+        order = checkout(self.user)
+        self.assertEqual(order.item_count, 2)
+        owner = CartOwner(user=self.user)
+        storage = CacheCartStorage()
+        # Kechikkan fon flush checkout tozalagan savatni qaytarmaydi
+        storage.flush(owner)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(storage.lines(owner), {})
+        self.assertIsNone(storage.cache.get(f'{owner.key}:lock'))
+
+
+class CartCleanupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        products = create_products(2)
+        cls.carts = []
+        for i in range(5):
+            user = User.objects.create_user(email=f'user{i}@example.com', phone=f'+99890000020{i}', password='pass12345')
+            cart = Cart.objects.create(user=user)
+            for product in products:
+                CartItem.objects.create(cart=cart, product=product, quantity=1)
+            cls.carts.append(cart)
+        Cart.objects.filter(pk__in=[cart.pk for cart in cls.carts[:3]]).update(updated_at=timezone.now() - timedelta(days=40))
+
+    def cleanup(self, *args):
+        out = io.StringIO()
+        call_command('cleanup_carts', '--days=30', '--batch-size=2', '--pause=0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_only_reports(self):
+        output = self.cleanup('--dry-run')
+        self.assertIn("Jami: 3 savat, 6 element", output)
+        self.assertEqual(Cart.objects.count(), 5)
+
+    def test_deletes_in_batches(self):
+        output = self.cleanup()
+        self.assertIn("1-partiya: 2 savat, 4 element", output)
+        self.assertIn("2-partiya: 1 savat, 2 element", output)
+        self.assertEqual(set(Cart.objects.values_list('pk', flat=True)), {cart.pk for cart in self.carts[3:]})
+        self.assertEqual(CartItem.objects.count(), 4)
+
+    def test_cart_changes_mark_activity(self):
+        cart = self.carts[0]
+        client = APIClient()
+        client.force_authenticate(cart.user)
+        client.patch(reverse('cart'), {'operations': [{'op': 'add', 'product': cart.items.first().product_id}]}, format='json')
+        self.assertIn("Jami: 2 savat", self.cleanup('--dry-run'))
@@ -1,82 +1,121 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 
-from cart.models import Cart, CartItem
-from cart.serializers import CartSerializer, CartItemCreateUpdateSerializer
+from shop_api.fieldsets import FIELDSET_PARAMETERS, fieldset_options
+
+from cart.serializers import CartBatchSerializer, CartSerializer, CartItemCreateUpdateSerializer, CartItemQuantitySerializer
+from cart.storage import GUEST_HEADER, cart_from_lines, cart_owner, get_cart_storage
+
+GUEST_TOKEN_PARAMETER = OpenApiParameter(
+    name=GUEST_HEADER, location=OpenApiParameter.HEADER, required=False, type=str,
+    description="Mehmon savati tokeni: birinchi o‘zgarishda javob sarlavhasida beriladi, login qilganda savat foydalanuvchiga o‘tadi",
+)
 
 @extend_schema(tags=['Savat'])
 class CartView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
 
-    def get_cart(self, user):
-        cart, created = Cart.objects.get_or_create(user=user)
-        return cart
+    def respond(self, owner, data, status_code=status.HTTP_200_OK):
+        response = Response(data, status=status_code)
+        if owner.is_guest:
+            response[GUEST_HEADER] = owner.token
+        return response
 
     @extend_schema(
+        parameters=[GUEST_TOKEN_PARAMETER, *FIELDSET_PARAMETERS],
         responses=CartSerializer,
         summary="Savatni ko‘rish",
-        description="Joriy foydalanuvchining savatini ko‘rsatadi."
+        description="Joriy foydalanuvchining (yoki X-Cart-Token bo‘yicha mehmonning) savatini ko‘rsatadi."
     )
     def get(self, request):
-        cart = self.get_cart(request.user)
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        owner = cart_owner(request)
+        if owner is None:
+            # Token yo‘q mehmon: bo‘sh savat, hech narsa yaratilmaydi
+            return Response(CartSerializer(cart_from_lines({}), **fieldset_options(request.query_params)).data)
+        return self.render_cart(request, owner)
+
+    def render_cart(self, request, owner):
+        fieldsets = fieldset_options(request.query_params)
+        cart = get_cart_storage(owner).load(owner, **fieldsets)
+        return self.respond(owner, CartSerializer(cart, **fieldsets).data)
 
     @extend_schema(
         request=CartItemCreateUpdateSerializer,
+        parameters=[GUEST_TOKEN_PARAMETER],
         responses={201: OpenApiResponse(description="Mahsulot savatga qo‘shildi")},
         summary="Mahsulot qo‘shish",
-        description="Foydalanuvchining savatiga yangi mahsulot qo‘shadi yoki mavjudining miqdorini oshiradi."
+        description="Savatga yangi mahsulot qo‘shadi yoki mavjudining miqdorini oshiradi."
     )
     def post(self, request):
-        cart = self.get_cart(request.user)
         serializer = CartItemCreateUpdateSerializer(data=request.data)
         if serializer.is_valid():
-            product = serializer.validated_data['product']
-            quantity = serializer.validated_data['quantity']
-
-            cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-            if not created:
-                cart_item.quantity += quantity
-            else:
-                cart_item.quantity = quantity
-            cart_item.save()
-            return Response({"detail": "Mahsulot savatga qo‘shildi"}, status=status.HTTP_201_CREATED)
+            owner = cart_owner(request, create=True)
+            operation = {
+                'op': 'add',
+                'product': serializer.validated_data['product'].pk,
+                'quantity': serializer.validated_data.get('quantity', 1),
+            }
+            # Bazada bitta atomar so‘rov: yangi qator yoki quantity = quantity + n
+            get_cart_storage(owner).apply(owner, [operation])
+            return self.respond(owner, {"detail": "Mahsulot savatga qo‘shildi"}, status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        request=CartBatchSerializer,
+        parameters=[
+            GUEST_TOKEN_PARAMETER,
+            OpenApiParameter(name='summary', description="Savat o‘rniga faqat natija: total_price, item_count va o‘zgargan qatorlar soni", required=False, type=bool),
+            *FIELDSET_PARAMETERS,
+        ],
+        responses=CartSerializer,
+        summary="Savatni bir so‘rovda o‘zgartirish",
+        description="operations ro‘yxatidagi amallarni (add, set, remove) bitta tranzaksiyada bajaradi va yangi savatni qaytaradi. "
+                    "set da quantity=0 — mahsulotni o‘chirish. Mahsulotlar bitta so‘rov bilan tekshiriladi."
+    )
+    def patch(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        owner = cart_owner(request, create=True)
+        storage = get_cart_storage(owner)
+        result = storage.apply(owner, serializer.validated_data['operations'])
+        if request.query_params.get('summary') in ('1', 'true', 'True'):
+            totals = storage.load(owner, fields={'total_price': {}, 'item_count': {}}).totals
+            return self.respond(owner, {**totals, **result})
+        return self.render_cart(request, owner)
+
 @extend_schema(tags=['Savat'])
 class CartItemUpdateDeleteView(APIView):
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
-        request=CartItemCreateUpdateSerializer,
+        request=CartItemQuantitySerializer,
         responses={200: OpenApiResponse(description="Miqdor yangilandi")},
         summary="Savatdagi mahsulot miqdorini yangilash",
-        description="Foydalanuvchi savatidagi tanlangan mahsulot miqdorini yangilaydi."
+        description="Foydalanuvchi savatidagi tanlangan mahsulot miqdorini yangilaydi. "
+                    "pk — savat javobidagi element id si (CART_STORAGE=cache da mahsulot id si)."
     )
     def put(self, request, pk):
-        try:
-            item = CartItem.objects.get(pk=pk, cart__user=request.user)
-        except CartItem.DoesNotExist:
+        serializer = CartItemQuantitySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Qator storage orqali: bazada id — CartItem.pk, keshda (CART_STORAGE=cache) — mahsulot id si
+        owner = cart_owner(request)
+        if not get_cart_storage(owner).update_item(owner, pk, serializer.validated_data['quantity']):
             return Response({"detail": "Mahsulot savatda topilmadi"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = CartItemCreateUpdateSerializer(item, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response({"detail": "Miqdor yangilandi"})
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"detail": "Miqdor yangilandi"})
 
     @extend_schema(
         responses={204: OpenApiResponse(description="Mahsulot o‘chirildi")},
         summary="Mahsulotni o‘chirish",
-        description="Foydalanuvchi savatidan mahsulotni o‘chiradi."
+        description="Foydalanuvchi savatidan mahsulotni o‘chiradi. "
+                    "pk — savat javobidagi element id si (CART_STORAGE=cache da mahsulot id si)."
     )
     def delete(self, request, pk):
-        try:
-            item = CartItem.objects.get(pk=pk, cart__user=request.user)
-        except CartItem.DoesNotExist:
+        owner = cart_owner(request)
+        if not get_cart_storage(owner).remove_item(owner, pk):
             return Response({"detail": "Mahsulot savatda topilmadi"}, status=status.HTTP_404_NOT_FOUND)
-        item.delete()
         return Response({"detail": "Mahsulot o‘chirildi"}, status=status.HTTP_204_NO_CONTENT)
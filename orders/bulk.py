@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.utils import timezone
+
+from orders.filters import filter_orders
+from orders.models import Order
+
+
+def target_orders(data):
+    if 'ids' in data:
+        return Order.objects.filter(pk__in=data['ids'])
+    return filter_orders(Order.objects.all(), data['filter'])
+
+
+def apply_status_transition(data):
+    """
+    Tanlangan buyurtmalarni yangi holatga o‘tkazadi.
+
+    O‘tish qoidasi SQL da tekshiriladi: bitta UPDATE ... WHERE status IN
+    (oldingi holatlar). id lar ro‘yxatida tanlangan qatorlar avval qulflanadi
+    (PostgreSQL da SELECT ... FOR UPDATE) va UPDATE pk__in bo‘yicha. Filtrda
+    UPDATE filtrlangan querysetning o‘zida — id lar Pythonga olinmaydi
+    (SQLite da so‘rov parametrlari soni cheklangan), faqat o‘tkazib
+    yuborilganlar hisobot uchun qulflanib o‘qiladi.
+    """
+    new_status = data['status']
+    allowed = Order.STATUS_TRANSITIONS[new_status]
+    # updated_at — savdo rolluplari o‘zgargan buyurtmalarni shu bo‘yicha topadi
+    changes = {'status': new_status, 'updated_at': timezone.now()}
+    with transaction.atomic():
+        if 'ids' in data:
+            current = dict(target_orders(data).select_for_update().values_list('pk', 'status'))
+            updated = Order.objects.filter(pk__in=list(current), status__in=allowed).update(**changes)
+            rejected = {pk: old_status for pk, old_status in current.items() if old_status not in allowed}
+            matched = len(current)
+        else:
+            orders = target_orders(data)
+            rejected = dict(orders.exclude(status__in=allowed).select_for_update().values_list('pk', 'status'))
+            updated = orders.filter(status__in=allowed).update(**changes)
+            matched = updated + len(rejected)
+
+    skipped = [
+        {"id": pk, "status": old_status, "detail": f"{old_status} -> {new_status} o‘tishi mumkin emas"}
+        for pk, old_status in sorted(rejected.items())
+    ]
+    if 'ids' in data:
+        skipped += [{"id": pk, "detail": "Buyurtma topilmadi"} for pk in dict.fromkeys(data['ids']) if pk not in current]
+    return {"status": new_status, "matched": matched, "updated": updated, "skipped": skipped}
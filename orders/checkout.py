@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from django.db import transaction
+
+from cart.models import Cart, CartItem, touch_cart
+from cart.storage import CartOwner, get_cart_storage
+from orders.models import Order, OrderItem
+
+
+class EmptyCart(Exception):
+    pass
+
+
+def checkout(user):
+    """
+    Foydalanuvchi savatidan buyurtma yaratadi — bitta tranzaksiya, savat hajmiga bog‘liq bo‘lmagan so‘rovlar soni.
+
+    Checkout savat egasi qulfi (storage.drained) va select_for_update ostida:
+    bir vaqtdagi ikkinchi checkout birinchisi tugashini kutadi va bo‘sh savatni
+    ko‘radi (takroriy buyurtma yo‘q). SQLite da select_for_update hech narsa
+    qilmaydi, navbatni qulf ta’minlaydi.
+    Narx, nom va summalar snapshot sifatida yoziladi; OrderItem lar bitta
+    bulk_create, savat bitta DELETE bilan tozalanadi.
+    """
+    owner = CartOwner(user=user)
+    storage = get_cart_storage(owner)
+    # Checkout tugaguncha savat qulflangan; CART_STORAGE=cache da keshdagi qatorlar avval bazaga yoziladi
+    with storage.drained(owner), transaction.atomic():
+        cart_id = Cart.objects.select_for_update().filter(user=user).values_list('pk', flat=True).first()
+        lines = list(
+            CartItem.objects.filter(cart_id=cart_id).order_by('pk')
+            .values_list('product_id', 'quantity', 'product__price', 'product__name')
+        ) if cart_id else []
+        if not lines:
+            raise EmptyCart
+        items = [
+            OrderItem(product_id=product_id, quantity=quantity, unit_price=price,
+                      line_total=price * quantity, product_name=name)
+            for product_id, quantity, price, name in lines
+        ]
+        order = Order.objects.create(
+            user=user,
+            total=sum((item.line_total for item in items), Decimal('0.00')),
+            item_count=sum(item.quantity for item in items),
+        )
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+        CartItem.objects.filter(cart_id=cart_id).delete()
+        touch_cart(cart_id)
+    return order
@@ -0,0 +1,22 @@
+# Kursor kaliti: id oxirgi, shunda bir xil created_at li buyurtmalar ham barqaror tartibda
+ORDER_ORDERING = ['-created_at', '-id']
+
+
+def filter_orders(queryset, filters):
+    """
+    OrderFilterSerializer ning validated_data si bo‘yicha filtrlar.
+
+    Indekslar: status + created_at, user (+ status) + created_at; min_total
+    tanlangan indeks qatorlari ustida tekshiriladi.
+    """
+    if 'status' in filters:
+        queryset = queryset.filter(status=filters['status'])
+    if 'user' in filters:
+        queryset = queryset.filter(user_id=filters['user'])
+    if 'created_from' in filters:
+        queryset = queryset.filter(created_at__gte=filters['created_from'])
+    if 'created_to' in filters:
+        queryset = queryset.filter(created_at__lte=filters['created_to'])
+    if 'min_total' in filters:
+        queryset = queryset.filter(total__gte=filters['min_total'])
+    return queryset
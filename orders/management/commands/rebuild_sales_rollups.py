@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from orders.rollups import CHUNK_DAYS, WORKERS, rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Savdo rolluplarini butun tarix bo‘yicha kunlik bo‘laklarda parallel qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-days', type=int, default=CHUNK_DAYS, help="Bitta bo‘lakdagi kunlar soni")
+        parser.add_argument('--workers', type=int, default=WORKERS, help="Parallel oqimlar soni (0 — shu oqimda)")
+
+    def handle(self, *args, **options):
+        chunks = products = categories = 0
+        for result in rebuild_sales_rollups(options['chunk_days'], options['workers']):
+            chunks += 1
+            products += result['products']
+            categories += result['categories']
+            self.stdout.write(
+                f"{result['first']} — {result['last']}: {result['products']} mahsulot, "
+                f"{result['categories']} toifa qatori ({result['seconds'] * 1000:.1f} ms)"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Jami: {chunks} bo‘lak, {products} mahsulot va {categories} toifa qatori"
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from orders.rollups import update_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Savdo rolluplarini watermark dan keyin o‘zgargan buyurtmalar kunlari bo‘yicha yangilaydi (cron uchun)"
+
+    def handle(self, *args, **options):
+        result = update_sales_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['days']} kun ({result['ranges']} oraliq) qayta hisoblandi, watermark: {result['watermark']:%Y-%m-%d %H:%M:%S}"
+        ))
@@ -0,0 +1,57 @@
+from django.db import migrations, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+CHUNK_SIZE = 1000
+
+
+def chunks(queryset):
+    """pk tartibida CHUNK_SIZE talik id ro‘yxatlari"""
+    last_pk = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:CHUNK_SIZE])
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def backfill(apps, schema_editor):
+    """Mavjud buyurtmalar uchun snapshotlar: hozirgi mahsulot narxi/nomi (checkoutdagi narx saqlanmagan)"""
+    Product = apps.get_model('products', 'Product')
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    product = Product.objects.filter(pk=OuterRef('product_id'))
+    items = OrderItem.objects.filter(order_id=OuterRef('pk')).order_by().values('order_id')
+
+    # Har bir bo‘lak alohida tranzaksiyada: katta jadvalda qulflar qisqa
+    for ids in chunks(OrderItem.objects.filter(line_total__isnull=True)):
+        with transaction.atomic():
+            OrderItem.objects.filter(pk__in=ids).update(
+                unit_price=Coalesce('unit_price', Subquery(product.values('price')[:1])),
+                product_name=Subquery(product.values('name')[:1]),
+            )
+            OrderItem.objects.filter(pk__in=ids).update(line_total=ExpressionWrapper(
+                F('unit_price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)
+            ))
+
+    for ids in chunks(Order.objects.all()):
+        with transaction.atomic():
+            Order.objects.filter(pk__in=ids).update(
+                total=Coalesce(Subquery(items.annotate(sum=Sum('line_total')).values('sum')), 0,
+                               output_field=DecimalField(max_digits=12, decimal_places=2)),
+                item_count=Coalesce(Subquery(items.annotate(sum=Sum('quantity')).values('sum')), 0),
+            )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('orders', '0006_order_snapshots'),
+        ('products', '0008_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.conf import settings
-from products.models import Product
+from products.models import Category, Product
 # Create your models here.
 
 class Order(models.Model):
@@ -10,10 +10,30 @@ class Order(models.Model):
         ('shipped', 'Jo\'natildi'),
         ('delivered', 'Yetkazildi'),
     ]
+    # Ommaviy o‘zgartirishda ruxsat etilgan o‘tishlar: yangi holat -> oldingi holatlar
+    STATUS_TRANSITIONS = {
+        'shipped': ['processing'],
+        'delivered': ['shipped'],
+    }
     
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='orders', on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='processing', db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Holat o‘zgarganda ham yangilanadi: savdo rolluplari shu bo‘yicha yangilanadi (orders.rollups)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Checkout paytida to‘ldiriladi: ro‘yxatlar mahsulot jadvaliga murojaat qilmaydi
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # Foydalanuvchi buyurtmalari: user (+ status) filtri, created_at bo‘yicha tartib
+        # Admin ro‘yxati: filtrsiz yoki status filtri bilan (created_at, id) kursori
+        indexes = [
+            models.Index(fields=['user', 'status', 'created_at'], name='order_user_status_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
     
     def __str__(self):
         return f"Buyurtma #{self.id} {self.user.email}"
@@ -23,6 +43,62 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
     product = models.ForeignKey(Product, related_name='order_items', on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Checkout paytidagi holat (keyin mahsulot narxi yoki nomi o‘zgarsa ham saqlanadi)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, editable=False)
+    product_name = models.CharField(max_length=200, blank=True)
+
+    def save(self, *args, **kwargs):
+        # Checkoutdan tashqari (masalan, admin) yaratilganda snapshot mahsulotdan olinadi
+        if self.unit_price is None or not self.product_name:
+            self.unit_price = self.product.price if self.unit_price is None else self.unit_price
+            self.product_name = self.product_name or self.product.name
+        self.line_total = self.unit_price * self.quantity
+        super().save(*args, **kwargs)
     
     def __str__(self):
-        return f"{self.product.name} {self.quantity}x"
\ No newline at end of file
+        return f"{self.product_name} {self.quantity}x"
+
+
+class DailyProductSales(models.Model):
+    """Kun × mahsulot × holat bo‘yicha savdo (orders.rollups yangilaydi, hisobotlar shundan o‘qiydi)"""
+    day = models.DateField()
+    # Tarixiy savdo mahsulot o‘chirilgandan keyin ham qoladi (hisobotlar nomsiz ko‘rsatadi)
+    product = models.ForeignKey(Product, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product', 'status'], name='unique_day_product_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} #{self.product_id} {self.status}: {self.revenue}"
+
+
+class DailyCategorySales(models.Model):
+    """Kun × toifa × holat bo‘yicha savdo (mahsulotning joriy toifasi bo‘yicha)"""
+    day = models.DateField()
+    category = models.ForeignKey(Category, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'status'], name='unique_day_category_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} #{self.category_id} {self.status}: {self.revenue}"
+
+
+class RollupWatermark(models.Model):
+    """Rollup qaysi vaqtgacha (Order.updated_at) yangilangani"""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
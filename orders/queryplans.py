@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+from orders.filters import ORDER_ORDERING
+from orders.models import Order
+from shop_api.queryplans import HotQuery
+
+PAGE_SIZE = 10
+
+
+def user_orders(**filters):
+    """OrderListCreateView sahifasi bilan bir xil filtr, tartib va LIMIT"""
+    def build():
+        return Order.objects.filter(user=1, **filters).order_by(*ORDER_ORDERING)[:PAGE_SIZE]
+    return build
+
+
+def admin_orders(**filters):
+    """AdminOrderListView sahifasi: barcha foydalanuvchilar, (created_at, id) kursori"""
+    def build():
+        return Order.objects.filter(**filters).order_by(*ORDER_ORDERING)[:PAGE_SIZE]
+    return build
+
+
+HOT_QUERIES = [
+    HotQuery('user', user_orders()),
+    HotQuery('user + status', user_orders(status='shipped')),
+    HotQuery('admin', admin_orders()),
+    HotQuery('admin + status', admin_orders(status='shipped')),
+    HotQuery('admin + created_at', admin_orders(created_at__gte=datetime(2026, 1, 1, tzinfo=timezone.utc))),
+]
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.db.models import Sum
+from rest_framework.fields import DecimalField
+
+from orders.models import DailyCategorySales, DailyProductSales
+from products.models import Category, Product
+from products.taxonomy import taxonomy
+
+TOTALS = {'units': Sum('units'), 'revenue': Sum('revenue')}
+
+# Order.total kabi satr ko‘rinishida (SQLite SUM natijasi kasr qismini yo‘qotishi mumkin)
+_money = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _rollups(model, filters):
+    rows = model.objects.filter(day__range=(filters['date_from'], filters['date_to']))
+    if 'status' in filters:
+        rows = rows.filter(status=filters['status'])
+    return rows
+
+
+def _totals(row):
+    return {"units": row.get('units') or 0, "revenue": _money.to_representation(row.get('revenue') or 0)}
+
+
+def sales_timeseries(filters):
+    """Kunlik savdo (kichikroq toifa rollupidan); savdosiz kunlar nol bilan"""
+    rows = _rollups(DailyCategorySales, filters).values('day').annotate(**TOTALS).order_by()
+    by_day = {row['day']: row for row in rows}
+    day, result = filters['date_from'], []
+    while day <= filters['date_to']:
+        result.append({"day": day, **_totals(by_day.get(day, {}))})
+        day += timedelta(days=1)
+    return result
+
+
+def top_products(filters):
+    """Tushum bo‘yicha eng ko‘p sotilgan mahsulotlar; nomlar pk bo‘yicha bitta so‘rov bilan"""
+    rows = list(
+        _rollups(DailyProductSales, filters).values('product_id').annotate(**TOTALS)
+        .order_by('-revenue', 'product_id')[:filters['limit']]
+    )
+    names = dict(Product.objects.filter(pk__in=[row['product_id'] for row in rows]).values_list('pk', 'name'))
+    return [
+        {"product": {"id": row['product_id'], "name": names.get(row['product_id'])}, **_totals(row)}
+        for row in rows
+    ]
+
+
+def category_breakdown(filters):
+    """Toifalar bo‘yicha savdo; nomlar jarayon ichidagi keshdan"""
+    rows = _rollups(DailyCategorySales, filters).values('category_id').annotate(**TOTALS).order_by('-revenue', 'category_id')
+    result = []
+    for row in rows:
+        category = taxonomy.row(Category, row['category_id'])
+        result.append({
+            "category": {"id": row['category_id'], "name": category['name'] if category else None},
+            **_totals(row),
+        })
+    return result
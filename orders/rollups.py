@@ -0,0 +1,152 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from django.db import connections, transaction
+from django.db.models import F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import DailyCategorySales, DailyProductSales, Order, OrderItem, RollupWatermark
+
+WATERMARK = 'sales'
+# Kech commit bo‘lgan tranzaksiyalar uchun: watermark dan biroz oldingi o‘zgarishlar ham qayta olinadi
+OVERLAP = timedelta(minutes=5)
+CHUNK_DAYS = 31
+WORKERS = 4
+BATCH_SIZE = 1000
+
+
+def day_start(day):
+    """Kun boshi joriy vaqt zonasida (TruncDate bilan bir xil chegaralar)"""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def day_ranges(days):
+    """Tartiblangan kunlardan ketma-ket oraliqlar: [(birinchi, oxirgi), ...]"""
+    ranges = []
+    for day in days:
+        if ranges and day - ranges[-1][1] == timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def compute_range(first_day, last_day):
+    """[first_day, last_day] kunlari rollup qatorlari orders_orderitem dan (faqat o‘qish)"""
+    items = OrderItem.objects.filter(
+        order__created_at__gte=day_start(first_day),
+        order__created_at__lt=day_start(last_day + timedelta(days=1)),
+    )
+    totals = {'units': Sum('quantity'), 'revenue': Sum('line_total')}
+    day = TruncDate('order__created_at')
+    products = items.values('product_id', day=day, status=F('order__status')).annotate(**totals).order_by()
+    categories = items.values(day=day, status=F('order__status'), category_id=F('product__category_id')) \
+        .annotate(**totals).order_by()
+    return list(products), list(categories)
+
+
+def write_range(first_day, last_day, products, categories):
+    """Oraliq bitta tranzaksiyada almashtiriladi: hisobotlar yarim yozilgan kunni ko‘rmaydi"""
+    with transaction.atomic():
+        DailyProductSales.objects.filter(day__range=(first_day, last_day)).delete()
+        DailyCategorySales.objects.filter(day__range=(first_day, last_day)).delete()
+        product_rows = DailyProductSales.objects.bulk_create(
+            [DailyProductSales(**row) for row in products], batch_size=BATCH_SIZE
+        )
+        category_rows = DailyCategorySales.objects.bulk_create(
+            [DailyCategorySales(**row) for row in categories], batch_size=BATCH_SIZE
+        )
+    return {'first': first_day, 'last': last_day, 'products': len(product_rows), 'categories': len(category_rows)}
+
+
+def recompute_range(first_day, last_day):
+    """
+    [first_day, last_day] kunlari rolluplarini orders_orderitem dan qayta yozadi.
+
+    Oraliq buyurtmalari created_at indeksi bo‘yicha topiladi.
+    """
+    return write_range(first_day, last_day, *compute_range(first_day, last_day))
+
+
+def get_watermark():
+    return RollupWatermark.objects.filter(name=WATERMARK).values_list('value', flat=True).first()
+
+
+def set_watermark(value):
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': value})
+
+
+def update_sales_rollups(now=None):
+    """
+    Inkremental yangilash: watermark dan keyin yaratilgan yoki holati
+    o‘zgargan buyurtmalarning kunlarigina qayta hisoblanadi.
+
+    Kun to‘liq qayta yoziladi, shuning uchun takroriy ishga tushirish xavfsiz
+    (OVERLAP ham shunga tayanadi). O‘chirilgan buyurtmalar aniqlanmaydi —
+    ular rebuild_sales_rollups da hisobga olinadi.
+    """
+    now = now or timezone.now()
+    watermark = get_watermark()
+    changed = Order.objects.all()
+    if watermark is not None:
+        changed = changed.filter(updated_at__gt=watermark - OVERLAP)
+    days = sorted(set(changed.annotate(day=TruncDate('created_at')).values_list('day', flat=True).order_by()))
+
+    ranges = day_ranges(days)
+    for first_day, last_day in ranges:
+        recompute_range(first_day, last_day)
+    set_watermark(now)
+    return {'days': len(days), 'ranges': len(ranges), 'watermark': now}
+
+
+def _compute_in_worker(first_day, last_day):
+    started = time.monotonic()
+    try:
+        return compute_range(first_day, last_day), time.monotonic() - started
+    finally:
+        connections.close_all()
+
+
+def rebuild_sales_rollups(chunk_days=CHUNK_DAYS, workers=WORKERS):
+    """
+    Butun tarixni chunk_days kunlik bo‘laklarda qayta hisoblaydi (generator).
+
+    Bo‘laklar bir-biriga bog‘liq emas: workers ta oqim ularni parallel
+    hisoblaydi (faqat o‘qish), yozish esa shu oqimda — SQLite bir vaqtda
+    bitta yozuvchiga ruxsat beradi (workers=0 — hammasi shu oqimda).
+    Watermark boshlanish vaqtiga o‘rnatiladi: rebuild davomidagi
+    o‘zgarishlarni keyingi inkremental yangilash oladi.
+    """
+    started = timezone.now()
+    bounds = Order.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+    chunks = []
+    if bounds['first'] is not None:
+        first = timezone.localtime(bounds['first']).date()
+        last = timezone.localtime(bounds['last']).date()
+        while first <= last:
+            chunk_last = min(first + timedelta(days=chunk_days - 1), last)
+            chunks.append((first, chunk_last))
+            first = chunk_last + timedelta(days=1)
+
+    # Buyurtmalar oralig‘idan tashqaridagi eski qatorlar
+    outside = Q()
+    if chunks:
+        outside = Q(day__lt=chunks[0][0]) | Q(day__gt=chunks[-1][1])
+    DailyProductSales.objects.filter(outside).delete()
+    DailyCategorySales.objects.filter(outside).delete()
+
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sales-rollup') as executor:
+            futures = {executor.submit(_compute_in_worker, *chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                rows, seconds = future.result()
+                started_write = time.monotonic()
+                result = write_range(*futures[future], *rows)
+                yield dict(result, seconds=seconds + time.monotonic() - started_write)
+    else:
+        for chunk in chunks:
+            chunk_started = time.monotonic()
+            yield dict(recompute_range(*chunk), seconds=time.monotonic() - chunk_started)
+    set_watermark(started)
@@ -1,20 +1,28 @@
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
 from orders.models import Order, OrderItem
 from products.serializers import ProductSerializer
+from shop_api.fieldsets import DynamicFieldsMixin
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
+    # Mahsulot standart holatda qisqa: id, name, price, image (?expand=items.product — to‘liq)
+    summarized_fields = ['product']
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'quantity']
+        fields = ['id', 'product', 'product_name', 'quantity', 'unit_price', 'line_total']
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
+    # Admin ro‘yxatidagi qisqa ko‘rinish: faqat orders_order ustunlari
+    summary_fields = ['id', 'status', 'created_at', 'total', 'item_count']
 
     class Meta:
         model = Order
-        fields = ['id', 'status', 'created_at', 'items']
+        fields = ['id', 'status', 'created_at', 'total', 'item_count', 'items']
 
 class OrderCreateSerializer(serializers.Serializer):
     confirm = serializers.BooleanField()  # tasdiqlash uchun
@@ -22,3 +30,64 @@ class OrderCreateSerializer(serializers.Serializer):
 
 class OrderStatusUpdateSerializer(serializers.Serializer):
     status = serializers.ChoiceField(choices=['processing', 'shipped', 'delivered'])
+
+
+class DateBoundaryField(serializers.DateTimeField):
+    """Sana yoki vaqt; faqat sana berilsa kun boshi (end_of_day=True da kun oxiri)"""
+
+    def __init__(self, end_of_day=False, **kwargs):
+        self.end_of_day = end_of_day
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, value):
+        try:
+            day = date.fromisoformat(value)
+        except (TypeError, ValueError):
+            return super().to_internal_value(value)
+        moment = datetime.combine(day, time.max if self.end_of_day else time.min)
+        return self.enforce_timezone(moment)
+
+
+class OrderFilterSerializer(serializers.Serializer):
+    """Admin buyurtmalar ro‘yxati filtrlari (query parametrlari)"""
+    status = serializers.ChoiceField(choices=['processing', 'shipped', 'delivered'], required=False)
+    user = serializers.IntegerField(min_value=1, required=False)
+    created_from = DateBoundaryField(required=False)
+    created_to = DateBoundaryField(end_of_day=True, required=False)
+    min_total = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filter = OrderFilterSerializer(required=False)
+    status = serializers.ChoiceField(choices=list(Order.STATUS_TRANSITIONS))
+
+    def validate_filter(self, value):
+        if not value:
+            raise serializers.ValidationError("Kamida bitta filtr berilishi kerak")
+        return value
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("ids yoki filter dan faqat bittasi berilishi kerak")
+        return attrs
+
+
+class SalesReportSerializer(serializers.Serializer):
+    """Savdo hisobotlari parametrlari; sana berilmasa oxirgi DEFAULT_DAYS kun"""
+    DEFAULT_DAYS = 30
+    MAX_DAYS = 366
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=['processing', 'shipped', 'delivered'], required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        attrs.setdefault('date_to', timezone.localdate())
+        attrs.setdefault('date_from', attrs['date_to'] - timedelta(days=self.DEFAULT_DAYS - 1))
+        if attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from date_to dan keyin bo‘lishi mumkin emas")
+        if (attrs['date_to'] - attrs['date_from']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"Oraliq ko‘pi bilan {self.MAX_DAYS} kun bo‘lishi mumkin")
+        return attrs
@@ -1,3 +1,402 @@
-from django.test import TestCase
+import threading
+from datetime import date, datetime, timezone
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone as tz
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from cart.models import Cart, CartItem
+from orders.checkout import EmptyCart, checkout
+from orders.models import DailyCategorySales, DailyProductSales, Order, OrderItem
+from orders.queryplans import HOT_QUERIES
+from orders.rollups import OVERLAP, get_watermark, rebuild_sales_rollups, set_watermark, update_sales_rollups
+from orders.serializers import OrderSerializer
+from products.models import Product, Tag
+from products.tests import clear_caches, create_products
+from shop_api.fieldsets import fieldset_options
+from shop_api.queryplans import check_hot_queries
+from users.models import User
+
+
+def create_orders(user, count, products):
+    orders = []
+    for _ in range(count):
+        order = Order.objects.create(user=user, total=sum(p.price for p in products), item_count=len(products))
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1)
+        orders.append(order)
+    return orders
+
+
+class OrderQueryCountTests(TestCase):
+    """Buyurtma so‘rovlari soni sahifa va elementlar soniga bog‘liq bo‘lmasligi kerak"""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = [Tag.objects.create(name=f"teg{i}") for i in range(2)]
+        cls.products = create_products(5, tags=tags)
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+998900000002', password='pass12345')
+        cls.orders = create_orders(cls.user, 10, cls.products)
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_caches()
+
+    def count_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_order_list_constant_queries(self):
+        self.client.force_authenticate(self.user)
+        url = reverse('order_list_create')
+        self.assertEqual(self.count_queries(url, {'page_size': 1}), self.count_queries(url, {'page_size': 10}))
+
+    def test_order_detail_constant_queries(self):
+        self.client.force_authenticate(self.user)
+        small = create_orders(self.user, 1, self.products[:1])[0]
+        self.assertEqual(
+            self.count_queries(reverse('order_detail', args=[small.pk])),
+            self.count_queries(reverse('order_detail', args=[self.orders[0].pk])),
+        )
+
+    def test_admin_order_list_constant_queries(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse('admin_order_list')
+        few = self.count_queries(url)
+        create_orders(self.user, 10, self.products)
+        self.assertEqual(few, self.count_queries(url))
+
+
+class OrderCompiledSerializerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = [Tag.objects.create(name=f"teg{i}") for i in range(2)]
+        products = create_products(3, tags=tags)
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+        create_orders(cls.user, 3, products)
+        create_orders(cls.user, 1, products[:1])
+
+    def test_list_matches_model_serializer(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for params in ({}, {'expand': 'items.product'}, {'fields': 'id,items.product.name'}):
+            response = client.get(reverse('order_list_create'), dict(params, page_size=10))
+            options = fieldset_options(params)
+            orders = OrderSerializer.setup_eager_loading(Order.objects.filter(user=self.user).order_by('-created_at', '-id'), **options)
+            live = OrderSerializer(orders, many=True, **options).data
+            self.assertEqual(JSONRenderer().render(response.data['results']), JSONRenderer().render(live))
+
+
+class OrderListPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(2)
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+        cls.other = User.objects.create_user(email='other@example.com', phone='+998900000003', password='pass12345')
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+998900000002', password='pass12345')
+        cls.orders = create_orders(cls.user, 5, cls.products) + create_orders(cls.other, 2, cls.products[:1])
+        # Bir xil created_at: tartib id bo‘yicha barqaror bo‘lishi kerak
+        Order.objects.filter(pk__in=[order.pk for order in cls.orders[:3]]).update(created_at=datetime(2026, 3, 1, tzinfo=timezone.utc))
+        Order.objects.filter(pk=cls.orders[5].pk).update(status='shipped', created_at=datetime(2026, 1, 15, tzinfo=timezone.utc))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, url, params):
+        ids, cursor = [], ''
+        while cursor is not None:
+            response = self.client.get(url, dict(params, cursor=cursor))
+            self.assertEqual(response.status_code, 200)
+            ids += [order['id'] for order in response.data['results']]
+            cursor = response.data['next']
+        return ids
+
+    def test_user_list_cursor_pages(self):
+        self.client.force_authenticate(self.user)
+        expected = list(Order.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(self.walk(reverse('order_list_create'), {'page_size': 2}), expected)
+
+    def test_admin_list_summary_and_filters(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse('admin_order_list')
+        response = self.client.get(url)
+        self.assertEqual(list(response.data['results'][0]), ['id', 'status', 'created_at', 'total', 'item_count'])
+        self.assertIn('items', self.client.get(url, {'expand': 'items'}).data['results'][0])
+        self.assertEqual(len(self.walk(url, {'page_size': 3})), 7)
+
+        self.assertEqual(self.walk(url, {'user': self.other.pk, 'status': 'shipped'}), [self.orders[5].pk])
+        self.assertEqual(self.walk(url, {'created_from': '2026-01-15', 'created_to': '2026-03-01'}),
+                         [order.pk for order in reversed(self.orders[:3])] + [self.orders[5].pk])
+        self.assertEqual(len(self.walk(url, {'min_total': str(sum(p.price for p in self.products))})), 5)
+        self.assertEqual(self.client.get(url, {'created_from': 'kecha'}).status_code, 400)
+
+
+class OrderBulkStatusTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(2)
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+998900000002', password='pass12345')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.orders = create_orders(self.user, 6, self.products)
+        Order.objects.filter(pk__in=[order.pk for order in self.orders[4:]]).update(status='delivered')
+
+    def bulk(self, payload):
+        return self.client.post(reverse('admin_order_bulk_status'), payload, format='json')
+
+    def statuses(self):
+        return list(Order.objects.order_by('pk').values_list('status', flat=True))
+
+    def test_ids_skip_disallowed_and_missing(self):
+        ids = [order.pk for order in self.orders[:2]] + [self.orders[4].pk, 999999]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.bulk({'ids': ids, 'status': 'shipped'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['matched'], response.data['updated']), (3, 2))
+        self.assertEqual([(row['id'], row.get('status')) for row in response.data['skipped']],
+                         [(self.orders[4].pk, 'delivered'), (999999, None)])
+        self.assertEqual(self.statuses(), ['shipped', 'shipped', 'processing', 'processing', 'delivered', 'delivered'])
+        self.assertEqual(len([query for query in ctx.captured_queries if query['sql'].startswith('UPDATE')]), 1)
+
+    def test_filter_and_chained_transition(self):
+        response = self.bulk({'filter': {'status': 'processing'}, 'status': 'shipped'})
+        self.assertEqual((response.data['matched'], response.data['updated'], response.data['skipped']), (4, 4, []))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.bulk({'filter': {'user': self.user.pk}, 'status': 'delivered'})
+        self.assertEqual((response.data['matched'], response.data['updated'], len(response.data['skipped'])), (6, 4, 2))
+        # Filtrda UPDATE id lar ro‘yxatisiz, filtrning o‘zi bo‘yicha
+        update = next(query['sql'] for query in ctx.captured_queries if query['sql'].startswith('UPDATE'))
+        self.assertNotIn('"id" IN', update)
+        self.assertIn('"user_id" =', update)
+        self.assertEqual(set(self.statuses()), {'delivered'})
+
+    def test_rejects_invalid_payload(self):
+        self.assertEqual(self.bulk({'ids': [self.orders[0].pk], 'status': 'processing'}).status_code, 400)
+        self.assertEqual(self.bulk({'status': 'shipped'}).status_code, 400)
+        self.assertEqual(self.bulk({'filter': {}, 'status': 'shipped'}).status_code, 400)
+
+    def test_single_update_writes_status_only(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.put(reverse('admin_order_status_update', args=[self.orders[0].pk]), {'status': 'shipped'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        update = next(query['sql'] for query in ctx.captured_queries if query['sql'].startswith('UPDATE'))
+        self.assertNotIn('"total"', update)
+
+
+class SalesRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fruits = create_products(2)
+        cls.gadgets = create_products(1)
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+998900000002', password='pass12345')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        clear_caches()
+        # 1-mart: 2 ta buyurtma (meva), 3-mart: 1 ta (meva + texnika)
+        self.orders = create_orders(self.user, 2, self.fruits) + create_orders(self.user, 1, self.fruits[:1] + self.gadgets)
+        for order, day in zip(self.orders, (1, 1, 3)):
+            Order.objects.filter(pk=order.pk).update(created_at=datetime(2026, 3, day, 12, tzinfo=timezone.utc))
+
+    def rollup_rows(self):
+        return (
+            sorted(DailyProductSales.objects.values_list('day', 'product_id', 'status', 'units', 'revenue')),
+            sorted(DailyCategorySales.objects.values_list('day', 'category_id', 'status', 'units', 'revenue')),
+        )
+
+    def test_incremental_update_follows_status_changes(self):
+        update_sales_rollups()
+        fruit = self.fruits[0]
+        self.assertEqual(
+            DailyProductSales.objects.get(day=date(2026, 3, 1), product=fruit).revenue, fruit.price * 2
+        )
+        self.assertEqual(DailyCategorySales.objects.filter(day=date(2026, 3, 3)).count(), 2)
+
+        # Oldingi yangilash ancha oldin bo‘lgan: endi faqat holati o‘zgargan buyurtma olinadi
+        Order.objects.update(updated_at=tz.now() - 4 * OVERLAP)
+        set_watermark(tz.now() - 2 * OVERLAP)
+        self.client.post(reverse('admin_order_bulk_status'), {'ids': [self.orders[2].pk], 'status': 'shipped'}, format='json')
+        with CaptureQueriesContext(connection) as ctx:
+            result = update_sales_rollups()
+        # Faqat o‘zgargan buyurtma kuni qayta hisoblanadi
+        self.assertEqual(result['days'], 1)
+        self.assertTrue(any('2026-03-03' in query['sql'] for query in ctx.captured_queries if query['sql'].startswith('DELETE')))
+        self.assertEqual(set(DailyProductSales.objects.filter(day=date(2026, 3, 3)).values_list('status', flat=True)), {'shipped'})
+        self.assertEqual(set(DailyProductSales.objects.filter(day=date(2026, 3, 1)).values_list('status', flat=True)), {'processing'})
+
+        incremental = self.rollup_rows()
+        DailyProductSales.objects.update(units=0)
+        list(rebuild_sales_rollups(chunk_days=1, workers=0))
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_reports_read_only_rollups(self):
+        list(rebuild_sales_rollups(workers=0))
+        params = {'date_from': '2026-03-01', 'date_to': '2026-03-03'}
+        with CaptureQueriesContext(connection) as ctx:
+            series = self.client.get(reverse('admin_sales_report'), params).data['results']
+            top = self.client.get(reverse('admin_top_products_report'), dict(params, limit=1)).data['results']
+            categories = self.client.get(reverse('admin_category_report'), params).data['results']
+        self.assertFalse(any('orders_order' in query['sql'] and 'orders_orderitem' in query['sql'] for query in ctx.captured_queries))
+
+        fruit, gadget = self.fruits[0], self.gadgets[0]
+        self.assertEqual([(row['day'], row['units']) for row in series],
+                         [(date(2026, 3, 1), 4), (date(2026, 3, 2), 0), (date(2026, 3, 3), 2)])
+        self.assertEqual(series[2]['revenue'], str(fruit.price + gadget.price))
+        self.assertEqual((top[0]['product']['id'], top[0]['units'], top[0]['revenue']), (fruit.pk, 3, str(fruit.price * 3)))
+        self.assertEqual([row['category']['id'] for row in categories], [fruit.category_id, gadget.category_id])
+        self.assertEqual(self.client.get(reverse('admin_sales_report'), {'date_from': '2026-03-05', 'date_to': '2026-03-01'}).status_code, 400)
+
+    def test_rollups_outlive_bulk_deleted_product(self):
+        update_sales_rollups()
+        gadget = self.gadgets[0]
+        rows = DailyProductSales.objects.filter(product_id=gadget.pk).count()
+        self.assertTrue(rows)
+
+        response = self.client.post(reverse('product_bulk'), {'operation': 'delete', 'ids': [gadget.pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['affected'], 1)
+        self.assertEqual(DailyProductSales.objects.filter(product_id=gadget.pk).count(), rows)
+        top = self.client.get(reverse('admin_top_products_report'), {'date_from': '2026-03-01', 'date_to': '2026-03-03'}).data['results']
+        self.assertIn({'id': gadget.pk, 'name': None}, [row['product'] for row in top])
+
+
+class ParallelRollupRebuildTests(TransactionTestCase):
+
+    def test_rebuild_with_workers(self):
+        products = create_products(3)
+        user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+        for day, order in enumerate(create_orders(user, 6, products), start=1):
+            Order.objects.filter(pk=order.pk).update(created_at=datetime(2026, 3, day, 12, tzinfo=timezone.utc))
+
+        # Oqimlar hisoblaydi, yozish shu oqimda: SQLite da "database is locked" bo‘lmaydi
+        results = list(rebuild_sales_rollups(chunk_days=1, workers=4))
+        self.assertEqual(len(results), 6)
+        self.assertIsNotNone(get_watermark())
+        parallel = sorted(DailyProductSales.objects.values_list('day', 'product_id', 'status', 'units', 'revenue'))
+        self.assertEqual(len(parallel), 18)
+
+        list(rebuild_sales_rollups(chunk_days=1, workers=0))
+        self.assertEqual(sorted(DailyProductSales.objects.values_list('day', 'product_id', 'status', 'units', 'revenue')), parallel)
+
+
+class OrderQueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        products = create_products(2)
+        for i in range(5):
+            user = User.objects.create_user(email=f'user{i}@example.com', phone=f'+99890000010{i}', password='pass12345')
+            create_orders(user, 10, products)
+        Order.objects.filter(pk__in=Order.objects.values('pk')[:20]).update(status='shipped')
+
+    def test_user_order_list_uses_composite_indexes(self):
+        self.assertEqual(check_hot_queries(HOT_QUERIES), {})
+
+
+def fill_cart(user, products, quantity=2):
+    cart, _ = Cart.objects.get_or_create(user=user)
+    for product in products:
+        CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+    return cart
+
+
+class CheckoutTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(20)
+        cls.user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, confirm=True):
+        return self.client.post(reverse('order_list_create'), {'confirm': confirm}, format='json')
+
+    def test_cart_becomes_order_with_price_snapshot(self):
+        cart = fill_cart(self.user, self.products[:3])
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['product']['id'] for item in response.data['items']], [p.pk for p in self.products[:3]])
+        self.assertFalse(cart.items.exists())
+
+        Product.objects.filter(pk=self.products[0].pk).update(price=Decimal('999.00'), name="Yangi nom")
+        item = OrderItem.objects.get(order_id=response.data['id'], product=self.products[0])
+        self.assertEqual((item.quantity, item.unit_price, item.line_total, item.product_name),
+                         (2, self.products[0].price, self.products[0].price * 2, self.products[0].name))
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual((order.total, order.item_count), (sum(p.price * 2 for p in self.products[:3]), 6))
+
+    def test_list_totals_without_products_table(self):
+        fill_cart(self.user, self.products[:2])
+        self.checkout()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('order_list_create'), {'fields': 'id,total,item_count,items.product_name,items.line_total'})
+        self.assertEqual(response.data['results'][0]['total'], str(sum(p.price * 2 for p in self.products[:2])))
+        self.assertEqual(response.data['results'][0]['items'][0]['product_name'], self.products[0].name)
+        self.assertFalse(any('products_product' in query['sql'] for query in ctx.captured_queries))
+
+    def test_constant_queries(self):
+        def count(size):
+            fill_cart(self.user, self.products[:size])
+            with CaptureQueriesContext(connection) as ctx:
+                checkout(self.user)
+            return len(ctx.captured_queries)
+        self.assertEqual(count(1), count(20))
+
+    def test_rejects_unconfirmed_and_empty(self):
+        self.assertEqual(self.checkout(confirm=False).status_code, 400)
+        self.assertEqual(self.checkout().data, {"detail": "Savat bo‘sh"})
+        self.assertFalse(Order.objects.exists())
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+
+    def test_parallel_checkouts_create_one_order(self):
+        products = create_products(5)
+        user = User.objects.create_user(email='user@example.com', phone='+998900000001', password='pass12345')
+        fill_cart(user, products)
+        workers = 8
+        barrier = threading.Barrier(workers)
+        results, errors = [], []
+
+        def run():
+            try:
+                barrier.wait()
+                results.append(checkout(user).pk)
+            except EmptyCart:
+                results.append(None)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len([pk for pk in results if pk]), 1)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 5)
+        self.assertFalse(CartItem.objects.exists())
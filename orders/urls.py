@@ -1,11 +1,18 @@
 from django.urls import path
-from orders.views import OrderListCreateView, OrderDetailView, AdminOrderListView, AdminOrderDetailView, AdminOrderStatusUpdateView
+from orders.views import (
+    OrderListCreateView, OrderDetailView, AdminOrderListView, AdminOrderDetailView, AdminOrderStatusUpdateView, AdminOrderBulkStatusView,
+    AdminSalesReportView, AdminTopProductsReportView, AdminCategoryReportView,
+)
 
 urlpatterns = [
     path('', OrderListCreateView.as_view(), name='order_list_create'),
     path('<int:pk>/', OrderDetailView.as_view(), name='order_detail'),
     path('admin/', AdminOrderListView.as_view(), name='admin_order_list'),
+    path('admin/status/', AdminOrderBulkStatusView.as_view(), name='admin_order_bulk_status'),
     path('admin/<int:pk>/', AdminOrderDetailView.as_view(), name='admin_order_detail'),
     path('admin/<int:pk>/status/', AdminOrderStatusUpdateView.as_view(), name='admin_order_status_update'),
+    path('admin/reports/sales/', AdminSalesReportView.as_view(), name='admin_sales_report'),
+    path('admin/reports/top-products/', AdminTopProductsReportView.as_view(), name='admin_top_products_report'),
+    path('admin/reports/categories/', AdminCategoryReportView.as_view(), name='admin_category_report'),
 
 ]
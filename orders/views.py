@@ -1,11 +1,49 @@
+from operator import itemgetter
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 
+from orders.bulk import apply_status_transition
+from orders.checkout import EmptyCart, checkout
+from orders.filters import ORDER_ORDERING, filter_orders
 from orders.models import Order
-from orders.serializers import OrderSerializer, OrderStatusUpdateSerializer
+from orders.reports import category_breakdown, sales_timeseries, top_products
+from shop_api.compiled import compiled_serializer
+from shop_api.fieldsets import FIELDSET_PARAMETERS, fieldset_options
+from shop_api.pagination import MAX_PAGE_SIZE, KeysetPaginator, get_page_size
+from orders.serializers import (
+    OrderBulkStatusSerializer, OrderCreateSerializer, OrderFilterSerializer, OrderSerializer, OrderStatusUpdateSerializer,
+    SalesReportSerializer,
+)
+
+CURSOR_PARAMETERS = [
+    OpenApiParameter(name='cursor', description="Birinchi sahifa uchun bo‘sh, keyin next/previous qiymati", required=False, type=str),
+    OpenApiParameter(name='page_size', description=f"Sahifadagi elementlar soni (ko‘pi bilan {MAX_PAGE_SIZE})", required=False, type=int),
+]
+
+
+def paginate_orders(request, queryset, summary=False):
+    """
+    (created_at, id) bo‘yicha kursor sahifalash: OFFSET va COUNT(*) yo‘q,
+    sahifa indeksdan o‘qiladi. Natija model obyektlarisiz, values() qatorlaridan.
+    """
+    page_size = get_page_size(request.query_params)
+    paginator = KeysetPaginator(ORDER_ORDERING, page_size)
+    compiled = compiled_serializer(OrderSerializer, **fieldset_options(request.query_params), summary=summary)
+    # Kursor tartib maydonlaridan tuziladi, ular ham qatorga olinadi
+    rows, next_cursor, previous_cursor = paginator.paginate(
+        queryset, request.query_params.get('cursor') or None,
+        fetch=lambda rows: compiled.rows(rows, *paginator.fields), key=itemgetter(0)
+    )
+    return {
+        "next": next_cursor,
+        "previous": previous_cursor,
+        "page_size": page_size,
+        "results": [order for row, order in rows],
+    }
 
 # --------- Foydalanuvchi buyurtmalari ---------
 @extend_schema(tags=['Buyurtmalar'])
@@ -15,34 +53,40 @@ class OrderListCreateView(APIView):
     @extend_schema(
         parameters=[
             OpenApiParameter(name='status', description="Holat bo‘yicha filter", required=False, type=str),
-            OpenApiParameter(name='page', description="Sahifa raqami", required=False, type=int),
-            OpenApiParameter(name='page_size', description="Sahifadagi elementlar soni", required=False, type=int),
+            *CURSOR_PARAMETERS,
+            *FIELDSET_PARAMETERS,
         ],
         responses=OpenApiResponse(response=OrderSerializer(many=True), description="Foydalanuvchi buyurtmalari ro‘yxati"),
         summary="Foydalanuvchi buyurtmalari ro‘yxati",
-        description="Joriy foydalanuvchining barcha buyurtmalari ro‘yxatini chiqaradi. Filtrlash va sahifalash qo‘llab-quvvatlanadi."
+        description="Joriy foydalanuvchining buyurtmalari, yangilari birinchi. Filtrlash va kursor sahifalash qo‘llab-quvvatlanadi."
     )
     def get(self, request):
         status_filter = request.query_params.get('status')
+        # (user, status, created_at) indeksi bo‘yicha
         orders = Order.objects.filter(user=request.user)
         if status_filter:
             orders = orders.filter(status=status_filter)
+        return Response(paginate_orders(request, orders))
 
-        # Sahifalash
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 10))
-        start = (page - 1) * page_size
-        end = start + page_size
-        total = orders.count()
-        orders = orders[start:end]
-
-        serializer = OrderSerializer(orders, many=True)
-        return Response({
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "results": serializer.data
-        })
+    @extend_schema(
+        request=OrderCreateSerializer,
+        responses={201: OrderSerializer, 400: OpenApiResponse(description="Tasdiqlanmagan yoki savat bo‘sh")},
+        summary="Savatdan buyurtma yaratish (checkout)",
+        description="Joriy foydalanuvchi savatini bitta tranzaksiyada buyurtmaga aylantiradi va savatni tozalaydi. "
+                    "Narxlar checkout paytidagi qiymatda saqlanadi."
+    )
+    def post(self, request):
+        serializer = OrderCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.validated_data['confirm']:
+            return Response({"detail": "Buyurtmani tasdiqlang (confirm=true)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            order = checkout(request.user)
+        except EmptyCart:
+            return Response({"detail": "Savat bo‘sh"}, status=status.HTTP_400_BAD_REQUEST)
+        data = compiled_serializer(OrderSerializer).serialize(Order.objects.filter(pk=order.pk))[0]
+        return Response(data, status=status.HTTP_201_CREATED)
 
 @extend_schema(tags=['Buyurtmalar'])
 class OrderDetailView(APIView):
@@ -51,17 +95,19 @@ class OrderDetailView(APIView):
     @extend_schema(
         parameters=[
             OpenApiParameter(name='pk', location=OpenApiParameter.PATH, description="Buyurtma ID", required=True, type=int),
+            *FIELDSET_PARAMETERS,
         ],
         responses=OrderSerializer,
         summary="Foydalanuvchi buyurtma tafsilotlari",
         description="Foydalanuvchining o‘ziga tegishli bitta buyurtma ma'lumotini ko‘rsatadi."
     )
     def get(self, request, pk):
+        fieldsets = fieldset_options(request.query_params)
         try:
-            order = Order.objects.get(pk=pk, user=request.user)
+            order = OrderSerializer.setup_eager_loading(Order.objects.all(), **fieldsets).get(pk=pk, user=request.user)
         except Order.DoesNotExist:
             return Response({"detail": "Buyurtma topilmadi"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = OrderSerializer(order)
+        serializer = OrderSerializer(order, **fieldsets)
         return Response(serializer.data)
 
 
@@ -73,34 +119,42 @@ class AdminOrderListView(APIView):
     @extend_schema(
         parameters=[
             OpenApiParameter(name='status', description="Holat bo‘yicha filter: processing, shipped, delivered", required=False, type=str),
+            OpenApiParameter(name='user', description="Foydalanuvchi ID", required=False, type=int),
+            OpenApiParameter(name='created_from', description="Shu vaqtdan (YYYY-MM-DD yoki ISO 8601)", required=False, type=str),
+            OpenApiParameter(name='created_to', description="Shu vaqtgacha (faqat sana bo‘lsa, kun oxirigacha)", required=False, type=str),
+            OpenApiParameter(name='min_total', description="Minimal buyurtma summasi", required=False, type=float),
+            *CURSOR_PARAMETERS,
+            *FIELDSET_PARAMETERS,
         ],
         responses=OrderSerializer(many=True),
         summary="Admin uchun barcha buyurtmalar",
-        description="Barcha foydalanuvchilarning buyurtmalarini ko‘rish imkoniyati."
+        description="Barcha foydalanuvchilarning buyurtmalari, yangilari birinchi, kursor sahifalash bilan. "
+                    "Standart holatda elementlarsiz qisqa ko‘rinish: `?expand=items` yoki `?fields=` bilan elementlar ham beriladi."
     )
     def get(self, request):
-        status_filter = request.query_params.get('status')
-        orders = Order.objects.all()
-        if status_filter:
-            orders = orders.filter(status=status_filter)
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        filters = OrderFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+        orders = filter_orders(Order.objects.all(), filters.validated_data)
+        return Response(paginate_orders(request, orders, summary=True))
 
 @extend_schema(tags=['Admin'])
 class AdminOrderDetailView(APIView):
     permission_classes = [IsAdminUser]
 
     @extend_schema(
+        parameters=FIELDSET_PARAMETERS,
         responses=OrderSerializer,
         summary="Admin uchun bitta buyurtma",
         description="Admin bitta buyurtma tafsilotlarini ko‘rishi mumkin."
     )
     def get(self, request, pk):
+        fieldsets = fieldset_options(request.query_params)
         try:
-            order = Order.objects.get(pk=pk)
+            order = OrderSerializer.setup_eager_loading(Order.objects.all(), **fieldsets).get(pk=pk)
         except Order.DoesNotExist:
             return Response({"detail": "Buyurtma topilmadi"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = OrderSerializer(order)
+        serializer = OrderSerializer(order, **fieldsets)
         return Response(serializer.data)
 
 @extend_schema(tags=['Admin'])
@@ -115,12 +169,94 @@ class AdminOrderStatusUpdateView(APIView):
     )
     def put(self, request, pk):
         try:
-            order = Order.objects.get(pk=pk)
+            order = Order.objects.only('pk', 'status').get(pk=pk)
         except Order.DoesNotExist:
             return Response({"detail": "Buyurtma topilmadi"}, status=status.HTTP_404_NOT_FOUND)
         serializer = OrderStatusUpdateSerializer(data=request.data)
         if serializer.is_valid():
             order.status = serializer.validated_data['status']
-            order.save()
+            order.save(update_fields=['status', 'updated_at'])
             return Response({"detail": "Holat yangilandi"})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@extend_schema(tags=['Admin'])
+class AdminOrderBulkStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=OrderBulkStatusSerializer,
+        responses={200: OpenApiResponse(description="Yangilangan buyurtmalar soni va o‘tkazib yuborilganlar ro‘yxati"),
+                   400: OpenApiResponse(description="Xato ma'lumot")},
+        summary="Buyurtmalar holatini ommaviy yangilash (Admin)",
+        description="ids ro‘yxati yoki filter (status, user, created_from, created_to, min_total) bo‘yicha tanlangan "
+                    "buyurtmalarni shipped yoki delivered holatiga o‘tkazadi. Faqat processing -> shipped va "
+                    "shipped -> delivered o‘tishlari qo‘llanadi, qolganlari `skipped` da sababi bilan qaytariladi."
+    )
+    def post(self, request):
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(apply_status_transition(serializer.validated_data))
+
+
+# --------- Admin savdo hisobotlari (faqat rollup jadvallaridan) ---------
+REPORT_PARAMETERS = [
+    OpenApiParameter(name='date_from', description="Boshlanish sanasi (YYYY-MM-DD), standart — 30 kun oldin", required=False, type=str),
+    OpenApiParameter(name='date_to', description="Tugash sanasi (YYYY-MM-DD), standart — bugun", required=False, type=str),
+    OpenApiParameter(name='status', description="Faqat shu holatdagi buyurtmalar: processing, shipped, delivered", required=False, type=str),
+]
+
+
+def report_response(request, build):
+    serializer = SalesReportSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    filters = serializer.validated_data
+    return Response({
+        "date_from": filters['date_from'],
+        "date_to": filters['date_to'],
+        "results": build(filters),
+    })
+
+@extend_schema(tags=['Admin'])
+class AdminSalesReportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        parameters=REPORT_PARAMETERS,
+        responses={200: OpenApiResponse(description="Kunlik tushum va sotilgan birliklar"), 400: OpenApiResponse(description="Xato parametr")},
+        summary="Kunlik savdo hisobotlari (Admin)",
+        description="Tanlangan oraliqdagi har bir kun uchun tushum (revenue) va sotilgan birliklar (units). "
+                    "Ma'lumot rollup jadvallaridan o‘qiladi (update_sales_rollups buyrug‘i yangilaydi)."
+    )
+    def get(self, request):
+        return report_response(request, sales_timeseries)
+
+@extend_schema(tags=['Admin'])
+class AdminTopProductsReportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        parameters=[
+            *REPORT_PARAMETERS,
+            OpenApiParameter(name='limit', description="Nechta mahsulot (1-100, standart 10)", required=False, type=int),
+        ],
+        responses={200: OpenApiResponse(description="Tushum bo‘yicha eng ko‘p sotilgan mahsulotlar"), 400: OpenApiResponse(description="Xato parametr")},
+        summary="Eng ko‘p sotilgan mahsulotlar (Admin)",
+        description="Tanlangan oraliqda tushum bo‘yicha eng yaxshi mahsulotlar. Ma'lumot rollup jadvallaridan o‘qiladi."
+    )
+    def get(self, request):
+        return report_response(request, top_products)
+
+@extend_schema(tags=['Admin'])
+class AdminCategoryReportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        parameters=REPORT_PARAMETERS,
+        responses={200: OpenApiResponse(description="Toifalar bo‘yicha tushum va birliklar"), 400: OpenApiResponse(description="Xato parametr")},
+        summary="Toifalar bo‘yicha savdo (Admin)",
+        description="Tanlangan oraliqda har bir toifa bo‘yicha tushum va sotilgan birliklar. Ma'lumot rollup jadvallaridan o‘qiladi."
+    )
+    def get(self, request):
+        return report_response(request, category_breakdown)
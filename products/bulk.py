@@ -0,0 +1,122 @@
+from django.core.files.storage import default_storage
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from products.filters import filter_products
+from products.images import variant_files
+from products.models import Product
+from products.signals import products_bulk_changed
+
+DELETE_CHUNK_SIZE = 500
+
+
+def target_products(data):
+    """Tanlangan mahsulotlar: filter bo‘lsa id lar Pythonga olinmaydi, subquery bo‘lib qoladi"""
+    if 'ids' in data:
+        return Product.objects.filter(pk__in=data['ids'])
+    return Product.objects.filter(pk__in=filter_products(Product.objects.all(), data['filter']).values('pk'))
+
+
+def add_tags(products, tag_ids):
+    """INSERT ... SELECT: mavjud (mahsulot, teg) juftlari NOT EXISTS bilan o‘tkazib yuboriladi"""
+    Through = Product.tags.through
+    opts = Through._meta
+    quote = connection.ops.quote_name
+    table = quote(opts.db_table)
+    product_column = quote(opts.get_field('product').column)
+    tag_column = quote(opts.get_field('tag').column)
+    subquery, params = products.values('pk').query.sql_with_params()
+    affected = 0
+    with connection.cursor() as cursor:
+        for tag_id in tag_ids:
+            cursor.execute(
+                f"INSERT INTO {table} ({product_column}, {tag_column}) "
+                f"SELECT target.id, %s FROM ({subquery}) target "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {table} existing "
+                f"WHERE existing.{product_column} = target.id AND existing.{tag_column} = %s)",
+                [tag_id, *params, tag_id],
+            )
+            affected += cursor.rowcount
+    return affected
+
+
+def reverse_relations():
+    """
+    Productga bog‘langan jadvallar, related_name='+' bilan yashiringanlari ham
+    (related_objects ularni bermaydi). DO_NOTHING lar — masalan savdo
+    rolluplari — mahsulotdan keyin ham qoladi.
+    """
+    return [
+        relation for relation in Product._meta.get_fields(include_hidden=True)
+        if (relation.one_to_many or relation.one_to_one) and relation.auto_created and not relation.concrete
+        and relation.on_delete is not models.DO_NOTHING
+    ]
+
+
+def delete_products(product_ids):
+    """
+    Bog‘liq jadvallar va mahsulotlar to‘plam bo‘yicha DELETE bilan o‘chiriladi.
+
+    id lar qidiruv indeksi va rasm fayllari uchun kerak, so‘rovlar esa
+    DELETE_CHUNK_SIZE talik bo‘laklarda — parametrlar ro‘yxati cheklangan.
+    """
+    deleted = 0
+    for start in range(0, len(product_ids), DELETE_CHUNK_SIZE):
+        chunk = product_ids[start:start + DELETE_CHUNK_SIZE]
+        files = [
+            path
+            for variants in Product.objects.filter(pk__in=chunk).exclude(image_variants={})
+            .values_list('image_variants', flat=True)
+            for path in variant_files(variants)
+        ]
+        transaction.on_commit(lambda files=files: [default_storage.delete(path) for path in files])
+        for relation in reverse_relations():
+            relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': chunk}).delete()
+        for field in Product._meta.many_to_many:
+            field.remote_field.through.objects.filter(**{f'{field.m2m_field_name()}__in': chunk}).delete()
+        # Product uchun signal qabul qiluvchilar bor, Collector har bir qatorni yuklamasin
+        deleted += Product.objects.filter(pk__in=chunk)._raw_delete(Product.objects.db)
+    return deleted
+
+
+def apply_bulk_action(data):
+    """
+    Ommaviy amalni bitta tranzaksiyada to‘plam asosidagi UPDATE/DELETE bilan bajaradi.
+
+    UPDATE va teg amallari tanlangan querysetning o‘zida (filter subquery)
+    bajariladi; id lar faqat o‘chirishda olinadi. Bitta qatorli yo‘l
+    signallari (qidiruv indeksi, facetlar, katalog keshi)
+    products_bulk_changed orqali chaqiriladi.
+    """
+    operation = data['operation']
+    now = timezone.now()
+    with transaction.atomic():
+        products = target_products(data)
+
+        if operation == 'delete':
+            product_ids = list(products.values_list('pk', flat=True))
+            matched = len(product_ids)
+            affected = delete_products(product_ids)
+            products_bulk_changed.send(sender=Product, deleted_ids=product_ids)
+            return {"operation": operation, "matched": matched, "affected": affected}
+
+        if operation == 'set_price':
+            matched = affected = products.update(price=data['price'], updated_at=now)
+        elif operation == 'scale_price':
+            matched = affected = products.update(price=Round(F('price') * data['factor'], 2), updated_at=now)
+        elif operation == 'set_category':
+            matched = affected = products.update(category=data['category'], updated_at=now)
+        else:
+            # updated_at avval: filter teg bo‘yicha bo‘lsa, teg o‘chirilgandan keyin subquery bo‘sh qoladi
+            matched = products.update(updated_at=now)
+            if operation == 'add_tags':
+                affected = add_tags(products, data['tags'])
+            else:
+                affected, _ = Product.tags.through.objects.filter(
+                    product__in=products, tag_id__in=data['tags']
+                ).delete()
+        # Qidiruv indeksi faqat name/description dan tuziladi, bu amallar uni o‘zgartirmaydi
+        products_bulk_changed.send(sender=Product)
+    return {"operation": operation, "matched": matched, "affected": affected}
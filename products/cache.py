@@ -0,0 +1,136 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+GENERATION_KEY = 'catalog:generation'
+MODIFIED_KEY = 'catalog:modified'
+
+
+def get_catalog_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def catalog_generation():
+    """Katalogning joriy generatsiya raqami (har bir yozuvda oshadi)"""
+    cache = get_catalog_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Kesh tozalangandan keyin eski generatsiyalar bilan to‘qnashmasligi uchun vaqtdan boshlaymiz
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def catalog_last_modified():
+    """Katalogdagi oxirgi o‘zgarish vaqti (Last-Modified sarlavhasi uchun)"""
+    cache = get_catalog_cache()
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        cache.add(MODIFIED_KEY, time.time(), None)
+        modified = cache.get(MODIFIED_KEY)
+    return datetime.fromtimestamp(modified, tz=timezone.utc)
+
+
+def bump_catalog_generation():
+    """Barcha katalog javoblarini eskirgan deb belgilaydi (kalitlarni birma-bir o‘chirmasdan)"""
+    cache = get_catalog_cache()
+    cache.set(MODIFIED_KEY, time.time(), None)
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation = time.time_ns()
+        cache.set(GENERATION_KEY, generation, None)
+        return generation
+
+
+def query_digest(request):
+    """
+    Normallashtirilgan query string hashi (parametrlar tartibi ahamiyatsiz).
+
+    ETag ga qo‘shiladi: ?fields=, ?expand= va sahifa parametrlari boshqa
+    ko‘rinish beradi, bitta validator bilan 304 noto‘g‘ri bo‘lardi.
+    """
+    params = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    return hashlib.md5(repr(params).encode('utf-8')).hexdigest()[:16]
+
+
+def catalog_etag(request, *args, **kwargs):
+    return f"catalog-{catalog_generation()}-{query_digest(request)}"
+
+
+def catalog_modified(request, *args, **kwargs):
+    return catalog_last_modified()
+
+
+def response_cache_key(name, request, kwargs):
+    # Bo‘sh qiymatlar ham kalitga kiradi: ?cursor= (kursor rejimi) va cursorsiz so‘rov boshqa javob beradi
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = repr((sorted(kwargs.items()), params, getattr(renderer, 'format', None))).encode('utf-8')
+    return f"catalog:response:{name}:{hashlib.md5(raw).hexdigest()}"
+
+
+def cached_catalog_response(name):
+    """
+    GET handler javobini katalog generatsiyasi bilan birga keshlaydi.
+
+    Kalit normallashtirilgan query parametrlaridan tuziladi. Yozuv
+    generatsiyani oshirgach, eski yozuv "stale" hisoblanadi: uni faqat bitta
+    worker (qulfni olgan) qayta hisoblaydi, qolganlari eski javobni qaytaradi
+    yoki eski javob bo‘lmasa, qisqa vaqt kutadi.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            cache = get_catalog_cache()
+            key = response_cache_key(name, request, kwargs)
+            generation = catalog_generation()
+            entry = cache.get(key)
+            if entry is not None and entry[0] == generation and entry[1] > time.time():
+                return cached_response(entry, 'HIT')
+
+            lock_key = f"{key}:lock"
+            if not cache.add(lock_key, 1, settings.CATALOG_CACHE_LOCK_TIMEOUT):
+                if entry is not None:
+                    return cached_response(entry, 'STALE')
+                deadline = time.monotonic() + settings.CATALOG_CACHE_WAIT
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    entry = cache.get(key)
+                    if entry is not None:
+                        return cached_response(entry, 'HIT')
+                # Qulf egasi javob bermadi, o‘zimiz hisoblaymiz (keshga yozmasdan)
+                return method(view, request, *args, **kwargs)
+
+            try:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code == 200:
+                    # DRF Response uchun data, tayyor baytlar (snapshotlar) uchun content saqlanadi
+                    if isinstance(response, Response):
+                        body = ('data', response.data)
+                    else:
+                        body = ('content', response.content, response['Content-Type'])
+                    entry = (generation, time.time() + settings.CATALOG_CACHE_TTL, response.status_code, body)
+                    cache.set(key, entry, settings.CATALOG_CACHE_TTL + settings.CATALOG_CACHE_STALE_TTL)
+                    response['X-Cache'] = 'MISS'
+            finally:
+                cache.delete(lock_key)
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_response(entry, state):
+    body = entry[3]
+    if body[0] == 'data':
+        response = Response(body[1], status=entry[2])
+    else:
+        response = HttpResponse(body[1], status=entry[2], content_type=body[2])
+    response['X-Cache'] = state
+    return response
@@ -0,0 +1,78 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from rest_framework.fields import DateTimeField
+
+from products.importer import TAG_SEPARATOR
+from products.models import Category, Product, Tag
+from products.taxonomy import taxonomy
+
+CHUNK_SIZE = 2000
+CSV_COLUMNS = ['id', 'name', 'description', 'price', 'image', 'category', 'tags', 'created_at', 'updated_at']
+
+_datetime = DateTimeField()
+
+
+def iter_product_rows(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Eksport qatorlari (lug‘atlar), id bo‘yicha tartibda.
+
+    Mahsulotlar values() bilan iterator(chunk_size) orqali o‘qiladi, teglar
+    har bir bo‘lak uchun oraliq jadvaldan bitta so‘rov bilan olinadi, toifa
+    va teg nomlari jarayon ichidagi keshdan. Xotirada faqat bitta bo‘lak
+    turadi, shuning uchun u katalog hajmiga bog‘liq emas.
+
+    updated_since (delta) rejimida faqat yangi va o‘zgargan mahsulotlar
+    beriladi: o‘chirilgan mahsulotlar uchun yozuv (tombstone) yo‘q.
+    """
+    rows = queryset.order_by('pk').values(
+        'id', 'name', 'description', 'price', 'image', 'category_id', 'created_at', 'updated_at'
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        tags = {}
+        for product_id, tag_id in Product.tags.through.objects.filter(
+            product_id__in=[row['id'] for row in chunk]
+        ).values_list('product_id', 'tag_id'):
+            tag = taxonomy.row(Tag, tag_id)
+            # Eksport davomida o‘chirilgan teg oqimni to‘xtatmasin
+            if tag is not None:
+                tags.setdefault(product_id, []).append(tag['name'])
+        for row in chunk:
+            row['price'] = str(row['price'])
+            row['image'] = default_storage.url(row['image']) if row['image'] else None
+            category = taxonomy.row(Category, row['category_id'])
+            row['category'] = category['name'] if category else None
+            row['tags'] = sorted(tags.get(row['id'], []))
+            row['created_at'] = _datetime.to_representation(row['created_at'])
+            row['updated_at'] = _datetime.to_representation(row['updated_at'])
+            yield row
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """import_products bilan mos ustunlar: tags "a|b" ko‘rinishida"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS).encode('utf-8')
+    for row in rows:
+        row['tags'] = TAG_SEPARATOR.join(row['tags'])
+        yield writer.writerow([row[column] for column in CSV_COLUMNS]).encode('utf-8')
+
+
+FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv; charset=utf-8'),
+}
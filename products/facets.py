@@ -0,0 +1,140 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from products.models import Category, FacetCount, Product, Tag
+from products.taxonomy import taxonomy
+
+TOTAL = ('total', '')
+
+
+def price_buckets():
+    """[(min, max), ...] — oxirgi oraliqning yuqori chegarasi yo‘q (None)"""
+    bounds = [Decimal(str(bound)) for bound in settings.PRODUCT_PRICE_BUCKETS]
+    return list(zip(bounds, bounds[1:] + [None]))
+
+
+def bucket_key(low, high):
+    return f"{low}-{high if high is not None else ''}"
+
+
+def bucket_payload(low, high, count):
+    return {"min": str(low), "max": str(high) if high is not None else None, "count": count}
+
+
+def bucket_for(price):
+    if price is None:
+        return None
+    price = Decimal(str(price))
+    for low, high in price_buckets():
+        if price >= low and (high is None or price < high):
+            return bucket_key(low, high)
+    return None
+
+
+def _name(model, pk):
+    row = taxonomy.row(model, pk)
+    return row['name'] if row else None
+
+
+def _facet_payload(total, categories, tags, prices):
+    return {
+        "total": total,
+        "categories": sorted(categories, key=lambda item: (-item['count'], item['name'])),
+        "tags": sorted(tags, key=lambda item: (-item['count'], item['name'])),
+        "price": prices,
+    }
+
+
+def compute_facets(queryset):
+    """Berilgan filtrlangan queryset uchun facetlar: 3 ta guruhlangan so‘rov, nomlar keshdan"""
+    if queryset.query.is_empty():
+        return _facet_payload(0, [], [], [])
+    base = Product.objects.filter(pk__in=queryset.values('pk'))
+
+    categories = [
+        {"id": row['category_id'], "name": _name(Category, row['category_id']), "count": row['count']}
+        for row in base.order_by().values('category_id').annotate(count=Count('id'))
+    ]
+    tags = [
+        {"id": row['tag_id'], "name": _name(Tag, row['tag_id']), "count": row['count']}
+        for row in Product.tags.through.objects.filter(product__in=base)
+        .order_by().values('tag_id').annotate(count=Count('id'))
+    ]
+
+    buckets = price_buckets()
+    aggregates = {'total': Count('id')}
+    for index, (low, high) in enumerate(buckets):
+        condition = Q(price__gte=low) if high is None else Q(price__gte=low, price__lt=high)
+        aggregates[f'price_{index}'] = Count('id', filter=condition)
+    counts = base.aggregate(**aggregates)
+    prices = [
+        bucket_payload(low, high, counts[f'price_{index}'])
+        for index, (low, high) in enumerate(buckets)
+    ]
+    return _facet_payload(counts['total'], categories, tags, prices)
+
+
+# --------------------- Oldindan hisoblangan indeks ---------------------
+def facet_index_enabled():
+    return settings.PRODUCT_FACET_INDEX
+
+
+def indexed_facets():
+    """Filtrsiz katalog facetlari indeksdan; indeks qurilmagan bo‘lsa None"""
+    rows = {(row.facet, row.value): row.count for row in FacetCount.objects.all()}
+    if TOTAL not in rows:
+        return None
+    categories = [
+        {"id": pk, "name": row['name'], "count": rows.get(('category', str(pk)), 0)}
+        for pk, row in taxonomy.rows(Category).items()
+    ]
+    tags = [
+        {"id": pk, "name": row['name'], "count": rows.get(('tag', str(pk)), 0)}
+        for pk, row in taxonomy.rows(Tag).items()
+    ]
+    prices = [
+        bucket_payload(low, high, rows.get(('price', bucket_key(low, high)), 0))
+        for low, high in price_buckets()
+    ]
+    return _facet_payload(
+        rows[TOTAL],
+        [item for item in categories if item['count']],
+        [item for item in tags if item['count']],
+        prices,
+    )
+
+
+def rebuild_facet_index():
+    facets = compute_facets(Product.objects.all())
+    rows = [FacetCount(facet='total', value='', count=facets['total'])]
+    rows += [FacetCount(facet='category', value=str(item['id']), count=item['count']) for item in facets['categories']]
+    rows += [FacetCount(facet='tag', value=str(item['id']), count=item['count']) for item in facets['tags']]
+    rows += [
+        FacetCount(facet='price', value=bucket_key(low, high), count=item['count'])
+        for (low, high), item in zip(price_buckets(), facets['price'])
+    ]
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(rows)
+    return facets
+
+
+def apply_facet_deltas(deltas):
+    """{(facet, value): delta} o‘zgarishlarini F() bilan qo‘llaydi (indeks qurilgan bo‘lsa)"""
+    deltas = {key: delta for key, delta in deltas.items() if key[1] is not None and delta}
+    if not deltas or not facet_index_enabled() or not FacetCount.objects.filter(facet='total').exists():
+        return
+    for (facet, value), delta in deltas.items():
+        value = str(value)
+        if FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta):
+            continue
+        row, created = FacetCount.objects.get_or_create(facet=facet, value=value, defaults={'count': delta})
+        if not created:
+            FacetCount.objects.filter(pk=row.pk).update(count=F('count') + delta)
+
+
+def drop_facet_value(facet, value):
+    FacetCount.objects.filter(facet=facet, value=str(value)).delete()
@@ -0,0 +1,35 @@
+from products.search import get_search_backend
+
+ORDERING_FIELDS = ['price', '-price', 'name', '-name', 'created_at', '-created_at']
+
+
+def filter_products(queryset, params, search_backend=None):
+    """ProductListView, facetlar va boshqa endpointlar uchun umumiy filtrlar"""
+    category = params.get('category')
+    tag = params.get('tag')
+    price_min = params.get('price_min')
+    price_max = params.get('price_max')
+    search = params.get('search')
+
+    if category:
+        queryset = queryset.filter(category_id=category)
+    if tag:
+        queryset = queryset.filter(tags__id=tag)
+    if price_min:
+        queryset = queryset.filter(price__gte=price_min)
+    if price_max:
+        queryset = queryset.filter(price__lte=price_max)
+    if search:
+        queryset = (search_backend or get_search_backend()).search(queryset, search)
+    return queryset
+
+
+def has_product_filters(params):
+    return any(params.get(name) for name in ('category', 'tag', 'price_min', 'price_max', 'search'))
+
+
+def product_ordering(order_by):
+    """Tartiblash kalitlari: id har doim oxirgi kalit, shunda sahifalar barqaror bo‘ladi"""
+    if order_by in ORDERING_FIELDS:
+        return [order_by, '-id' if order_by.startswith('-') else 'id']
+    return ['id']
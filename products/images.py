@@ -0,0 +1,176 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from products.cache import bump_catalog_generation
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'products/variants'
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_sizes():
+    """{'thumbnail': 150, ...} — nom: eng katta tomon (px), kichikdan kattaga"""
+    return sorted(settings.PRODUCT_IMAGE_VARIANTS.items(), key=lambda item: item[1])
+
+
+def variant_name(product_id, source, size, ext):
+    """
+    products/variants/<product_id>/<nom>-<xesh>-<o‘lcham>.<ext>
+
+    Mahsulot katalogi va asl yo‘lning to‘liq xeshi: a.png va a.jpg yoki
+    boshqa mahsulotning bir xil nomli rasmi bir-birining variantini ustidan yozmaydi.
+    """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    digest = hashlib.md5(source.encode('utf-8')).hexdigest()[:10]
+    return f"{VARIANT_DIR}/{product_id}/{stem}-{digest}-{size}.{ext}"
+
+
+def build_variants(product_id, source, storage=default_storage):
+    """
+    Asl rasmdan o‘lcham variantlarini (WebP + JPEG) yaratib storagega yozadi.
+
+    Bazaga murojaat qilmaydi, shuning uchun alohida jarayonda ham ishlaydi.
+    Natija Product.image_variants ga yoziladigan lug‘at.
+    """
+    with storage.open(source, 'rb') as stream:
+        original = ImageOps.exif_transpose(Image.open(stream))
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    sizes = {}
+    for name, size in variant_sizes():
+        image = original.copy()
+        # Kichik rasm kattalashtirilmaydi
+        image.thumbnail((size, size), Image.LANCZOS)
+        entry = {'width': image.width, 'height': image.height}
+        for ext, (pil_format, options) in FORMATS.items():
+            output = image.convert('RGB') if pil_format == 'JPEG' else image
+            buffer = io.BytesIO()
+            output.save(buffer, pil_format, **options)
+            path = variant_name(product_id, source, size, ext)
+            if storage.exists(path):
+                storage.delete(path)
+            entry[ext] = storage.save(path, ContentFile(buffer.getvalue()))
+        sizes[name] = entry
+    return {'source': source, 'sizes': sizes}
+
+
+def variant_files(variants):
+    return [
+        path
+        for entry in (variants or {}).get('sizes', {}).values()
+        for ext, path in entry.items()
+        if ext in FORMATS
+    ]
+
+
+def variant_sizes_for(source, variants):
+    # Variantlar hali yaratilmagan yoki rasm almashtirilgan bo‘lsa, bo‘sh
+    variants = variants or {}
+    if not source or variants.get('source') != source:
+        return {}
+    return variants.get('sizes', {})
+
+
+def variant_urls(source, variants, storage=default_storage):
+    """{'thumbnail': {'width', 'height', 'webp': url, 'jpeg': url}, ...}"""
+    return {
+        name: {
+            'width': entry['width'],
+            'height': entry['height'],
+            **{ext: storage.url(entry[ext]) for ext in FORMATS},
+        }
+        for name, entry in variant_sizes_for(source, variants).items()
+    }
+
+
+def variant_srcset(source, variants, storage=default_storage):
+    """{'webp': 'url 150w, url 600w, ...', 'jpeg': ...}"""
+    sizes = sorted(variant_sizes_for(source, variants).values(), key=lambda entry: entry['width'])
+    return {
+        ext: ', '.join(f"{storage.url(entry[ext])} {entry['width']}w" for entry in sizes)
+        for ext in FORMATS
+    } if sizes else {}
+
+
+def save_variants(product_id, variants, previous=None, storage=default_storage):
+    """Variantlarni faqat mahsulot rasmi o‘zgarmagan bo‘lsa yozadi; eski fayllarni o‘chiradi"""
+    updated = Product.objects.filter(pk=product_id, image=variants['source']).update(
+        image_variants=variants, updated_at=timezone.now()
+    )
+    if not updated:
+        # Shu orada rasm almashtirilgan yoki mahsulot o‘chirilgan
+        stale = variant_files(variants)
+    else:
+        stale = set(variant_files(previous)) - set(variant_files(variants))
+        bump_catalog_generation()
+    for path in stale:
+        storage.delete(path)
+    return bool(updated)
+
+
+def generate_product_variants(product_id, source, previous=None):
+    try:
+        return save_variants(product_id, build_variants(product_id, source), previous)
+    except Exception:
+        logger.exception("Mahsulot %s rasmi uchun variantlar yaratilmadi", product_id)
+        return False
+
+
+def _generate_in_worker(*args):
+    # Fon oqimi o‘z ulanishini ochadi, ish tugagach uni yopamiz
+    try:
+        return generate_product_variants(*args)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PRODUCT_IMAGE_WORKERS, thread_name_prefix='product-images'
+            )
+    return _executor
+
+
+def schedule_variants(product):
+    """Tranzaksiya tugagach variantlarni fon oqimida yaratadi (PRODUCT_IMAGE_WORKERS=0 bo‘lsa shu oqimda)"""
+    args = (product.pk, product.image.name, product.image_variants)
+
+    def submit():
+        if settings.PRODUCT_IMAGE_WORKERS:
+            get_executor().submit(_generate_in_worker, *args)
+        else:
+            generate_product_variants(*args)
+
+    transaction.on_commit(submit)
+
+
+def clear_variants(product):
+    """Rasm olib tashlanganda variantlar va ularning fayllari o‘chiriladi"""
+    files = variant_files(product.image_variants)
+    Product.objects.filter(pk=product.pk).update(image_variants={})
+    product.image_variants = {}
+    transaction.on_commit(lambda: [default_storage.delete(path) for path in files])
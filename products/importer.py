@@ -0,0 +1,238 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+
+from products.models import Category, Product, Tag
+from products.signals import products_bulk_changed
+from products.taxonomy import taxonomy
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+TAG_SEPARATOR = '|'
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": str(message)})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def iter_csv(stream):
+    """(qator_raqami, lug‘at) juftliklari; fayl butunlay xotiraga o‘qilmaydi"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_jsonl(stream):
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, RowError(f"JSON xato: {exc}")
+            continue
+        yield line_number, row if isinstance(row, dict) else RowError("Qator JSON obyekt bo‘lishi kerak")
+
+
+READERS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+}
+
+
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+class ProductImporter:
+    """
+    CSV/JSONL katalogni bo‘laklab yozadi.
+
+    Har bir bo‘lak (batch_size qator) bitta tranzaksiyada: yo‘q toifa va
+    teglar bulk_create bilan yaratiladi, mahsulotlar bulk_create (id berilsa
+    upsert) bilan, Product.tags oraliq jadvali esa bitta bulk_create bilan
+    yoziladi. Xato qatorlar hisobotga tushadi, qolganlari yoziladi.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.tags = dict(Tag.objects.values_list('name', 'id'))
+
+    def run(self, rows):
+        result = ImportResult()
+        batch = []
+        for line, row in rows:
+            result.rows += 1
+            try:
+                batch.append((line, self.parse(row)))
+            except RowError as exc:
+                result.add_error(line, exc)
+            if len(batch) >= self.batch_size:
+                self.write(batch, result)
+                batch = []
+        if batch:
+            self.write(batch, result)
+        products_bulk_changed.send(sender=Product, facets=True)
+        return result
+
+    def parse(self, row):
+        if isinstance(row, Exception):
+            raise row
+        name = (row.get('name') or '').strip()
+        if not name:
+            raise RowError("name majburiy")
+        if len(name) > Product._meta.get_field('name').max_length:
+            raise RowError("name juda uzun")
+        category = (row.get('category') or '').strip()
+        if not category:
+            raise RowError("category majburiy")
+        if len(category) > Category._meta.get_field('name').max_length:
+            raise RowError("category juda uzun")
+        try:
+            price = Decimal(str(row.get('price')).strip())
+            if not price.is_finite() or price < 0 or price.adjusted() >= 8:
+                raise InvalidOperation
+            price = price.quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            raise RowError(f"Noto‘g‘ri narx: {row.get('price')!r}")
+        tags = row.get('tags') or []
+        if isinstance(tags, str):
+            tags = tags.split(TAG_SEPARATOR)
+        tags = sorted({str(tag).strip() for tag in tags if str(tag).strip()})
+        if any(len(tag) > Tag._meta.get_field('name').max_length for tag in tags):
+            raise RowError("teg nomi juda uzun")
+        product_id = row.get('id')
+        if product_id in ('', None):
+            product_id = None
+        else:
+            try:
+                product_id = int(product_id)
+            except (TypeError, ValueError):
+                raise RowError(f"Noto‘g‘ri id: {product_id!r}")
+        return {
+            'id': product_id,
+            'name': name,
+            'description': row.get('description') or None,
+            'price': price,
+            'category': category,
+            'tags': tags,
+        }
+
+    def resolve(self, model, cache, names):
+        missing = [name for name in names if name not in cache]
+        if missing:
+            model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+            cache.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+            # bulk_create signal yubormaydi
+            taxonomy.invalidate()
+
+    def write(self, batch, result):
+        try:
+            ids = self.write_atomic(batch, result)
+        except DatabaseError:
+            # Bo‘lakdagi xato qatorni ajratish uchun har birini alohida yozamiz
+            ids = []
+            for line, parsed in batch:
+                try:
+                    ids += self.write_atomic([(line, parsed)], result)
+                except DatabaseError as exc:
+                    result.add_error(line, exc)
+        if ids:
+            products_bulk_changed.send(sender=Product, product_ids=ids, facets=False)
+        if self.progress:
+            self.progress(result)
+
+    def write_atomic(self, batch, result):
+        categories, tags = dict(self.categories), dict(self.tags)
+        try:
+            with transaction.atomic():
+                ids, created, updated, errors = self.write_rows(batch)
+        except DatabaseError:
+            # Bekor qilingan tranzaksiyada yaratilgan toifa/teg id lari keshda qolmasin
+            self.categories, self.tags = categories, tags
+            raise
+        result.created += created
+        result.updated += updated
+        for line, message in errors:
+            result.add_error(line, message)
+        return ids
+
+    def write_rows(self, batch):
+        # id berilgan qator faqat mavjud mahsulotni yangilaydi
+        known = set(Product.objects.filter(
+            id__in=[row['id'] for line, row in batch if row['id'] is not None]
+        ).values_list('id', flat=True))
+        rows, errors = [], []
+        for line, row in batch:
+            if row['id'] is not None and row['id'] not in known:
+                errors.append((line, f"Mahsulot topilmadi: id={row['id']}"))
+            else:
+                rows.append(row)
+
+        self.resolve(Category, self.categories, {row['category'] for row in rows})
+        self.resolve(Tag, self.tags, {tag for row in rows for tag in row['tags']})
+
+        new = [row for row in rows if row['id'] is None]
+        existing = [row for row in rows if row['id'] is not None]
+        products = []
+        if new:
+            products += Product.objects.bulk_create([self.build(row) for row in new])
+        if existing:
+            products += Product.objects.bulk_create(
+                [self.build(row) for row in existing],
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=['name', 'description', 'price', 'category', 'updated_at'],
+            )
+        Through = Product.tags.through
+        if existing:
+            # Yangilanadigan mahsulotlarning teglari fayldagi ro‘yxat bilan almashtiriladi
+            Through.objects.filter(product_id__in=[row['id'] for row in existing]).delete()
+        Through.objects.bulk_create(
+            [
+                Through(product_id=product.pk, tag_id=self.tags[tag])
+                for product, row in zip(products, new + existing)
+                for tag in row['tags']
+            ],
+            ignore_conflicts=True,
+        )
+        return [product.pk for product in products], len(new), len(existing), errors
+
+    def build(self, row):
+        return Product(
+            id=row['id'],
+            name=row['name'],
+            description=row['description'],
+            price=row['price'],
+            category_id=self.categories[row['category']],
+        )
@@ -0,0 +1,85 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.models import Category, Product
+from products.search import IContainsSearchBackend, get_search_backend
+
+WORDS = [
+    'olma', 'nok', 'uzum', 'anor', 'shaftoli', 'qovun', 'tarvuz', 'non', 'sut', 'qatiq',
+    'telefon', 'noutbuk', 'quloqchin', 'monitor', 'klaviatura', 'sichqoncha', 'kabel', 'zaryadlovchi',
+    'ko‘ylak', 'shim', 'poyabzal', 'kurtka', 'sumka', 'soat', 'kitob', 'daftar', 'ruchka', 'qalam',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "icontains va to‘liq matnli qidiruv backendini solishtiradi. --seed bilan sintetik "
+        "mahsulotlar bitta tranzaksiyada yaratiladi va o‘lchovdan keyin bekor qilinadi (rollback)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Shuncha vaqtinchalik sintetik mahsulot bilan o‘lchash (masalan 1000000)")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=20, help="Har bir so‘rovda olinadigan qatorlar soni")
+        parser.add_argument('queries', nargs='*', default=['olma', 'telefon qora', 'kitob'])
+
+    def seed(self, count, batch_size):
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        rng = random.Random(42)
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            Product.objects.bulk_create([
+                Product(
+                    name=' '.join(rng.choices(WORDS, k=3)),
+                    description=' '.join(rng.choices(WORDS, k=30)),
+                    price=rng.randint(100, 100000) / 100,
+                    category=category,
+                )
+                for _ in range(size)
+            ])
+            created += size
+            self.stdout.write(f"{created}/{count} ta mahsulot yaratildi")
+        # bulk_create signal yubormaydi, indeksni bir martada qayta quramiz
+        get_search_backend().rebuild()
+
+    def measure(self, backend, query, repeat, limit):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queryset = backend.search(Product.objects.all(), query)
+            if backend.ranked:
+                queryset = queryset.order_by(backend.rank_field, 'id')
+            # ro‘yxat endpointi kabi: sahifa + umumiy son
+            list(queryset.values_list('id', flat=True)[:limit])
+            queryset.count()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
+
+    def handle(self, *args, **options):
+        if not options['seed']:
+            self.run(options)
+            return
+        # Ishlab chiquvchi bazasi o‘zgarmaydi: sintetik mahsulotlar va indeks oxirida bekor qilinadi
+        with transaction.atomic():
+            self.seed(options['seed'], options['batch_size'])
+            self.run(options)
+            transaction.set_rollback(True)
+        self.stdout.write("Sintetik mahsulotlar o‘chirildi (rollback)")
+
+    def run(self, options):
+        self.stdout.write(f"Mahsulotlar soni: {Product.objects.count()}")
+        baseline = IContainsSearchBackend()
+        backend = get_search_backend()
+        for query in options['queries']:
+            old = self.measure(baseline, query, options['repeat'], options['limit'])
+            new = self.measure(backend, query, options['repeat'], options['limit'])
+            self.stdout.write(
+                f"{query!r}: icontains {old:.1f} ms, {type(backend).__name__} {new:.1f} ms "
+                f"({old / new if new else float('inf'):.1f}x)"
+            )
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from products.models import Product
+from products.serializers import ProductSerializer
+from shop_api.compiled import compiled_serializer
+
+
+class Command(BaseCommand):
+    help = "ModelSerializer va kompilyatsiya qilingan serializatsiyaning bir qatorga sarfini solishtiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help="Har bir o‘lchovdagi qatorlar soni")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def measure(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            content = render()
+            timings.append(time.perf_counter() - started)
+        return min(timings), content
+
+    def compare(self, label, serializer_class, queryset, limit, repeat):
+        queryset = queryset.order_by('pk')[:limit]
+        rows = queryset.count()
+        if not rows:
+            self.stdout.write(f"{label}: ma'lumot yo‘q, o‘tkazib yuborildi")
+            return
+        renderer = JSONRenderer()
+        compiled = compiled_serializer(serializer_class)
+        # so‘rovlar + serializatsiya + JSON, endpointlardagi kabi
+        old, expected = self.measure(
+            lambda: renderer.render(serializer_class(serializer_class.setup_eager_loading(queryset), many=True).data),
+            repeat,
+        )
+        new, content = self.measure(lambda: renderer.render(compiled.serialize(queryset)), repeat)
+        self.stdout.write(
+            f"{label} ({rows} qator): ModelSerializer {old / rows * 1e6:.1f} µs/qator, "
+            f"compiled {new / rows * 1e6:.1f} µs/qator ({old / new if new else float('inf'):.1f}x), "
+            f"natija {'bir xil' if content == expected else 'FARQ QILADI'}"
+        )
+
+    def handle(self, *args, **options):
+        self.compare('Mahsulotlar', ProductSerializer, Product.objects.all(), options['limit'], options['repeat'])
+        self.compare('Buyurtmalar', OrderSerializer, Order.objects.all(), options['limit'], options['repeat'])
@@ -0,0 +1,47 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from products.images import build_variants, save_variants
+from products.models import Product
+
+
+def _build(item):
+    # Bola jarayonda faqat Pillow va storage ishlaydi, bazaga asosiy jarayon yozadi
+    product_id, source, previous = item
+    try:
+        return product_id, build_variants(product_id, source), previous, None
+    except Exception as exc:
+        return product_id, None, previous, exc
+
+
+class Command(BaseCommand):
+    help = "Mavjud mahsulot rasmlari uchun o‘lcham variantlarini parallel jarayonlarda yaratadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help="Variantlari bor rasmlarni ham qayta yaratish")
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+        items = [
+            (pk, image, variants)
+            for pk, image, variants in products.values_list('pk', 'image', 'image_variants').iterator()
+            if options['force'] or (variants or {}).get('source') != image
+        ]
+        if not items:
+            self.stdout.write("Yangilanadigan rasm yo‘q")
+            return
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+            for product_id, variants, previous, error in executor.map(_build, items, chunksize=8):
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f"{product_id}: {error}")
+                    continue
+                if save_variants(product_id, variants, previous):
+                    done += 1
+        self.stdout.write(self.style.SUCCESS(f"{done} ta rasm uchun variantlar yaratildi, {failed} ta xato"))
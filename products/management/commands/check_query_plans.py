@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.queryplans import HOT_QUERIES as ORDER_QUERIES
+from products.queryplans import HOT_QUERIES as PRODUCT_QUERIES
+from shop_api.queryplans import explain, plan_problems, suggest_index
+
+
+class Command(BaseCommand):
+    help = "Ro‘yxat endpointlarining asosiy so‘rovlari uchun EXPLAIN: to‘liq skan va vaqtinchalik saralashni topadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plans', action='store_true', help="Har bir so‘rovning to‘liq planini chiqarish")
+
+    def handle(self, *args, **options):
+        failed = 0
+        for group, hot_queries in (('Mahsulotlar', PRODUCT_QUERIES), ('Buyurtmalar', ORDER_QUERIES)):
+            for hot_query in hot_queries:
+                queryset = hot_query.queryset()
+                problems = plan_problems(queryset, hot_query.allow)
+                label = f"{group}: {hot_query.label}"
+                if not problems:
+                    self.stdout.write(self.style.SUCCESS(f"OK    {label}"))
+                else:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"XATO  {label}"))
+                    for kind, line in problems:
+                        self.stdout.write(f"      {kind}: {line}")
+                    fields = suggest_index(queryset)
+                    if fields:
+                        self.stdout.write(f"      maslahat: models.Index(fields={fields!r})")
+                if options['plans']:
+                    for line in explain(queryset):
+                        self.stdout.write(f"      | {line}")
+        if failed:
+            raise CommandError(f"{failed} ta so‘rov indeksdan foydalanmayapti")
@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import BATCH_SIZE, READERS, ProductImporter
+
+
+class Command(BaseCommand):
+    help = "CSV yoki JSONL katalogdan mahsulotlarni bo‘laklab import qiladi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS), help="Berilmasa, fayl kengaytmasidan aniqlanadi")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f"Noma'lum format: {file_format!r} (csv yoki jsonl)")
+
+        def progress(result):
+            self.stdout.write(
+                f"{result.rows} qator: {result.created} yaratildi, {result.updated} yangilandi, "
+                f"{result.error_count} xato"
+            )
+
+        importer = ProductImporter(batch_size=options['batch_size'], progress=progress)
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            result = importer.run(READERS[file_format](stream))
+
+        for error in result.errors:
+            self.stderr.write(f"{error['line']}-qator: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Tugadi: {result.created} yaratildi, {result.updated} yangilandi, {result.error_count} xato"
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from products.facets import rebuild_facet_index
+
+
+class Command(BaseCommand):
+    help = "Filtrsiz katalog uchun facet indeksini (FacetCount) qayta hisoblaydi"
+
+    def handle(self, *args, **options):
+        facets = rebuild_facet_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"{facets['total']} ta mahsulot, {len(facets['categories'])} ta toifa, {len(facets['tags'])} ta teg"
+        ))
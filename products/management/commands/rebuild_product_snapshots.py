@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.snapshots import CHUNK_SIZE, refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = "Barcha mahsulotlar uchun JSON snapshotlarni qayta yaratadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        payloads = refresh_snapshots(Product.objects.all(), chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{len(payloads)} ta snapshot yangilandi"))
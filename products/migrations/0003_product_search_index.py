@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE products_product_fts USING fts5("
+            "name, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        # rank ustuni: nomdagi moslik tavsifdagidan 10 barobar og‘irroq
+        schema_editor.execute(
+            "INSERT INTO products_product_fts (products_product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')"
+        )
+        schema_editor.execute(
+            "INSERT INTO products_product_fts (rowid, name, description) "
+            "SELECT id, name, COALESCE(description, '') FROM products_product"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE products_product_search ("
+            "product_id bigint PRIMARY KEY REFERENCES products_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX products_product_search_document_gin ON products_product_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO products_product_search (product_id, document) "
+            "SELECT id, setweight(to_tsvector('simple', name), 'A') || "
+            "setweight(to_tsvector('simple', COALESCE(description, '')), 'B') FROM products_product"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS products_product_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS products_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_product_description_alter_product_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 05:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSnapshot',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='products.product')),
+                ('payload', models.BinaryField()),
+                ('source_updated_at', models.DateTimeField()),
+            ],
+        ),
+    ]
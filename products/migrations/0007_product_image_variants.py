@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 05:47
+
+from django.db import migrations, models
+
+
+def drop_snapshots(apps, schema_editor):
+    # ProductSerializer yangi maydonlarni qaytaradi; eski snapshotlar o‘qishda qayta yaratiladi
+    apps.get_model('products', 'ProductSnapshot').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_facetcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(drop_snapshots, migrations.RunPython.noop),
+    ]
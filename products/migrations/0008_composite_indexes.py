@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'created_at'], name='product_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at'], name='product_created_idx'),
+        ),
+        # Avtomatik oraliq jadvalda Meta.indexes yo‘q: ?tag= filtri uchun teskari (tag, product) indeksi
+        migrations.RunSQL(
+            'CREATE INDEX product_tags_tag_product_idx ON products_product_tags (tag_id, product_id)',
+            'DROP INDEX product_tags_tag_product_idx',
+        ),
+    ]
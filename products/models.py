@@ -23,10 +23,54 @@ class Product(models.Model):
     description = models.TextField(blank=True, null=True, db_index=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # {'source': rasm nomi, 'sizes': {'thumbnail': {'width', 'height', 'webp', 'jpeg'}, ...}}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     category = models.ForeignKey(Category, related_name='products', on_delete=models.CASCADE)
     tags = models.ManyToManyField(Tag, related_name='products', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # ProductListView filtrlari + tartiblash uchun (shop_api/queryplans.py da tekshiriladi)
+        indexes = [
+            models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+            models.Index(fields=['category', 'created_at'], name='product_category_created_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(fields=['created_at'], name='product_created_idx'),
+        ]
     
     def __str__(self):
         return self.name
-    
\ No newline at end of file
+    
+
+class ProductSnapshot(models.Model):
+    """Mahsulotning oldindan tayyorlangan ochiq JSON ko‘rinishi (ProductSerializer natijasi)"""
+    product = models.OneToOneField(Product, primary_key=True, related_name='snapshot', on_delete=models.CASCADE)
+    payload = models.BinaryField()
+    source_updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.product_id} snapshot"
+
+
+class FacetCount(models.Model):
+    """Filtrsiz katalog uchun oldindan hisoblangan facet soni (signallar bilan yangilanadi)"""
+
+    FACET_CHOICES = [
+        ('total', 'Jami'),
+        ('category', 'Toifa'),
+        ('tag', 'Teg'),
+        ('price', 'Narx oralig‘i'),
+    ]
+
+    facet = models.CharField(max_length=20, choices=FACET_CHOICES)
+    value = models.CharField(max_length=50, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_facet_value'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}:{self.value} = {self.count}"
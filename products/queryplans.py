@@ -0,0 +1,30 @@
+from products.filters import filter_products, product_ordering
+from products.models import Product
+from shop_api.queryplans import TEMP_SORT, HotQuery
+
+PAGE_SIZE = 20
+
+
+def product_page(params, order_by=None):
+    """ProductListView sahifasi bilan bir xil filtr, tartib va LIMIT"""
+    def build():
+        queryset = filter_products(Product.objects.all(), params)
+        return queryset.order_by(*product_ordering(order_by))[:PAGE_SIZE]
+    return build
+
+
+# ProductListView ning asosiy filtr + tartib kombinatsiyalari
+HOT_QUERIES = [
+    HotQuery('category', product_page({'category': 1})),
+    HotQuery('category, price', product_page({'category': 1}, 'price')),
+    HotQuery('category, -price', product_page({'category': 1}, '-price')),
+    HotQuery('category, -created_at', product_page({'category': 1}, '-created_at')),
+    HotQuery('category + price range, price', product_page({'category': 1, 'price_min': 10, 'price_max': 50}, 'price')),
+    HotQuery('price range, price', product_page({'price_min': 10, 'price_max': 50}, 'price')),
+    HotQuery('price', product_page({}, 'price')),
+    HotQuery('-created_at', product_page({}, '-created_at')),
+    HotQuery('name', product_page({}, 'name')),
+    # Teg indeksdan topiladi, faqat shu tegdagi mahsulotlar saralanadi
+    HotQuery('tag', product_page({'tag': 1}), allow=[TEMP_SORT]),
+    HotQuery('tag, price', product_page({'tag': 1}, 'price'), allow=[TEMP_SORT]),
+]
@@ -0,0 +1,183 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from products.models import Product
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+CHUNK_SIZE = 500
+
+
+def search_terms(query):
+    return TERM_RE.findall(query or '')
+
+
+class BaseSearchBackend:
+    """Mahsulotlarni qidirish backendlari uchun umumiy interfeys"""
+
+    #: search() natijasiga extra(select=...) orqali qo‘shiladigan ustun (kichik qiymat = yuqori o‘rin)
+    rank_field = 'search_rank'
+    ranked = False
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def update(self, product):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def update_many(self, product_ids):
+        """Ko‘p mahsulotni bitta INSERT ... SELECT bilan qayta indekslaydi (bulk yo‘llar uchun)"""
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """Indekssiz backend: name/description bo‘yicha icontains (eski xatti-harakat)"""
+
+    def search(self, queryset, query):
+        return queryset.filter(Q(name__icontains=query) | Q(description__icontains=query))
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 virtual jadvali (products_product_fts, rowid = mahsulot id).
+
+    Indeks mahsulotlar jadvaliga rowid orqali JOIN qilinadi, shuning uchun
+    SQLite avval FTS indeksidan mos qatorlarni topadi, keyin PK bo‘yicha
+    mahsulotni oladi. Tartib uchun FTS5 ning yashirin rank ustuni
+    (migratsiyada bm25(10.0, 1.0) qilib sozlangan) ishlatiladi.
+    """
+
+    table = 'products_product_fts'
+    ranked = True
+
+    def match_expression(self, query):
+        terms = search_terms(query)
+        return ' '.join(f'"{term}"*' for term in terms) if terms else None
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if match is None:
+            return queryset.none()
+        table = self.table
+        return queryset.extra(
+            tables=[table],
+            where=[f'{table}.rowid = {Product._meta.db_table}.id', f'{table}.{table} MATCH %s'],
+            params=[match],
+            select={self.rank_field: f'{table}.rank'},
+        )
+
+    def update(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) VALUES (%s, %s, %s)',
+                [product.pk, product.name, product.description or ''],
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [[pk] for pk in product_ids])
+
+    def update_many(self, product_ids):
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), CHUNK_SIZE):
+            chunk = product_ids[start:start + CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', chunk)
+                cursor.execute(
+                    f'INSERT INTO {self.table} (rowid, name, description) '
+                    f'SELECT id, name, COALESCE(description, \'\') FROM {Product._meta.db_table} '
+                    f'WHERE id IN ({placeholders})',
+                    chunk,
+                )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) '
+                f'SELECT id, name, COALESCE(description, \'\') FROM {Product._meta.db_table}'
+            )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """PostgreSQL tsvector + GIN indeks (products_product_search jadvali)"""
+
+    table = 'products_product_search'
+    config = 'simple'
+    ranked = True
+    document_sql = (
+        "setweight(to_tsvector('{config}', {name}), 'A') || "
+        "setweight(to_tsvector('{config}', COALESCE({description}, '')), 'B')"
+    )
+
+    def tsquery(self, query):
+        terms = search_terms(query)
+        return ' & '.join(f'{term}:*' for term in terms) if terms else None
+
+    def search(self, queryset, query):
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return queryset.none()
+        table = self.table
+        return queryset.extra(
+            tables=[table],
+            where=[
+                f'{table}.product_id = {Product._meta.db_table}.id',
+                f"{table}.document @@ to_tsquery('{self.config}', %s)",
+            ],
+            params=[tsquery],
+            # ts_rank katta = yaxshi, shuning uchun teskari ishora
+            select={self.rank_field: f"-ts_rank({table}.document, to_tsquery('{self.config}', %s))"},
+            select_params=[tsquery],
+        )
+
+    def update(self, product):
+        document = self.document_sql.format(config=self.config, name='%s', description='%s')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (product_id, document) VALUES (%s, {document}) '
+                f'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                [product.pk, product.name, product.description],
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE product_id = ANY(%s)', [list(product_ids)])
+
+    def update_many(self, product_ids):
+        document = self.document_sql.format(config=self.config, name='name', description='description')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (product_id, document) '
+                f'SELECT id, {document} FROM {Product._meta.db_table} WHERE id = ANY(%s) '
+                f'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                [list(product_ids)],
+            )
+
+    def rebuild(self):
+        document = self.document_sql.format(config=self.config, name='name', description='description')
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (product_id, document) '
+                f'SELECT id, {document} FROM {Product._meta.db_table}'
+            )
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    return BACKENDS.get(connection.vendor, IContainsSearchBackend)()
@@ -1,23 +1,63 @@
+from django.db import models
 from rest_framework import serializers
+from products.images import variant_srcset, variant_urls
 from products.models import Product, Category, Tag
+from products.taxonomy import taxonomy
+from shop_api.fieldsets import DynamicFieldsMixin
 
-class CategorySerializer(serializers.ModelSerializer):
+class TaxonomySerializerMixin:
+    """Obyekt id bo‘yicha jarayon ichidagi keshdan olinadi (JOIN va qo‘shimcha so‘rovsiz)"""
+
+    @classmethod
+    def cached_row(cls, pk):
+        return taxonomy.row(cls.Meta.model, pk)
+
+    def to_representation(self, instance):
+        if not isinstance(instance, models.Model):
+            instance = taxonomy.get(self.Meta.model, instance)
+        return super().to_representation(instance)
+
+class CategorySerializer(TaxonomySerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'description']
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TaxonomySerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
 
-class ProductSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # Savat va buyurtma elementlari ichida standart ko‘rinish
+    summary_fields = ['id', 'name', 'price', 'image']
+    field_dependencies = {
+        'image_variants': {'image': {}},
+        'image_srcset': {'image': {}, 'image_variants': {}},
+    }
+
+    # Toifa category_id bo‘yicha keshdan olinadi, products_category bilan JOIN qilinmaydi
+    category = CategorySerializer(read_only=True, source='category_id')
     tags = TagSerializer(many=True, read_only=True)
+    image_variants = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'image', 'category', 'tags', 'created_at']
+        fields = ['id', 'name', 'description', 'price', 'image', 'image_variants', 'image_srcset',
+                  'category', 'tags', 'created_at']
+
+    # CompiledSerializer uchun: SerializerMethodField -> (ustunlar, ustun qiymatlaridan natija)
+    compiled_fields = {
+        'image_variants': (['image', 'image_variants'], variant_urls),
+        'image_srcset': (['image', 'image_variants'], variant_srcset),
+    }
+
+    def get_image_variants(self, product):
+        return variant_urls(product.image.name, product.image_variants)
+
+    def get_image_srcset(self, product):
+        """<picture> uchun har bir format bo‘yicha srcset satri"""
+        return variant_srcset(product.image.name, product.image_variants)
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -28,4 +68,47 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
 class ProductAdminSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'image', 'category', 'tags']
\ No newline at end of file
+        fields = ['id', 'name', 'description', 'price', 'image', 'category', 'tags']
+
+class ProductBulkActionSerializer(serializers.Serializer):
+    OPERATIONS = ['set_price', 'scale_price', 'set_category', 'add_tags', 'remove_tags', 'delete']
+    FILTER_KEYS = ['category', 'tag', 'price_min', 'price_max', 'search']
+    REQUIRED_VALUES = {
+        'set_price': 'price',
+        'scale_price': 'factor',
+        'set_category': 'category',
+        'add_tags': 'tags',
+        'remove_tags': 'tags',
+    }
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    filter = serializers.DictField(child=serializers.CharField(), required=False)
+    operation = serializers.ChoiceField(choices=OPERATIONS)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    factor = serializers.DecimalField(max_digits=8, decimal_places=4, min_value=0, required=False)
+    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), required=False)
+    tags = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+    def validate_filter(self, value):
+        unknown = set(value) - set(self.FILTER_KEYS)
+        if unknown:
+            raise serializers.ValidationError(f"Noma'lum filtrlar: {', '.join(sorted(unknown))}")
+        if not any(value.values()):
+            raise serializers.ValidationError("Kamida bitta filtr berilishi kerak")
+        return value
+
+    def validate_tags(self, value):
+        value = sorted(set(value))
+        found = set(Tag.objects.filter(pk__in=value).values_list('pk', flat=True))
+        missing = [pk for pk in value if pk not in found]
+        if missing:
+            raise serializers.ValidationError(f"Teglar topilmadi: {missing}")
+        return value
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("ids yoki filter dan faqat bittasi berilishi kerak")
+        required = self.REQUIRED_VALUES.get(attrs['operation'])
+        if required and required not in attrs:
+            raise serializers.ValidationError({required: "Bu amal uchun majburiy"})
+        return attrs
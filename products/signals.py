@@ -0,0 +1,215 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from products.cache import bump_catalog_generation
+from products.images import clear_variants, schedule_variants
+from products.facets import apply_facet_deltas, bucket_for, drop_facet_value, facet_index_enabled, rebuild_facet_index
+from products.models import Category, Product, Tag
+from products.search import get_search_backend
+from products.snapshots import refresh_snapshots
+from products.taxonomy import taxonomy
+
+
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_search_backend().update(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+# API, Django admin va boshqa har qanday yozuv katalog keshini eskirtiradi
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_generation()
+
+
+# Toifa va teglar workerlardagi jarayon ichidagi keshda ham saqlanadi
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def invalidate_taxonomy(sender, **kwargs):
+    taxonomy.invalidate()
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def invalidate_catalog_cache_on_tags(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_catalog_generation()
+
+
+# updated_at mahsulotning ochiq ko‘rinishi (toifa va teglari bilan) o‘zgargan vaqtni bildiradi
+@receiver(post_save, sender=Category)
+def touch_category_products(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        Product.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_products(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        Product.objects.filter(tags=instance).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def touch_products_on_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        Product.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    elif action == 'pre_clear':
+        Product.objects.filter(tags=instance).update(updated_at=timezone.now())
+    else:
+        Product.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+
+
+# Rasm variantlari so‘rov yo‘lidan tashqarida, fon oqimlarida yaratiladi
+@receiver(post_save, sender=Product)
+def update_image_variants(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    source = instance.image.name if instance.image else ''
+    if source and (instance.image_variants or {}).get('source') != source:
+        schedule_variants(instance)
+    elif not source and instance.image_variants:
+        clear_variants(instance)
+
+
+@receiver(post_delete, sender=Product)
+def delete_image_variants(sender, instance, **kwargs):
+    if instance.image_variants:
+        clear_variants(instance)
+
+
+# Snapshotlar tranzaksiya tugagach (updated_at yangilangandan keyin) qayta yaratiladi;
+# o‘qishda eskirgan snapshot topilsa, u ham jonli serializatsiya bilan almashtiriladi.
+def refresh_snapshots_on_commit(queryset):
+    transaction.on_commit(lambda: refresh_snapshots(queryset))
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_snapshot(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_snapshots_on_commit(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_snapshots(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        refresh_snapshots_on_commit(Product.objects.filter(category_id=instance.pk))
+
+
+@receiver(post_save, sender=Tag)
+def refresh_tag_snapshots(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        refresh_snapshots_on_commit(Product.objects.filter(tags=instance.pk))
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def refresh_snapshots_on_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_snapshots_on_commit(Product.objects.filter(pk=instance.pk))
+    elif pk_set:
+        refresh_snapshots_on_commit(Product.objects.filter(pk__in=list(pk_set)))
+
+
+# Facet indeksi: har bir o‘zgarish faqat tegishli hisoblagichlarni F() bilan o‘zgartiradi
+@receiver(pre_save, sender=Product)
+def remember_facet_state(sender, instance, raw=False, **kwargs):
+    if facet_index_enabled() and not raw and instance.pk:
+        instance._facet_previous = Product.objects.filter(pk=instance.pk).values('category_id', 'price').first()
+
+
+@receiver(post_save, sender=Product)
+def update_facets_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not facet_index_enabled():
+        return
+    previous = None if created else getattr(instance, '_facet_previous', None)
+    deltas = {}
+    if previous is None:
+        deltas[('total', '')] = 1
+    else:
+        deltas[('category', previous['category_id'])] = -1
+        deltas[('price', bucket_for(previous['price']))] = -1
+    key = ('category', instance.category_id)
+    deltas[key] = deltas.get(key, 0) + 1
+    key = ('price', bucket_for(instance.price))
+    deltas[key] = deltas.get(key, 0) + 1
+    apply_facet_deltas(deltas)
+
+
+@receiver(pre_delete, sender=Product)
+def remember_facet_tags(sender, instance, **kwargs):
+    if facet_index_enabled():
+        instance._facet_tag_ids = list(instance.tags.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def update_facets_on_delete(sender, instance, **kwargs):
+    if not facet_index_enabled():
+        return
+    deltas = {
+        ('total', ''): -1,
+        ('category', instance.category_id): -1,
+        ('price', bucket_for(instance.price)): -1,
+    }
+    for tag_id in getattr(instance, '_facet_tag_ids', []):
+        deltas[('tag', tag_id)] = -1
+    apply_facet_deltas(deltas)
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def update_facets_on_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not facet_index_enabled() or action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        count = instance.products.count() if action == 'pre_clear' else len(pk_set)
+        apply_facet_deltas({('tag', instance.pk): sign * count})
+    else:
+        tag_ids = instance.tags.values_list('id', flat=True) if action == 'pre_clear' else pk_set
+        apply_facet_deltas({('tag', tag_id): sign for tag_id in tag_ids})
+
+
+@receiver(post_delete, sender=Category)
+def drop_category_facet(sender, instance, **kwargs):
+    drop_facet_value('category', instance.pk)
+
+
+@receiver(post_delete, sender=Tag)
+def drop_tag_facet(sender, instance, **kwargs):
+    drop_facet_value('tag', instance.pk)
+
+
+# Bulk yo‘llar (import, ommaviy yangilash) model signallarini chetlab o‘tadi, shuning uchun
+# bitta qatorli yo‘l qiladigan ishlarni shu signal orqali bajaradi:
+#   product_ids — qo‘shilgan/o‘zgargan mahsulotlar, deleted_ids — o‘chirilganlar,
+#   facets=False — facet indeksini hozircha qayta hisoblamaslik (masalan, importning oraliq bo‘laklari).
+# Snapshotlar updated_at orqali eskirgan deb topilib, o‘qishda yangilanadi.
+products_bulk_changed = Signal()
+
+
+@receiver(products_bulk_changed)
+def handle_products_bulk_changed(sender, product_ids=(), deleted_ids=(), facets=True, **kwargs):
+    backend = get_search_backend()
+    if deleted_ids:
+        backend.remove(deleted_ids)
+    if product_ids:
+        backend.update_many(product_ids)
+    if facets and facet_index_enabled():
+        rebuild_facet_index()
+    bump_catalog_generation()
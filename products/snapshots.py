@@ -0,0 +1,82 @@
+from rest_framework.renderers import JSONRenderer
+
+from products.models import Product, ProductSnapshot
+from products.serializers import ProductSerializer
+from products.taxonomy import taxonomy
+from shop_api.compiled import compiled_serializer
+
+CHUNK_SIZE = 500
+
+
+def render_product(product):
+    """ProductSerializer natijasi, API javobidagi bilan bir xil JSON baytlari"""
+    return JSONRenderer().render(ProductSerializer(product).data)
+
+
+def render_chunk(compiled, queryset):
+    """
+    Bo‘lakni toifa/teg keshining bitta generatsiyasi bilan render qiladi.
+
+    Render davomida boshqa worker toifa yoki tegni o‘zgartirsa (generatsiya
+    oshsa), eski nomlar snapshotga yozilmasin: bo‘lak qayta render qilinadi.
+    """
+    while True:
+        generation = taxonomy.check()
+        rows = compiled.rows(queryset, 'updated_at')
+        if taxonomy.shared_generation() == generation:
+            return rows
+
+
+def refresh_snapshots(queryset, chunk_size=CHUNK_SIZE):
+    """Berilgan mahsulotlar uchun snapshotlarni qayta yaratadi, {id: payload} qaytaradi"""
+    payloads = {}
+    # Model obyektlarisiz: values() qatorlaridan ProductSerializer bilan bir xil natija
+    compiled = compiled_serializer(ProductSerializer)
+    renderer = JSONRenderer()
+    queryset = queryset.order_by('pk')
+    last_pk = 0
+    while True:
+        rows = render_chunk(compiled, queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not rows:
+            break
+        snapshots = [
+            ProductSnapshot(product_id=row['id'], payload=renderer.render(data), source_updated_at=row['updated_at'])
+            for row, data in rows
+        ]
+        ProductSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['payload', 'source_updated_at'],
+        )
+        payloads.update((snapshot.product_id, bytes(snapshot.payload)) for snapshot in snapshots)
+        last_pk = rows[-1][0]['id']
+    return payloads
+
+
+def product_payloads(products):
+    """
+    Mahsulotlarning JSON baytlari, berilgan tartibda.
+
+    products select_related('snapshot') bilan olingan bo‘lishi kerak, shunda
+    snapshotlar shu so‘rovning o‘zida keladi. Snapshot yo‘q yoki eskirgan
+    (source_updated_at != updated_at) bo‘lsa, jonli serializatsiya qilinib
+    snapshot yangilanadi.
+    """
+    payloads = {}
+    stale = []
+    for product in products:
+        snapshot = getattr(product, 'snapshot', None)
+        if snapshot is None or snapshot.source_updated_at != product.updated_at:
+            stale.append(product.pk)
+        else:
+            payloads[product.pk] = bytes(snapshot.payload)
+    if stale:
+        payloads.update(refresh_snapshots(Product.objects.filter(pk__in=stale)))
+    return [payloads[product.pk] for product in products if product.pk in payloads]
+
+
+def splice_json(envelope, key, payloads):
+    """envelope lug‘atiga oldindan tayyor JSON qismlarni key ostida ro‘yxat qilib qo‘shadi"""
+    head = JSONRenderer().render(envelope)
+    return b''.join([head[:-1], b',"', key.encode('utf-8'), b'":[', b','.join(payloads), b']}'])
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+
+from products.cache import get_catalog_cache
+
+GENERATION_KEY = 'catalog:taxonomy'
+
+
+class TaxonomyCache:
+    """
+    Category va Tag qatorlarining jarayon (worker) ichidagi keshi.
+
+    Umumiy keshdagi generatsiya raqami har bir so‘rovda bir marta
+    tekshiriladi: boshqa worker (API, Django admin) toifa yoki tegni
+    o‘zgartirsa, raqam oshadi va bu worker jadvallarni qayta o‘qiydi.
+    So‘rovdan tashqarida (management buyruqlari, fon oqimlari) so‘rov
+    sikli yo‘q, shuning uchun generatsiya har bir murojaatda tekshiriladi.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = None
+        self._checked = False
+        self._rows = {}
+        self._instances = {}
+
+    def shared_generation(self):
+        cache = get_catalog_cache()
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            cache.add(GENERATION_KEY, time.time_ns(), None)
+            generation = cache.get(GENERATION_KEY)
+        return generation
+
+    def check(self):
+        """Generatsiyani tekshiradi, eskirgan bo‘lsa keshni tozalaydi; joriy generatsiyani qaytaradi"""
+        generation = self.shared_generation()
+        with self._lock:
+            if generation != self._generation:
+                self._rows, self._instances = {}, {}
+                self._generation = generation
+            self._checked = True
+        return generation
+
+    def _ensure_checked(self):
+        if not self._checked or not getattr(self._local, 'in_request', False):
+            self.check()
+
+    def request_started(self, **kwargs):
+        self._checked = False
+        self._local.in_request = True
+
+    def request_finished(self, **kwargs):
+        self._local.in_request = False
+
+    def clear(self):
+        with self._lock:
+            self._rows, self._instances = {}, {}
+
+    def invalidate(self):
+        """Shu jarayonda darhol, boshqa workerlarda tranzaksiya tugagach eskirtiradi"""
+        self.clear()
+
+        def bump():
+            self.clear()
+            cache = get_catalog_cache()
+            try:
+                cache.incr(GENERATION_KEY)
+            except ValueError:
+                cache.set(GENERATION_KEY, time.time_ns(), None)
+
+        transaction.on_commit(bump)
+
+    def instances(self, model):
+        """{pk: model obyekti}, pk tartibida"""
+        self._ensure_checked()
+        instances = self._instances.get(model)
+        if instances is None:
+            instances = {obj.pk: obj for obj in model._default_manager.order_by('pk')}
+            self._instances[model] = instances
+        return instances
+
+    def rows(self, model):
+        """{pk: values() qatori} — kompilyatsiya qilingan serializatsiya uchun"""
+        self._ensure_checked()
+        rows = self._rows.get(model)
+        if rows is None:
+            columns = [field.attname for field in model._meta.concrete_fields]
+            rows = {obj.pk: {column: getattr(obj, column) for column in columns}
+                    for obj in self.instances(model).values()}
+            self._rows[model] = rows
+        return rows
+
+    def _reload(self, model):
+        with self._lock:
+            self._instances.pop(model, None)
+            self._rows.pop(model, None)
+
+    def get(self, model, pk):
+        obj = self.instances(model).get(pk)
+        if obj is None and pk is not None:
+            # Generatsiya hali yetib kelmagan yangi qator: bir marta qayta o‘qiymiz
+            self._reload(model)
+            obj = self.instances(model).get(pk)
+        return obj
+
+    def row(self, model, pk):
+        row = self.rows(model).get(pk)
+        if row is None and pk is not None:
+            self._reload(model)
+            row = self.rows(model).get(pk)
+        return row
+
+
+taxonomy = TaxonomyCache()
+request_started.connect(taxonomy.request_started, dispatch_uid='products.taxonomy')
+request_finished.connect(taxonomy.request_finished, dispatch_uid='products.taxonomy')
@@ -1,3 +1,744 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from PIL import Image
+from rest_framework.test import APIClient
+
+from products.cache import get_catalog_cache
+from products.facets import rebuild_facet_index
+from products.images import generate_product_variants, variant_files
+from products.importer import ProductImporter, iter_jsonl
+from products.models import FacetCount, Product, ProductSnapshot, Category, Tag
+from products.queryplans import HOT_QUERIES
+from products.serializers import ProductSerializer
+from products.snapshots import refresh_snapshots
+from products.taxonomy import GENERATION_KEY, taxonomy
+from shop_api.compiled import compiled_serializer
+from shop_api.fieldsets import parse_field_paths
+from shop_api.pagination import MAX_PAGE_SIZE
+from shop_api.queryplans import FULL_SCAN, TEMP_SORT, check_hot_queries, plan_problems, suggest_index
+from users.models import User
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+def warm_taxonomy():
+    """Toifa/teg keshini joriy generatsiya bilan oldindan yuklaydi"""
+    taxonomy.check()
+    taxonomy.rows(Category), taxonomy.rows(Tag)
+
+
+def create_products(count, category=None, tags=()):
+    category = category or Category.objects.create(name=f"Toifa {Category.objects.count()}")
+    products = []
+    for i in range(count):
+        product = Product.objects.create(
+            name=f"Mahsulot {i}",
+            description=f"Tavsif {i}",
+            price=Decimal('10.00') + i,
+            category=category,
+        )
+        product.tags.set(tags)
+        products.append(product)
+    return products
+
+
+class ProductQueryCountTests(TestCase):
+    """So‘rovlar soni sahifa hajmiga bog‘liq bo‘lmasligi kerak"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [Tag.objects.create(name=f"teg{i}") for i in range(3)]
+        cls.products = create_products(30, tags=cls.tags)
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_caches()
+
+    def count_queries(self, url, data=None):
+        clear_caches()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_product_list_constant_queries(self):
+        url = reverse('product_list')
+        small = self.count_queries(url, {'page_size': 1})
+        large = self.count_queries(url, {'page_size': 30})
+        self.assertEqual(small, large)
+
+    def test_product_detail_constant_queries(self):
+        single = create_products(1, tags=self.tags[:1])[0]
+        url = reverse('product_detail', args=[single.pk])
+        one_tag = self.count_queries(url)
+        url = reverse('product_detail', args=[self.products[0].pk])
+        self.assertEqual(one_tag, self.count_queries(url))
+
+
+class ProductPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(25)
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_caches()
+
+    def walk(self, params):
+        url = reverse('product_list')
+        seen, cursor, pages = [], '', 0
+        while cursor is not None:
+            response = self.client.get(url, {**params, 'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('total', response.json())
+            seen += [item['id'] for item in response.json()['results']]
+            cursor = response.json()['next']
+            pages += 1
+        return seen, pages
+
+    def test_cursor_walks_all_products_in_order(self):
+        seen, pages = self.walk({'page_size': 10, 'order_by': '-price'})
+        expected = [p.pk for p in sorted(self.products, key=lambda p: (p.price, p.pk), reverse=True)]
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+
+    def test_cursor_previous_page(self):
+        url = reverse('product_list')
+        first = self.client.get(url, {'page_size': 10, 'order_by': 'name', 'cursor': ''}).json()
+        second = self.client.get(url, {'page_size': 10, 'order_by': 'name', 'cursor': first['next']}).json()
+        back = self.client.get(url, {'page_size': 10, 'order_by': 'name', 'cursor': second['previous']}).json()
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('product_list'), {'cursor': 'buzilgan'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(reverse('product_list'), {'page_size': 100000})
+        self.assertEqual(response.json()['page_size'], MAX_PAGE_SIZE)
+        self.assertEqual(response.json()['total'], 25)
+
+
+class ProductSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Meva")
+        cls.in_name = Product.objects.create(name="Qizil olma", description="Shirin", price=5, category=category)
+        cls.in_description = Product.objects.create(name="Sharbat", description="Olma va nok aralash", price=7, category=category)
+        cls.other = Product.objects.create(name="Non", description="Issiq", price=2, category=category)
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_caches()
+
+    def search(self, query):
+        response = self.client.get(reverse('product_list'), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_ranked_results(self):
+        self.assertEqual(self.search('olma'), [self.in_name.pk, self.in_description.pk])
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(self.search('olm nok'), [self.in_description.pk])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_index_follows_save_and_delete(self):
+        self.other.name = "Olma noni"
+        self.other.save()
+        self.assertIn(self.other.pk, self.search('olma'))
+        self.in_name.delete()
+        self.assertNotIn(self.in_name.pk, self.search('olma'))
+
+
+class CatalogResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_products(1)[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_caches()
+
+    def test_repeated_request_is_served_from_cache(self):
+        url = reverse('product_list')
+        self.assertEqual(self.client.get(url, {'page': 1})['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'page': '1'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_empty_cursor_is_not_page_mode(self):
+        url = reverse('product_list')
+        self.assertIn('total', self.client.get(url).json())
+        response = self.client.get(url, {'cursor': ''})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('next', response.json())
+
+    def test_writes_invalidate_cache(self):
+        url = reverse('product_detail', args=[self.product.pk])
+        self.client.get(url)
+        self.product.name = "Yangi nom"
+        self.product.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['name'], "Yangi nom")
+
+        self.client.get(url)
+        self.product.tags.add(Tag.objects.create(name="yangi"))
+        self.assertEqual(len(self.client.get(url).json()['tags']), 1)
+
+    def test_stale_response_while_another_worker_recomputes(self):
+        url = reverse('category_list')
+        self.client.get(url)
+        Category.objects.create(name="Boshqa")
+        # Qulf boshqa workerda: cache.add() False qaytaradi
+        with mock.patch.object(get_catalog_cache(), 'add', return_value=False):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'STALE')
+        self.assertEqual(len(response.data), 1)
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_products(1)[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_caches()
+
+    def test_product_detail_not_modified(self):
+        url = reverse('product_detail', args=[self.product.pk])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.product.category.name = "Yangi toifa"
+        self.product.category.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified_until_catalog_changes(self):
+        for url in (reverse('product_list'), reverse('category_list')):
+            response = self.client.get(url)
+            with self.assertNumQueries(0):
+                not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, 304)
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+        etag = self.client.get(reverse('product_list'))['ETag']
+        self.product.tags.add(Tag.objects.create(name="yangi"))
+        self.assertEqual(self.client.get(reverse('product_list'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_representation(self):
+        for url in (reverse('product_list'), reverse('product_detail', args=[self.product.pk])):
+            etag = self.client.get(url, {'fields': 'id,name'})['ETag']
+            self.assertEqual(self.client.get(url, {'fields': 'id,name'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            # Boshqa ko‘rinish (fields/expand/sahifa) eski validator bilan 304 olmaydi
+            for params in ({}, {'fields': 'id'}, {'expand': 'category'}):
+                response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+        etag = self.client.get(reverse('product_list'), {'page_size': 1})['ETag']
+        self.assertEqual(self.client.get(reverse('product_list'), {'page_size': 2}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ProductFieldsetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(3, tags=[Tag.objects.create(name="teg")])
+
+    def setUp(self):
+        clear_caches()
+
+    def test_list_and_detail_fields(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('product_list'), {'fields': 'id,name,category.name', 'order_by': 'price'})
+        self.assertEqual(response.json()['results'][0], {
+            'id': self.products[0].pk, 'name': self.products[0].name, 'category': {'name': self.products[0].category.name},
+        })
+        self.assertFalse(any('products_tag' in query['sql'] or 'snapshot' in query['sql'] for query in ctx.captured_queries))
+
+        response = self.client.get(reverse('product_list'), {'fields': 'name', 'cursor': ''})
+        self.assertEqual(set(response.json()['results'][0]), {'name'})
+        response = self.client.get(reverse('product_detail', args=[self.products[0].pk]), {'fields': 'price'})
+        self.assertEqual(response.json(), {'price': str(self.products[0].price)})
+
+class CompiledSerializerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = [Tag.objects.create(name=f"teg{i}") for i in range(3)]
+        cls.products = create_products(4, tags=tags[:2]) + create_products(2)
+        Product.objects.filter(pk=cls.products[0].pk).update(
+            image='products/olma.png',
+            image_variants={'source': 'products/olma.png', 'sizes': {
+                'thumbnail': {'width': 150, 'height': 75, 'webp': 'products/variants/olma-150.webp',
+                              'jpeg': 'products/variants/olma-150.jpeg'},
+            }},
+        )
+
+    def assertSameOutput(self, **options):
+        queryset = Product.objects.order_by('-price', 'id')
+        live = ProductSerializer(ProductSerializer.setup_eager_loading(queryset, **options), many=True, **options).data
+        warm_taxonomy()
+        with CaptureQueriesContext(connection) as ctx:
+            compiled = compiled_serializer(ProductSerializer, **options).serialize(queryset)
+        self.assertEqual(JSONRenderer().render(compiled), JSONRenderer().render(live))
+        return [query['sql'] for query in ctx.captured_queries]
+
+    def test_byte_identical_to_model_serializer(self):
+        # Toifa va teglar jarayon ichidagi keshdan: mahsulotlar + oraliq jadval
+        queries = self.assertSameOutput()
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('"products_category"' in sql or '"products_tag"' in sql for sql in queries))
+        self.assertEqual(len(self.assertSameOutput(fields=parse_field_paths('id,price,category.name'))), 1)
+        self.assertSameOutput(summary=True)
+
+
+class TaxonomyCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+998900000004', password='pass12345')
+        cls.product = create_products(1)[0]
+        cls.category = cls.product.category
+
+    def setUp(self):
+        clear_caches()
+        taxonomy.clear()
+
+    def test_rows_served_from_process_memory(self):
+        taxonomy.rows(Category)
+        with self.assertNumQueries(0):
+            self.assertEqual(taxonomy.row(Category, self.category.pk)['name'], self.category.name)
+
+    def test_write_invalidates_local_and_other_workers(self):
+        taxonomy.rows(Category)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.put(
+                reverse('category_update_delete', args=[self.category.pk]), {'name': "Yangi nom"}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        detail = self.client.get(reverse('product_detail', args=[self.product.pk])).json()
+        self.assertEqual(detail['category']['name'], "Yangi nom")
+
+        # Boshqa worker: signalsiz o‘zgarish + generatsiya oshirildi
+        Category.objects.filter(pk=self.category.pk).update(name="Boshqa worker")
+        get_catalog_cache().incr(GENERATION_KEY)
+        # So‘rovdan tashqarida (management buyruqlari kabi) generatsiya har murojaatda tekshiriladi
+        self.assertEqual(taxonomy.row(Category, self.category.pk)['name'], "Boshqa worker")
+
+
+class ProductSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name="teg")
+        cls.products = create_products(3, tags=[cls.tag])
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_caches()
+
+    def live(self, product):
+        product = Product.objects.get(pk=product.pk)
+        return JSONRenderer().render(ProductSerializer(product).data)
+
+    def test_detail_matches_live_serializer(self):
+        product = self.products[0]
+        response = self.client.get(reverse('product_detail', args=[product.pk]))
+        self.assertEqual(response.content, self.live(product))
+        self.assertTrue(ProductSnapshot.objects.filter(product=product).exists())
+
+    def test_list_splices_snapshots(self):
+        response = self.client.get(reverse('product_list'), {'order_by': '-price'})
+        data = json.loads(response.content)
+        self.assertEqual(data['total'], 3)
+        live = [json.loads(self.live(p)) for p in reversed(self.products)]
+        self.assertEqual(data['results'], live)
+
+    def test_snapshot_not_written_from_stale_taxonomy(self):
+        product = self.products[0]
+        warm_taxonomy()
+        compiled = compiled_serializer(ProductSerializer)
+        rows = compiled.rows
+
+        def rename_during_render(*args, **kwargs):
+            # Boshqa worker render paytida toifani o‘zgartiradi
+            result = rows(*args, **kwargs)
+            if Category.objects.filter(pk=product.category_id).exclude(name="Yangi toifa").update(name="Yangi toifa"):
+                get_catalog_cache().incr(GENERATION_KEY)
+            return result
+
+        with mock.patch.object(compiled, 'rows', side_effect=rename_during_render):
+            payloads = refresh_snapshots(Product.objects.filter(pk=product.pk))
+        self.assertEqual(json.loads(payloads[product.pk])['category']['name'], "Yangi toifa")
+
+    def test_stale_snapshot_is_replaced(self):
+        product = self.products[0]
+        self.client.get(reverse('product_detail', args=[product.pk]))
+        self.tag.name = "yangi teg"
+        self.tag.save()
+        clear_caches()
+        response = self.client.get(reverse('product_detail', args=[product.pk]))
+        self.assertEqual(json.loads(response.content)['tags'][0]['name'], "yangi teg")
+        self.assertEqual(response.content, self.live(product))
+
+
+class ProductFacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.red, cls.blue = Tag.objects.create(name="qizil"), Tag.objects.create(name="ko‘k")
+        cls.fruit = Category.objects.create(name="Meva")
+        cls.tech = Category.objects.create(name="Texnika")
+        Product.objects.create(name="Olma", price=10, category=cls.fruit).tags.set([cls.red])
+        Product.objects.create(name="Gilos", price=60, category=cls.fruit).tags.set([cls.red, cls.blue])
+        Product.objects.create(name="Telefon", price=2000, category=cls.tech).tags.set([cls.blue])
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_caches()
+
+    def facets(self, params=None):
+        clear_caches()
+        response = self.client.get(reverse('product_facets'), params or {})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return {
+            'total': data['total'],
+            'categories': {item['name']: item['count'] for item in data['categories']},
+            'tags': {item['name']: item['count'] for item in data['tags']},
+            'price': {item['min']: item['count'] for item in data['price'] if item['count']},
+        }
+
+    def test_filtered_facets(self):
+        self.assertEqual(self.facets({'category': self.fruit.pk}), {
+            'total': 2,
+            'categories': {"Meva": 2},
+            'tags': {"qizil": 2, "ko‘k": 1},
+            'price': {'0': 1, '50': 1},
+        })
+
+    def test_filtered_facets_constant_queries(self):
+        # Toifa/teg nomlari jarayon keshidan olinadi
+        warm_taxonomy()
+        with self.assertNumQueries(3):
+            self.client.get(reverse('product_facets'), {'tag': self.blue.pk})
+
+    def test_index_is_maintained_incrementally(self):
+        live = self.facets({'price_min': 0})
+        rebuild_facet_index()
+        self.assertEqual(self.facets(), live)
+
+        product = Product.objects.create(name="Nok", price=700, category=self.tech)
+        product.tags.add(self.red)
+        product.price = 5
+        product.category = self.fruit
+        product.save()
+        Product.objects.get(name="Telefon").delete()
+        self.blue.products.add(product)
+        self.red.products.remove(Product.objects.get(name="Olma"))
+
+        self.assertEqual(self.facets(), self.facets({'price_min': 0}))
+        self.assertEqual(FacetCount.objects.get(facet='total').count, 3)
+
+
+class ProductImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+998900000002', password='pass12345')
+        cls.fruit = Category.objects.create(name="Meva")
+        cls.existing = Product.objects.create(name="Eski", price=1, category=cls.fruit)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        clear_caches()
+
+    def upload(self, name, content):
+        return self.client.post(
+            reverse('product_import'),
+            {'file': SimpleUploadedFile(name, content.encode('utf-8'))},
+            format='multipart',
+        )
+
+    def test_csv_import_with_row_errors(self):
+        content = (
+            "name,description,price,category,tags,id\n"
+            "Olma,Qizil olma,12.5,Meva,qizil|yangi,\n"
+            "Telefon,,999,Texnika,yangi,\n"
+            ",,1,Meva,,\n"
+            "Nok,,abc,Meva,,\n"
+            f"Yangilangan,,3,Meva,,{self.existing.pk}\n"
+            "Yo‘q,,3,Meva,,999999\n"
+        )
+        response = self.upload('katalog.csv', content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rows'], 6)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual([error['line'] for error in response.data['errors']], [4, 5, 7])
+
+        olma = Product.objects.get(name="Olma")
+        self.assertEqual(sorted(olma.tags.values_list('name', flat=True)), ["qizil", "yangi"])
+        self.assertTrue(Category.objects.filter(name="Texnika").exists())
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Yangilangan")
+        response = self.client.get(reverse('product_list'), {'search': 'telefon'})
+        self.assertEqual([item['name'] for item in response.json()['results']], ["Telefon"])
+
+    def test_reimport_replaces_tags(self):
+        self.existing.tags.set([Tag.objects.create(name="eski"), Tag.objects.create(name="qizil")])
+        content = f"name,description,price,category,tags,id\nOlma,,12.5,Meva,qizil|yangi,{self.existing.pk}\n"
+        response = self.upload('katalog.csv', content)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(sorted(self.existing.tags.values_list('name', flat=True)), ["qizil", "yangi"])
+
+        self.upload('katalog.csv', f"name,description,price,category,tags,id\nOlma,,12.5,Meva,,{self.existing.pk}\n")
+        self.assertFalse(self.existing.tags.exists())
+
+    def test_jsonl_import_in_batches(self):
+        lines = [json.dumps({"name": f"Mahsulot {i}", "price": i, "category": "Meva", "tags": ["teg"]}) for i in range(25)]
+        lines.insert(3, "{buzilgan")
+        with CaptureQueriesContext(connection) as ctx:
+            result = ProductImporter(batch_size=10).run(iter_jsonl(io.StringIO("\n".join(lines))))
+        self.assertEqual((result.created, result.error_count), (25, 1))
+        self.assertEqual(Product.tags.through.objects.filter(tag__name="teg").count(), 25)
+        self.assertLess(len(ctx.captured_queries), 60)
+
+
+class ProductBulkActionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+998900000003', password='pass12345')
+        cls.fruit = Category.objects.create(name="Meva")
+        cls.tech = Category.objects.create(name="Texnika")
+        cls.tag = Tag.objects.create(name="chegirma")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        clear_caches()
+        self.fruits = create_products(5, category=self.fruit)
+        self.gadgets = create_products(3, category=self.tech)
+
+    def bulk(self, payload):
+        return self.client.post(reverse('product_bulk'), payload, format='json')
+
+    def test_scale_price_by_filter(self):
+        before = {p.pk: p.price for p in self.fruits}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.bulk({'filter': {'category': str(self.fruit.pk)}, 'operation': 'scale_price', 'factor': '1.1'})
+        self.assertEqual(response.status_code, 200)
+        # id lar Pythonga olinmaydi: bitta UPDATE ... WHERE id IN (SELECT ...)
+        updates = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('UPDATE "products_product"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('SELECT', updates[0])
+        self.assertEqual((response.data['matched'], response.data['affected']), (5, 5))
+        for product in Product.objects.filter(category=self.fruit):
+            self.assertEqual(product.price, (before[product.pk] * Decimal('1.1')).quantize(Decimal('0.01')))
+        self.assertEqual(Product.objects.get(pk=self.gadgets[0].pk).price, self.gadgets[0].price)
+
+    def test_tags_and_category_keep_facets_and_snapshots_fresh(self):
+        rebuild_facet_index()
+        ids = [p.pk for p in self.fruits[:2]]
+        self.client.get(reverse('product_detail', args=[ids[0]]))
+
+        self.assertEqual(self.bulk({'ids': ids, 'operation': 'add_tags', 'tags': [self.tag.pk]}).data['affected'], 2)
+        self.assertEqual(self.bulk({'ids': ids, 'operation': 'add_tags', 'tags': [self.tag.pk]}).data['affected'], 0)
+        self.bulk({'ids': ids, 'operation': 'set_category', 'category': self.tech.pk})
+
+        self.assertEqual(FacetCount.objects.get(facet='tag', value=str(self.tag.pk)).count, 2)
+        self.assertEqual(FacetCount.objects.get(facet='category', value=str(self.tech.pk)).count, 5)
+        data = self.client.get(reverse('product_detail', args=[ids[0]])).json()
+        self.assertEqual(data['category']['name'], "Texnika")
+        self.assertEqual([tag['name'] for tag in data['tags']], ["chegirma"])
+
+        self.bulk({'filter': {'tag': str(self.tag.pk)}, 'operation': 'remove_tags', 'tags': [self.tag.pk]})
+        self.assertFalse(Product.tags.through.objects.filter(tag=self.tag).exists())
+        self.assertGreater(Product.objects.get(pk=ids[1]).updated_at, Product.objects.get(pk=self.fruits[2].pk).updated_at)
+
+    def test_delete_in_single_transaction(self):
+        ids = [p.pk for p in self.gadgets]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.bulk({'ids': ids, 'operation': 'delete'})
+        self.assertEqual(response.data['affected'], 3)
+        self.assertFalse(Product.objects.filter(pk__in=ids).exists())
+        self.assertLess(len(ctx.captured_queries), 30)
+        response = self.client.get(reverse('product_list'), {'search': self.gadgets[0].name})
+        self.assertNotIn(self.gadgets[0].pk, [item['id'] for item in response.json()['results']])
+
+    def test_validation(self):
+        self.assertEqual(self.bulk({'operation': 'delete'}).status_code, 400)
+        self.assertEqual(self.bulk({'filter': {}, 'operation': 'delete'}).status_code, 400)
+        self.assertEqual(self.bulk({'ids': [1], 'operation': 'set_price'}).status_code, 400)
+        self.assertEqual(self.bulk({'ids': [1], 'operation': 'add_tags', 'tags': [999]}).status_code, 400)
+
+
+def image_file(name='rasm.png', size=(2000, 1000)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ProductImageVariantTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PRODUCT_IMAGE_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        clear_caches()
+        self.category = Category.objects.create(name="Meva")
+
+    def test_variants_created_after_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Olma", price=10, category=self.category, image=image_file())
+        product.refresh_from_db()
+        sizes = product.image_variants['sizes']
+        self.assertEqual({name: entry['width'] for name, entry in sizes.items()},
+                         {'thumbnail': 150, 'medium': 600, 'large': 1200})
+        self.assertTrue(all(default_storage.exists(sizes['medium'][ext]) for ext in ('webp', 'jpeg')))
+        with default_storage.open(sizes['thumbnail']['webp']) as stream:
+            self.assertEqual(Image.open(stream).format, 'WEBP')
+
+        data = APIClient().get(reverse('product_detail', args=[product.pk])).json()
+        self.assertEqual(data['image_variants']['thumbnail']['height'], 75)
+        self.assertTrue(data['image_srcset']['jpeg'].endswith('-1200.jpeg 1200w'))
+
+        old_files = [entry['webp'] for entry in sizes.values()]
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image = None
+            product.save()
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants, {})
+        self.assertFalse(any(default_storage.exists(path) for path in old_files))
+
+    def test_same_stem_does_not_share_variant_files(self):
+        png = default_storage.save('products/a.png', image_file())
+        jpg = default_storage.save('products/a.jpg', image_file(size=(300, 300)))
+        first, second = create_products(2, category=self.category)
+        Product.objects.filter(pk=first.pk).update(image=png)
+        Product.objects.filter(pk=second.pk).update(image=jpg)
+        generate_product_variants(first.pk, png)
+        generate_product_variants(second.pk, jpg)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        first_files, second_files = variant_files(first.image_variants), variant_files(second.image_variants)
+        self.assertFalse(set(first_files) & set(second_files))
+        self.assertTrue(all(default_storage.exists(path) for path in first_files))
+        self.assertEqual(first.image_variants['sizes']['large']['width'], 1200)
+
+    def test_backfill_command(self):
+        source = default_storage.save('products/eski.png', image_file())
+        product = Product.objects.create(name="Nok", price=5, category=self.category)
+        Product.objects.filter(pk=product.pk).update(image=source)
+
+        call_command('build_image_variants', workers=1, stdout=io.StringIO())
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['source'], source)
+        self.assertEqual(product.image_variants['sizes']['large']['height'], 600)
+
+
+class ProductExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name="yangi")
+        cls.products = create_products(5, tags=[cls.tag])
+        cls.other = create_products(2)
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+998900000005', password='pass12345')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('product_export'), params)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson_streams_flat_rows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response, content = self.export()
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([row['id'] for row in rows], sorted(p.pk for p in self.products + self.other))
+        live = ProductSerializer(Product.objects.get(pk=rows[0]['id'])).data
+        for key in ('name', 'price', 'created_at'):
+            self.assertEqual(rows[0][key], live[key])
+        self.assertEqual(rows[0]['tags'], ["yangi"])
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+    def test_csv_with_filters_and_updated_since(self):
+        _, content = self.export(output='csv', tag=self.tag.pk)
+        lines = content.splitlines()
+        self.assertEqual(lines[0], 'id,name,description,price,image,category,tags,created_at,updated_at')
+        self.assertEqual(len(lines), 6)
+
+        since = self.client.get(reverse('product_export'))['X-Export-Started-At']
+        Product.objects.filter(pk=self.other[0].pk).update(updated_at=timezone.now())
+        _, content = self.export(updated_since=since)
+        self.assertEqual([json.loads(line)['id'] for line in content.splitlines()], [self.other[0].pk])
+        self.assertEqual(self.client.get(reverse('product_export'), {'updated_since': 'kecha'}).status_code, 400)
+
+    def test_admin_only_and_deleted_tag_is_skipped(self):
+        self.assertIn(APIClient().get(reverse('product_export')).status_code, (401, 403))
+        row = taxonomy.row
+        with mock.patch.object(taxonomy, 'row', lambda model, pk: None if model is Tag else row(model, pk)):
+            _, content = self.export()
+        self.assertEqual(json.loads(content.splitlines()[0])['tags'], [])
+
+
+class ProductQueryPlanTests(TestCase):
+    """EXPLAIN: ro‘yxat filtrlari to‘liq skan va vaqtinchalik saralashsiz bajarilishi kerak"""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = [Tag.objects.create(name=f"teg{i}") for i in range(4)]
+        for i in range(4):
+            create_products(25, tags=tags[i:i + 2])
+
+    def test_hot_queries_use_indexes(self):
+        self.assertEqual(check_hot_queries(HOT_QUERIES), {})
+
+    def test_regression_is_reported(self):
+        queryset = Product.objects.filter(category_id=1).order_by('image')[:20]
+        self.assertIn(TEMP_SORT, [kind for kind, line in plan_problems(queryset)])
+        self.assertEqual(suggest_index(queryset), ['category', 'image'])
+        self.assertIn(FULL_SCAN, [kind for kind, line in plan_problems(Product.objects.order_by('image')[:20])])
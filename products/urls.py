@@ -1,6 +1,6 @@
 from django.urls import path
 from .views import (
-    ProductListView, ProductDetailView, ProductAdminView,
+    ProductListView, ProductExportView, ProductDetailView, ProductFacetView, ProductAdminView, ProductImportView, ProductBulkView,
     CategoryListCreateView, CategoryDetailView,
     TagListCreateView, TagDetailView
 )
@@ -8,12 +8,16 @@ from .views import (
 urlpatterns = [
     # -------- Mijozlar uchun --------
     path('', ProductListView.as_view(), name='product_list'),                        
+    path('export/', ProductExportView.as_view(), name='product_export'),
+    path('facets/', ProductFacetView.as_view(), name='product_facets'),
     path('<int:pk>/', ProductDetailView.as_view(), name='product_detail'),          
     path('categories/', CategoryListCreateView.as_view(), name='category_list'),  
 
     # -------- Adminlar uchun --------
     path('admin/', ProductAdminView.as_view(), name='product_create'),              
     path('admin/<int:pk>/', ProductAdminView.as_view(), name='product_update_delete'), 
+    path('admin/import/', ProductImportView.as_view(), name='product_import'),
+    path('admin/bulk/', ProductBulkView.as_view(), name='product_bulk'),
     path('admin/categories/<int:pk>/', CategoryDetailView.as_view(), name='category_update_delete'), 
     path('admin/tags/', TagListCreateView.as_view(), name='tag_list_create'),         
     path('admin/tags/<int:pk>/', TagDetailView.as_view(), name='tag_update_delete'), 
@@ -1,22 +1,60 @@
+from operator import itemgetter
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from django.db.models import Q
+from rest_framework.parsers import MultiPartParser
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 
+from shop_api.compiled import compiled_serializer
+from shop_api.fieldsets import FIELDSET_PARAMETERS, fieldset_options, has_fieldset_params
+from shop_api.pagination import MAX_PAGE_SIZE, KeysetPaginator, cached_count, get_page_number, get_page_size
+from products.cache import cached_catalog_response, catalog_etag, catalog_generation, catalog_modified, query_digest
+from products.bulk import apply_bulk_action
+from products.export import FORMATS as EXPORT_FORMATS, iter_product_rows
+from products.facets import compute_facets, facet_index_enabled, indexed_facets
+from products.filters import ORDERING_FIELDS, filter_products, has_product_filters, product_ordering
+from products.importer import READERS, ProductImporter, text_stream
 from products.models import Product, Category, Tag
+from products.search import get_search_backend
+from products.taxonomy import taxonomy
+from products.snapshots import product_payloads, splice_json
 from products.serializers import (
     ProductSerializer,
     ProductCreateUpdateSerializer,
+    ProductBulkActionSerializer,
     CategorySerializer,
     TagSerializer
 )
 
+# --------------------- Shartli GET (ETag / Last-Modified) ---------------------
+def _product_updated_at(request, pk):
+    # etag_func va last_modified_func ikkalasi ham chaqiriladi, so‘rov bitta bo‘lsin
+    if not hasattr(request, '_product_updated_at'):
+        request._product_updated_at = Product.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    return request._product_updated_at
+
+
+def product_etag(request, pk):
+    updated_at = _product_updated_at(request, pk)
+    return f"product-{pk}-{updated_at.timestamp()}-{query_digest(request)}" if updated_at else None
+
+
+def product_last_modified(request, pk):
+    return _product_updated_at(request, pk)
+
+
 # --------------------- Mijozlar uchun API ---------------------
 @extend_schema(tags=['Mahsulotlar'])
 class ProductListView(APIView):
     permission_classes = [AllowAny]
+    ORDERING_FIELDS = ORDERING_FIELDS
 
     @extend_schema(
         parameters=[
@@ -24,70 +62,139 @@ class ProductListView(APIView):
             OpenApiParameter(name='tag', description="Teg ID bo‘yicha filter", required=False, type=int),
             OpenApiParameter(name='price_min', description="Minimal narx", required=False, type=float),
             OpenApiParameter(name='price_max', description="Maksimal narx", required=False, type=float),
-            OpenApiParameter(name='search', description="Nomi yoki tavsifi bo‘yicha qidiruv", required=False, type=str),
-            OpenApiParameter(name='order_by', description="Tartiblash: price, -price, name, -name", required=False, type=str),
+            OpenApiParameter(name='search', description="Nomi yoki tavsifi bo‘yicha to‘liq matnli qidiruv (moslik bo‘yicha tartiblanadi)", required=False, type=str),
+            OpenApiParameter(name='order_by', description="Tartiblash: price, -price, name, -name, created_at, -created_at", required=False, type=str),
             OpenApiParameter(name='page', description="Sahifa raqami", required=False, type=int),
-            OpenApiParameter(name='page_size', description="Har bir sahifadagi elementlar soni", required=False, type=int),
+            OpenApiParameter(name='page_size', description=f"Har bir sahifadagi elementlar soni (ko‘pi bilan {MAX_PAGE_SIZE})", required=False, type=int),
+            OpenApiParameter(name='cursor', description="Kursor rejimi: birinchi sahifa uchun bo‘sh, keyin next/previous qiymati", required=False, type=str),
+            OpenApiParameter(name='include_total', description="Kursor rejimida taxminiy (keshdagi) umumiy sonni qaytarish", required=False, type=bool),
+            *FIELDSET_PARAMETERS,
         ],
         responses=OpenApiResponse(response=ProductSerializer(many=True), description="Mahsulotlar ro‘yxati"),
         summary="Mahsulotlar ro‘yxati",
-        description="Mahsulotlarni filtrlash, qidirish va tartiblash imkoniyati bilan ro‘yxatini qaytaradi."
+        description="Mahsulotlarni filtrlash, qidirish va tartiblash imkoniyati bilan ro‘yxatini qaytaradi. "
+                    "`cursor` parametri berilsa, OFFSET va COUNT(*) ishlatilmaydigan kursor sahifalash qo‘llanadi."
     )
+    @method_decorator(condition(etag_func=catalog_etag, last_modified_func=catalog_modified))
+    @cached_catalog_response('product_list')
     def get(self, request):
         queryset = Product.objects.all()
 
         # Filtrlash
-        category = request.query_params.get('category')
-        tag = request.query_params.get('tag')
-        price_min = request.query_params.get('price_min')
-        price_max = request.query_params.get('price_max')
-        search = request.query_params.get('search')
         order_by = request.query_params.get('order_by')
+        search_backend = get_search_backend()
+        queryset = filter_products(queryset, request.query_params, search_backend)
 
-        if category:
-            queryset = queryset.filter(category_id=category)
-        if tag:
-            queryset = queryset.filter(tags__id=tag)
-        if price_min:
-            queryset = queryset.filter(price__gte=price_min)
-        if price_max:
-            queryset = queryset.filter(price__lte=price_max)
-        if search:
-            queryset = queryset.filter(Q(name__icontains=search) | Q(description__icontains=search))
-        if order_by in ['price', '-price', 'name', '-name']:
-            queryset = queryset.order_by(order_by)
+        # Tartiblash
+        ordering = product_ordering(order_by)
+        page_size = get_page_size(request.query_params)
+
+        # JSON so‘ralganda tayyor snapshotlar ulanadi; ?fields=/?expand= yoki browsable API da
+        # values() qatorlaridan kompilyatsiya qilingan serializatsiya
+        use_snapshots = request.accepted_renderer.format == 'json' and not has_fieldset_params(request.query_params)
+        if use_snapshots:
+            page_queryset = queryset.select_related('snapshot')
+            fetch, key = list, None
+        else:
+            page_queryset = queryset
+            compiled = compiled_serializer(ProductSerializer, **fieldset_options(request.query_params))
+
+        # Kursor rejimi
+        if 'cursor' in request.query_params:
+            paginator = KeysetPaginator(ordering, page_size)
+            if not use_snapshots:
+                # Kursor tartib maydonlaridan tuziladi, ular ham qatorga olinadi
+                fetch, key = (lambda rows: compiled.rows(rows, *paginator.fields)), itemgetter(0)
+            products, next_cursor, previous_cursor = paginator.paginate(
+                page_queryset, request.query_params.get('cursor') or None, fetch=fetch, key=key
+            )
+            data = {
+                "next": next_cursor,
+                "previous": previous_cursor,
+                "page_size": page_size,
+            }
+            if request.query_params.get('include_total') in ('1', 'true', 'True'):
+                data["total"] = cached_count(queryset, version=catalog_generation())
+            return self.render_products(data, products, use_snapshots)
+
+        # Qidiruvda tartib berilmasa, moslik darajasi bo‘yicha (faqat sahifa rejimida)
+        if search_backend.rank_field in queryset.query.extra_select and order_by not in self.ORDERING_FIELDS:
+            ordering = [search_backend.rank_field, 'id']
 
         # Sahifalash
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 10))
+        page = get_page_number(request.query_params)
         start = (page - 1) * page_size
         end = start + page_size
-        total = queryset.count()
-        queryset = queryset[start:end]
+        total = cached_count(queryset, version=catalog_generation())
+        products = page_queryset.order_by(*ordering)[start:end]
+        if not use_snapshots:
+            products = compiled.rows(products, *[name.lstrip('-') for name in ordering])
 
-        serializer = ProductSerializer(queryset, many=True)
-        return Response({
+        return self.render_products({
             "total": total,
             "page": page,
             "page_size": page_size,
-            "results": serializer.data
-        })
+        }, products, use_snapshots)
+
+    def render_products(self, data, products, use_snapshots):
+        if use_snapshots:
+            content = splice_json(data, 'results', product_payloads(list(products)))
+            return HttpResponse(content, content_type='application/json')
+        data["results"] = [product for row, product in products]
+        return Response(data)
+
+@extend_schema(tags=['Mahsulotlar'])
+class ProductFacetView(APIView):
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='category', description="Toifa ID bo‘yicha filter", required=False, type=int),
+            OpenApiParameter(name='tag', description="Teg ID bo‘yicha filter", required=False, type=int),
+            OpenApiParameter(name='price_min', description="Minimal narx", required=False, type=float),
+            OpenApiParameter(name='price_max', description="Maksimal narx", required=False, type=float),
+            OpenApiParameter(name='search', description="Nomi yoki tavsifi bo‘yicha qidiruv", required=False, type=str),
+        ],
+        responses=OpenApiResponse(description="Toifa, teg va narx oraliqlari bo‘yicha mahsulotlar soni"),
+        summary="Mahsulot facetlari",
+        description="Ro‘yxat filtrlariga mos mahsulotlar sonini toifa, teg va narx oraliqlari bo‘yicha qaytaradi. "
+                    "Filtr berilmasa, oldindan hisoblangan facet indeksidan o‘qiladi."
+    )
+    @method_decorator(condition(etag_func=catalog_etag, last_modified_func=catalog_modified))
+    @cached_catalog_response('product_facets')
+    def get(self, request):
+        facets = None
+        if not has_product_filters(request.query_params) and facet_index_enabled():
+            facets = indexed_facets()
+        if facets is None:
+            facets = compute_facets(filter_products(Product.objects.all(), request.query_params))
+        return Response(facets)
 
 @extend_schema(tags=['Mahsulotlar'])
 class ProductDetailView(APIView):
     permission_classes = [AllowAny]
 
     @extend_schema(
+        parameters=FIELDSET_PARAMETERS,
         responses=ProductSerializer,
         summary="Mahsulot tafsiloti",
         description="Mahsulotning to‘liq ma'lumotlarini qaytaradi."
     )
+    @method_decorator(condition(etag_func=product_etag, last_modified_func=product_last_modified))
+    @cached_catalog_response('product_detail')
     def get(self, request, pk):
+        if request.accepted_renderer.format == 'json' and not has_fieldset_params(request.query_params):
+            products = list(Product.objects.select_related('snapshot').filter(pk=pk))
+            payloads = product_payloads(products)
+            if not payloads:
+                return Response({"detail": "Mahsulot topilmadi"}, status=status.HTTP_404_NOT_FOUND)
+            return HttpResponse(payloads[0], content_type='application/json')
+        fieldsets = fieldset_options(request.query_params)
         try:
-            product = Product.objects.get(pk=pk)
+            product = ProductSerializer.setup_eager_loading(Product.objects.all(), **fieldsets).get(pk=pk)
         except Product.DoesNotExist:
             return Response({"detail": "Mahsulot topilmadi"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = ProductSerializer(product)
+        serializer = ProductSerializer(product, **fieldsets)
         return Response(serializer.data)
 
 @extend_schema(tags=['Mahsulotlar'])
@@ -102,8 +209,10 @@ class CategoryListCreateView(APIView):
         summary="Toifalar ro‘yxati",
         description="Barcha mavjud toifalar ro‘yxatini qaytaradi."
     )
+    @method_decorator(condition(etag_func=catalog_etag, last_modified_func=catalog_modified))
+    @cached_catalog_response('category_list')
     def get(self, request):
-        categories = Category.objects.all()
+        categories = taxonomy.instances(Category).values()
         serializer = CategorySerializer(categories, many=True)
         return Response(serializer.data)
 
@@ -122,6 +231,51 @@ class CategoryListCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # --------------------- Admin uchun API ---------------------
+@extend_schema(tags=['Admin'])
+class ProductExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='output', description="Format: ndjson (standart) yoki csv", required=False, type=str),
+            OpenApiParameter(name='updated_since', description="Faqat shu vaqtdan keyin yaratilgan yoki o‘zgargan mahsulotlar (ISO 8601); o‘chirilganlar berilmaydi", required=False, type=str),
+            OpenApiParameter(name='category', description="Toifa ID bo‘yicha filter", required=False, type=int),
+            OpenApiParameter(name='tag', description="Teg ID bo‘yicha filter", required=False, type=int),
+            OpenApiParameter(name='price_min', description="Minimal narx", required=False, type=float),
+            OpenApiParameter(name='price_max', description="Maksimal narx", required=False, type=float),
+            OpenApiParameter(name='search', description="To‘liq matnli qidiruv", required=False, type=str),
+        ],
+        responses={200: OpenApiResponse(description="Katalog oqimi (NDJSON yoki CSV)")},
+        summary="Katalogni eksport qilish (Admin)",
+        description="Butun katalogni sahifalarsiz, oqim ko‘rinishida qaytaradi. `X-Export-Started-At` sarlavhasi "
+                    "keyingi so‘rovda `updated_since` sifatida ishlatilishi mumkin. Delta rejimi faqat yangi va "
+                    "o‘zgargan mahsulotlarni beradi: o‘chirilganlarni aniqlash uchun vaqti-vaqti bilan to‘liq eksport kerak."
+    )
+    def get(self, request):
+        output = request.query_params.get('output') or 'ndjson'
+        if output not in EXPORT_FORMATS:
+            return Response({"detail": "output ndjson yoki csv bo‘lishi kerak"}, status=status.HTTP_400_BAD_REQUEST)
+        started_at = timezone.now()
+        queryset = filter_products(Product.objects.all(), request.query_params)
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            try:
+                updated_since = parse_datetime(updated_since)
+            except ValueError:
+                updated_since = None
+            if updated_since is None:
+                return Response({"detail": "updated_since noto‘g‘ri sana"}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(updated_since):
+                updated_since = timezone.make_aware(updated_since)
+            queryset = queryset.filter(updated_at__gte=updated_since)
+
+        lines, content_type = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(lines(iter_product_rows(queryset)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="catalog.{output}"'
+        response['X-Export-Started-At'] = started_at.isoformat()
+        return response
+
+
 @extend_schema(tags=['Admin'])
 class ProductAdminView(APIView):
     permission_classes = [IsAdminUser]
@@ -169,6 +323,55 @@ class ProductAdminView(APIView):
         product.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+@extend_schema(tags=['Admin'])
+class ProductImportView(APIView):
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        request={
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {
+                    'file': {'type': 'string', 'format': 'binary'},
+                    'format': {'type': 'string', 'enum': sorted(READERS)},
+                },
+            },
+        },
+        responses={200: OpenApiResponse(description="Import hisoboti: yaratilgan, yangilangan va xato qatorlar")},
+        summary="Mahsulotlarni ommaviy import qilish (Admin)",
+        description="CSV (name, description, price, category, tags='a|b', id) yoki JSONL faylni bo‘laklab import qiladi. "
+                    "Toifa va teglar nomi bo‘yicha topiladi, yo‘qlari yaratiladi. id berilgan qator mavjud mahsulotni yangilaydi."
+    )
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "file majburiy"}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+        if file_format not in READERS:
+            return Response({"detail": "Format csv yoki jsonl bo‘lishi kerak"}, status=status.HTTP_400_BAD_REQUEST)
+        result = ProductImporter().run(READERS[file_format](text_stream(upload.file)))
+        return Response(result.as_dict())
+
+
+@extend_schema(tags=['Admin'])
+class ProductBulkView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=ProductBulkActionSerializer,
+        responses={200: OpenApiResponse(description="Amal natijasi: mos kelgan va o‘zgargan qatorlar soni")},
+        summary="Mahsulotlarni ommaviy o‘zgartirish (Admin)",
+        description="ids ro‘yxati yoki filter (category, tag, price_min, price_max, search) bo‘yicha tanlangan mahsulotlarga "
+                    "bitta amal qo‘llaydi: set_price, scale_price, set_category, add_tags, remove_tags yoki delete. "
+                    "Hammasi bitta tranzaksiyada bajariladi."
+    )
+    def post(self, request):
+        serializer = ProductBulkActionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(apply_bulk_action(serializer.validated_data))
+
 @extend_schema(tags=['Admin'])
 class CategoryDetailView(APIView):
     permission_classes = [IsAdminUser]
@@ -213,7 +416,7 @@ class TagListCreateView(APIView):
         description="Barcha mavjud teglarni ro‘yxatini qaytaradi."
     )
     def get(self, request):
-        tags = Tag.objects.all()
+        tags = taxonomy.instances(Tag).values()
         serializer = TagSerializer(tags, many=True)
         return Response(serializer.data)
 
@@ -0,0 +1,164 @@
+import json
+from functools import lru_cache
+
+from django.db.models import F
+from rest_framework import serializers
+
+# Model qiymati bilan bir xil natija beradigan maydonlar (to_representation chaqirilmaydi)
+IDENTITY_FIELDS = (serializers.IntegerField, serializers.CharField)
+OWNER = '_compiled_owner'
+
+
+class NotCompilable(TypeError):
+    pass
+
+
+class CompiledSerializer:
+    """
+    ModelSerializer ning faqat o‘qish uchun "kompilyatsiya qilingan" varianti.
+
+    Serializer maydonlari bir marta tahlil qilinadi: oddiy maydonlar values()
+    ustunlariga, ichki FK serializerlari JOIN ustunlariga, ko‘p qiymatli
+    bog‘lanishlar (tags, items) esa bitta guruhlangan so‘rovga aylanadi.
+    Natija model obyektlari va har bir qator uchun maydon obyektlarisiz
+    quriladi va ModelSerializer bilan bir xil JSON beradi. So‘rov
+    kontekstiga (masalan, absolyut URL) bog‘liq maydonlar qo‘llanmaydi.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.columns = []
+        self.relations = []
+        self.build = self._compile(serializer, '')
+
+    def _add(self, column):
+        if column not in self.columns:
+            self.columns.append(column)
+        return column
+
+    def _compile(self, serializer, prefix):
+        model = serializer.Meta.model
+        pk = self._add(prefix + model._meta.pk.attname)
+        steps = [
+            (name, self._compile_field(serializer, model, name, field, prefix, pk))
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        ]
+
+        def build(row, related):
+            return {name: step(row, related) for name, step in steps}
+        return build
+
+    def _compile_field(self, serializer, model, name, field, prefix, pk):
+        if isinstance(field, serializers.ListSerializer):
+            return self._compile_many(model, field, pk)
+
+        if isinstance(field, serializers.SerializerMethodField):
+            try:
+                columns, function = serializer.compiled_fields[name]
+            except (AttributeError, KeyError):
+                raise NotCompilable(f"{type(serializer).__name__}.{name}: compiled_fields da yo‘q")
+            keys = [self._add(prefix + column) for column in columns]
+            return lambda row, related: function(*[row[key] for key in keys])
+
+        if '.' in field.source or field.source == '*':
+            raise NotCompilable(f"{type(serializer).__name__}.{name}: murakkab source qo‘llanmaydi")
+        model_field = model._meta.get_field(field.source)
+        key = self._add(prefix + model_field.attname)
+
+        if isinstance(field, serializers.BaseSerializer):
+            if hasattr(field, 'cached_row'):
+                # Ichki obyekt id bo‘yicha keshdan: JOIN yo‘q
+                build = self._compile_cached(field)
+                return lambda row, related: None if row[key] is None else build(row[key])
+            build = self._compile(field, f'{prefix}{model_field.name}__')
+            return lambda row, related: None if row[key] is None else build(row, related)
+        if isinstance(field, serializers.FileField):
+            # So‘rovsiz ModelSerializer ham nisbiy URL (storage.url) qaytaradi
+            storage = model_field.storage
+            return lambda row, related: storage.url(row[key]) if row[key] else None
+        if isinstance(field, serializers.RelatedField):
+            raise NotCompilable(f"{type(serializer).__name__}.{name}: bog‘lanish maydoni qo‘llanmaydi")
+        if type(field) in IDENTITY_FIELDS:
+            return lambda row, related: row[key]
+        convert = field.to_representation
+        return lambda row, related: None if row[key] is None else convert(row[key])
+
+    def _compile_cached(self, serializer):
+        compiled = CompiledSerializer(serializer)
+        if compiled.relations:
+            raise NotCompilable(f"{type(serializer).__name__}: keshlangan serializerda bog‘lanishlar qo‘llanmaydi")
+
+        def build(pk):
+            row = serializer.cached_row(pk)
+            return None if row is None else compiled.build(row, [])
+        return build
+
+    def _compile_many(self, model, field, pk):
+        relation = model._meta.get_field(field.source)
+        related_model = relation.related_model
+        if relation.many_to_many and relation.concrete and hasattr(field.child, 'cached_row'):
+            # Faqat oraliq jadval o‘qiladi, bog‘langan obyektlar keshdan
+            through = relation.remote_field.through
+            source = through._meta.get_field(relation.m2m_field_name()).attname
+            target = through._meta.get_field(relation.m2m_reverse_field_name()).attname
+            build = self._compile_cached(field.child)
+
+            def fetch(owners):
+                groups = {}
+                pairs = through._default_manager.filter(**{f'{source}__in': owners}).order_by(target)
+                for owner, related_pk in pairs.values_list(source, target):
+                    groups.setdefault(owner, []).append(build(related_pk))
+                return groups
+        elif relation.one_to_many:
+            child = CompiledSerializer(field.child)
+            # Teskari FK (masalan, Order.items): prefetch kabi pk bo‘yicha tartib
+            lookup = f'{relation.field.name}__in'
+            owner = child._add(relation.field.attname)
+
+            def fetch(owners):
+                queryset = related_model._default_manager.filter(**{lookup: owners}).order_by('pk')
+                return child.grouped(queryset, owner)
+        elif relation.many_to_many:
+            # prefetch_related bilan bir xil JOIN: related -> oraliq jadval
+            child = CompiledSerializer(field.child)
+            query_name = relation.related_query_name() if relation.concrete else relation.field.name
+
+            def fetch(owners):
+                queryset = related_model._default_manager.filter(**{f'{query_name}__in': owners}).order_by('pk')
+                return child.grouped(queryset, OWNER, **{OWNER: F(query_name)})
+        else:
+            raise NotCompilable(f"{model.__name__}.{field.source}: bog‘lanish turi qo‘llanmaydi")
+
+        index = len(self.relations)
+        self.relations.append((pk, fetch))
+        return lambda row, related: related[index].get(row[pk], [])
+
+    def rows(self, queryset, *extra_columns, **expressions):
+        """[(values() qatori, natija lug‘ati), ...] — queryset tartibida"""
+        columns = self.columns + [column for column in extra_columns if column not in self.columns]
+        rows = list(queryset.values(*columns, **expressions))
+        related = []
+        for owner_key, fetch in self.relations:
+            owners = {row[owner_key] for row in rows} - {None}
+            related.append(fetch(owners) if owners else {})
+        return [(row, self.build(row, related)) for row in rows]
+
+    def grouped(self, queryset, owner, **expressions):
+        groups = {}
+        for row, data in self.rows(queryset, **expressions):
+            groups.setdefault(row[owner], []).append(data)
+        return groups
+
+    def serialize(self, queryset):
+        return [data for row, data in self.rows(queryset)]
+
+
+@lru_cache(maxsize=128)
+def _compiled(serializer_class, options):
+    return CompiledSerializer(serializer_class(**json.loads(options)))
+
+
+def compiled_serializer(serializer_class, **options):
+    """Serializer klassi va ?fields=/?expand= tanlovi bo‘yicha keshlangan CompiledSerializer"""
+    return _compiled(serializer_class, json.dumps(options, sort_keys=True))
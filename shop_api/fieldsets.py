@@ -0,0 +1,156 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from drf_spectacular.utils import OpenApiParameter
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(name='fields', description="Faqat shu maydonlar, vergul bilan; ichki maydonlar nuqta bilan (masalan, id,items.product.name)", required=False, type=str),
+    OpenApiParameter(name='expand', description="Qisqa ko‘rinishdagi ichki obyektlarni to‘liq ochish (masalan, items.product)", required=False, type=str),
+]
+
+
+def parse_field_paths(value):
+    """'id,items.product.name' -> {'id': {}, 'items': {'product': {'name': {}}}}"""
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for part in path.split('.'):
+            part = part.strip()
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def merge_paths(first, second):
+    merged = dict(first or {})
+    for name, subtree in (second or {}).items():
+        merged[name] = merge_paths(merged.get(name), subtree)
+    return merged
+
+
+def fieldset_options(params):
+    """?fields= va ?expand= parametrlaridan serializer kwarglari"""
+    return {
+        'fields': parse_field_paths(params.get('fields')) or None,
+        'expand': parse_field_paths(params.get('expand')),
+    }
+
+
+def has_fieldset_params(params):
+    return bool(params.get('fields') or params.get('expand'))
+
+
+class DynamicFieldsMixin:
+    """
+    ModelSerializer uchun ?fields= / ?expand= qo‘llab-quvvatlash.
+
+    fields — ko‘rsatiladigan maydonlar daraxti (nuqta bilan ichki maydonlar),
+    expand — qisqa ko‘rinishdagi ichki serializerlarni to‘liq ochish.
+    Noma'lum maydon nomlari e'tiborsiz qoldiriladi. setup_eager_loading()
+    xuddi shu tanlov bo‘yicha faqat kerakli ustun va bog‘lanishlarni yuklaydi.
+    """
+
+    #: Ichki (nested) holatdagi qisqa ko‘rinish; None bo‘lsa barcha maydonlar
+    summary_fields = None
+    #: Standart holatda qisqa ko‘rinishda beriladigan ichki serializerlar
+    summarized_fields = ()
+    #: Model ustuni bo‘lmagan yoki boshqa ustunlarga tayanadigan maydonlar uchun yuklanadigan yo‘llar
+    field_dependencies = {}
+    #: SQL da hisoblanadigan maydonlar: {maydon: ifoda}, faqat maydon tanlanganda annotate() qilinadi
+    field_annotations = {}
+
+    def __init__(self, *args, fields=None, expand=None, summary=False, **kwargs):
+        self.selected_fields = fields
+        self.expanded_fields = expand or {}
+        self.summary = summary
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def resolve_fields(cls, fields=None, expand=None, summary=False):
+        """{maydon: ichki serializer kwarglari}, Meta.fields tartibida"""
+        expand = expand or {}
+        if fields:
+            names = [name for name in cls.Meta.fields if name in fields]
+        elif summary and cls.summary_fields is not None:
+            # ?expand= bilan qisqa ko‘rinishga qo‘shimcha maydonlar (masalan, items)
+            names = [name for name in cls.Meta.fields if name in cls.summary_fields or name in expand]
+        else:
+            names = list(cls.Meta.fields)
+        return {
+            name: {
+                'fields': (fields or {}).get(name) or None,
+                'expand': expand.get(name) or {},
+                'summary': name in cls.summarized_fields and name not in expand,
+            }
+            for name in names
+        }
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = {}
+        for name, options in self.resolve_fields(self.selected_fields, self.expanded_fields, self.summary).items():
+            field = fields[name]
+            child = getattr(field, 'child', field)
+            if isinstance(child, DynamicFieldsMixin):
+                child.selected_fields = options['fields']
+                child.expanded_fields = options['expand']
+                child.summary = options['summary']
+            selected[name] = field
+        return selected
+
+    @classmethod
+    def eager_loading_plan(cls, prefix='', fields=None, expand=None, summary=False, extra=None):
+        """(only() ustunlari, select_related, prefetch_related) — ko‘rsatiladigan maydonlar uchun"""
+        model = cls.Meta.model
+        selection = cls.resolve_fields(fields, expand, summary)
+        extra = dict(extra or {})
+        for name, paths in cls.field_dependencies.items():
+            if name in selection:
+                extra = merge_paths(extra, paths)
+
+        columns, select, prefetch = [prefix + model._meta.pk.name], [], []
+        for name in list(selection) + [name for name in extra if name not in selection]:
+            try:
+                model_field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            path = prefix + name
+            declared = cls._declared_fields.get(name)
+            child = getattr(declared, 'child', declared)
+            if name in selection:
+                options = dict(selection[name], extra=extra.get(name))
+            else:
+                options = {'fields': extra[name] or None}
+
+            if not model_field.is_relation:
+                columns.append(path)
+            elif model_field.many_to_one or (model_field.one_to_one and model_field.concrete):
+                columns.append(path)
+                # cached_row bor serializer obyektni id bo‘yicha keshdan oladi, JOIN kerak emas
+                if isinstance(child, DynamicFieldsMixin) and not hasattr(child, 'cached_row'):
+                    select.append(path)
+                    nested = type(child).eager_loading_plan(prefix=f'{path}__', **options)
+                    columns += nested[0]
+                    select += nested[1]
+                    prefetch += nested[2]
+            elif isinstance(child, DynamicFieldsMixin):
+                queryset = model_field.related_model._default_manager.order_by('pk')
+                if model_field.one_to_many:
+                    # Teskari FK: bog‘lash uchun tashqi kalit ustuni ham kerak
+                    options['extra'] = merge_paths(options.get('extra'), {model_field.field.name: {}})
+                prefetch.append(Prefetch(path, queryset=type(child).setup_eager_loading(queryset, **options)))
+            else:
+                prefetch.append(path)
+        return columns, select, prefetch
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, **options):
+        columns, select, prefetch = cls.eager_loading_plan(**options)
+        selection = cls.resolve_fields(options.get('fields'), options.get('expand'), options.get('summary', False))
+        annotations = {name: expression for name, expression in cls.field_annotations.items() if name in selection}
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*columns)
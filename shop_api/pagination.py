@@ -0,0 +1,131 @@
+import base64
+import binascii
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+COUNT_CACHE_TIMEOUT = 60
+
+
+def _positive_int(value, default):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+def get_page_size(params, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """page_size parametrini o‘qiydi va MAX_PAGE_SIZE bilan cheklaydi"""
+    return min(_positive_int(params.get('page_size'), default), maximum)
+
+
+def get_page_number(params):
+    return _positive_int(params.get('page'), 1)
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT, version=None):
+    """COUNT(*) natijasini qisqa muddat keshda saqlaydi (version o‘zgarsa, qayta sanaladi)"""
+    if queryset.query.is_empty():
+        return 0
+    sql = str(queryset.query).encode('utf-8')
+    key = f"count:{queryset.model._meta.label_lower}:{hashlib.md5(sql).hexdigest()}"
+    total = cache.get(key, version=version)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, timeout, version=version)
+    return total
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPaginator:
+    """
+    Kursor (keyset) asosidagi sahifalash.
+
+    ordering oxirgi maydoni yagona bo‘lishi kerak (odatda id), shunda
+    kursor qatorni aniq belgilaydi va OFFSET/COUNT kerak bo‘lmaydi.
+    """
+
+    def __init__(self, ordering, page_size=DEFAULT_PAGE_SIZE):
+        self.ordering = list(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.descending = [field.startswith('-') for field in self.ordering]
+        self.page_size = page_size
+
+    def encode_cursor(self, obj, reverse=False):
+        # obj model obyekti yoki values() qatori bo‘lishi mumkin
+        get = obj.get if isinstance(obj, dict) else lambda field: getattr(obj, field)
+        payload = {
+            'v': [_encode_value(get(field)) for field in self.fields],
+            'r': int(reverse),
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            values, reverse = payload['v'], bool(payload['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound("Noto‘g‘ri kursor")
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound("Noto‘g‘ri kursor")
+        return values, reverse
+
+    def _seek(self, values, reverse):
+        # (a, b) > (x, y)  =>  a > x OR (a = x AND b > y)
+        condition = Q()
+        equal = Q()
+        for field, value, descending in zip(self.fields, values, self.descending):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def _reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def paginate(self, queryset, cursor=None, fetch=list, key=None):
+        """
+        (natijalar, keyingi_kursor, oldingi_kursor) qaytaradi.
+
+        fetch kesilgan querysetdan natijalar ro‘yxatini oladi, key esa
+        natijadan kursor qiymatlari o‘qiladigan obyektni qaytaradi.
+        """
+        values, reverse = self.decode_cursor(cursor) if cursor else (None, False)
+        ordering = self._reversed_ordering() if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+
+        rows = fetch(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return rows, None, None
+        if reverse:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        key = key or (lambda row: row)
+        next_cursor = self.encode_cursor(key(rows[-1])) if has_next else None
+        previous_cursor = self.encode_cursor(key(rows[0]), reverse=True) if has_previous else None
+        return rows, next_cursor, previous_cursor
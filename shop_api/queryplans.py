@@ -0,0 +1,93 @@
+import re
+
+from django.db import connections, router, transaction
+from django.db.models.lookups import Exact, In
+
+FULL_SCAN = 'full_scan'
+TEMP_SORT = 'temp_sort'
+
+# SQLite: "SCAN jadval" (USING INDEX siz) — butun jadval, "USE TEMP B-TREE" — vaqtinchalik saralash
+SQLITE_PATTERNS = [
+    (FULL_SCAN, re.compile(r'\bSCAN (?!CONSTANT ROW)\S+\s*$')),
+    (TEMP_SORT, re.compile(r'USE TEMP B-TREE')),
+]
+# PostgreSQL: Incremental Sort indeks prefiksidan foydalanadi, shuning uchun muammo emas
+POSTGRES_PATTERNS = [
+    (FULL_SCAN, re.compile(r'\bSeq Scan on\b')),
+    (TEMP_SORT, re.compile(r'(^\s*|->\s+)Sort\b')),
+]
+
+
+class HotQuery:
+    """
+    Tez-tez bajariladigan (endpoint) so‘rovi va unda kutiladigan holat.
+
+    allow — ruxsat etilgan muammolar, masalan teg filtrida natija teg
+    bo‘yicha topiladi va kichik to‘plam saralanadi (TEMP_SORT).
+    """
+
+    def __init__(self, label, build, allow=()):
+        self.label = label
+        self.build = build
+        self.allow = set(allow)
+
+    def queryset(self):
+        return self.build()
+
+
+def explain(queryset):
+    """EXPLAIN natijasi qatorlari (SQLite va PostgreSQL)"""
+    using = queryset.db or router.db_for_read(queryset.model)
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return queryset.explain().splitlines()
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            # Kichik test ma'lumotlarida ham planner indeksni tanlasin: iloji bo‘lmasa Seq Scan/Sort qoladi
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+        return queryset.explain().splitlines()
+
+
+def plan_problems(queryset, allow=()):
+    """[(muammo turi, plan qatori), ...] — allow dagi turlar hisobga olinmaydi"""
+    using = queryset.db or router.db_for_read(queryset.model)
+    patterns = POSTGRES_PATTERNS if connections[using].vendor == 'postgresql' else SQLITE_PATTERNS
+    problems = []
+    for line in explain(queryset):
+        for kind, pattern in patterns:
+            if kind not in allow and pattern.search(line):
+                problems.append((kind, line.strip()))
+    return problems
+
+
+def suggest_index(queryset):
+    """
+    Oddiy indeks maslahati: tenglik filtrlari, so‘ng tartiblash ustunlari
+    (tartib bo‘lmasa diapazon filtrlari). Faqat asosiy modelning ustunlari.
+    """
+    model = queryset.model
+    equal, other = [], []
+    for child in queryset.query.where.children:
+        target = getattr(getattr(child, 'lhs', None), 'target', None)
+        if target is None or target.model is not model:
+            continue
+        columns = equal if isinstance(child, (Exact, In)) else other
+        if target.name not in equal + other:
+            columns.append(target.name)
+    ordering = [
+        name.lstrip('-') for name in queryset.query.order_by
+        if isinstance(name, str) and name.lstrip('-') not in ('pk', 'id', model._meta.pk.name)
+    ]
+    fields = equal + [name for name in (ordering or other) if name not in equal]
+    return fields or None
+
+
+def check_hot_queries(hot_queries):
+    """{label: [(muammo turi, plan qatori), ...]} — faqat muammoli so‘rovlar"""
+    report = {}
+    for hot_query in hot_queries:
+        problems = plan_problems(hot_query.queryset(), hot_query.allow)
+        if problems:
+            report[hot_query.label] = problems
+    return report
@@ -181,6 +181,57 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Katalog keshi bir nechta worker orasida umumiy bo‘lishi uchun CATALOG_CACHE_BACKEND=file qilib qo‘ying
+# (locmem har bir jarayonning o‘zida, generatsiya hisoblagichi ham workerlar orasida bo‘linmaydi).
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS['locmem'],
+    },
+    'catalog': {
+        'BACKEND': CACHE_BACKENDS[os.environ.get('CATALOG_CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.environ.get('CATALOG_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'catalog')),
+        'TIMEOUT': 600,
+    },
+    'carts': {
+        'BACKEND': CACHE_BACKENDS[os.environ.get('CART_CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.environ.get('CART_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'carts')),
+        'TIMEOUT': 60 * 60 * 24 * 14,
+    },
+}
+
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_TTL = 60          # javob yangi hisoblanadigan muddat (soniya)
+CATALOG_CACHE_STALE_TTL = 300   # muddati o‘tgan javob qayta hisoblanayotganda berilishi mumkin bo‘lgan vaqt
+CATALOG_CACHE_LOCK_TIMEOUT = 10 # qayta hisoblash qulfi
+CATALOG_CACHE_WAIT = 2          # qulf band va eski javob yo‘q bo‘lsa, kutish vaqti
+
+# Mahsulot facetlari: narx oraliqlari chegaralari va oldindan hisoblangan indeks
+PRODUCT_PRICE_BUCKETS = [0, 50, 100, 500, 1000, 5000]
+PRODUCT_FACET_INDEX = True
+
+# Mahsulot rasmi variantlari: nom -> eng katta tomon (px); 0 ta worker = so‘rov oqimida yaratish
+PRODUCT_IMAGE_VARIANTS = {'thumbnail': 150, 'medium': 600, 'large': 1200}
+PRODUCT_IMAGE_WORKERS = int(os.environ.get('PRODUCT_IMAGE_WORKERS', 2))
+
+# Savat: db — har bir o‘zgarish darhol cart_cartitem ga, cache — qatorlar keshda, bazaga fon oqimida
+# (CART_FLUSH_WORKERS=0 bo‘lsa shu oqimda) va checkoutda yoziladi. Mehmon savatlari har doim keshda.
+# locmem faqat bitta jarayon uchun (dev, testlar): bir nechta worker bilan CART_CACHE_BACKEND=file yoki redis
+# bo‘lishi shart, aks holda mehmon savati (va cache rejimida foydalanuvchi savati) boshqa worker da ko‘rinmaydi.
+CART_STORAGE = os.environ.get('CART_STORAGE', 'db')
+CART_CACHE_ALIAS = 'carts'
+CART_FLUSH_WORKERS = int(os.environ.get('CART_FLUSH_WORKERS', 1))
+CART_ABANDONED_DAYS = 30        # cleanup_carts: shuncha kun o‘zgarmagan savatlar o‘chiriladi
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
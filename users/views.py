@@ -7,6 +7,7 @@ from users.models import User
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from drf_spectacular.utils import extend_schema, OpenApiResponse
+from cart.storage import merge_guest_cart
 
 @extend_schema(tags=['Autentifikatsiya'])
 class RegisterView(APIView):
@@ -25,6 +26,7 @@ class RegisterView(APIView):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
+            merge_guest_cart(request, user)
             refresh = RefreshToken.for_user(user)
             return Response(
                 {
@@ -59,6 +61,8 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data['user']
+            # X-Cart-Token bilan kelgan mehmon savati foydalanuvchi savatiga qo‘shiladi
+            merge_guest_cart(request, user)
             refresh = RefreshToken.for_user(user)
             return Response({
                 "refresh": str(refresh),